@@ -3,7 +3,7 @@
 from setuptools import setup
 
 setup(name='stn',
-      packages=['stn', 'stn.config', 'stn.exceptions', 'stn.methods', 'stn.pstn', 'stn.stnu', 'stn.utils'],
+      packages=['stn', 'stn.config', 'stn.dense', 'stn.exceptions', 'stn.methods', 'stn.pstn', 'stn.stnu', 'stn.utils'],
       version='0.2.0',
       install_requires=[
             'numpy',
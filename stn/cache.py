@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from stn.dense.dense_stn import DenseSTN
+from stn.pstn.pstn import PSTN
+from stn.stn import STN
+from stn.stnu.stnu import STNU
+
+""" Cache of the solutions (dispatchable graphs) of stps
+
+Solutions are stored under the fingerprint of the solved stn and of the solver (see
+get_fingerprint), so that solvers can share a cache. The cache
+keeps the most recently used solutions in memory and drops the least recently used one when
+it is full. Solutions older than ttl seconds are not used.
+
+The cache can be backed by an STNStore (see stn.store). Feasible solutions are then also
+written to the store, with their risk metric and their graph attributes (e.g. the waits of a
+dc solution) in a json file next to them, and solutions that are not in memory are read from
+the store. Solutions with graph attributes that cannot be written to json are not stored.
+"""
+
+logger = logging.getLogger('stn.cache')
+
+stn_classes = {stn_class.__name__: stn_class for stn_class in (STN, PSTN, STNU, DenseSTN)}
+
+
+def get_fingerprint(stn, solver_name=None, options=None):
+    """ Returns a fingerprint (hex string) of the stn: its type, tasks, nodes and edges,
+    including weights, distributions and contingent flags, and of the solver and its options.
+    Stns with the same fingerprint have the same solution
+
+    :param stn: stn (object)
+    :param solver_name: name of the solver
+    :param options: dictionary with the options of the solver, e.g. {'workers': 4}
+    """
+    fingerprint = hashlib.sha256(type(stn).__name__.encode('utf-8'))
+    solver = {'solver_name': solver_name, 'options': options or dict()}
+    fingerprint.update(json.dumps(solver, sort_keys=True, default=str).encode('utf-8'))
+    fingerprint.update(stn.get_hash().encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
+class SolutionCache(object):
+
+    def __init__(self, maxsize=128, ttl=None, store=None):
+        """
+        :param maxsize: maximum number of solutions kept in memory
+        :param ttl: time to live (seconds) of the solutions, None to keep them until they are dropped
+        :param store: STNStore (object) where feasible solutions are also stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        # {fingerprint: (time, dispatchable graph or None)}
+        self._solutions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def __contains__(self, fingerprint):
+        return self._get(fingerprint) is not None
+
+    def get(self, fingerprint):
+        """ Returns (True, copy of the dispatchable graph) if the solution of the stn with the
+        given fingerprint is cached and (False, None) otherwise. The cached dispatchable graph
+        is None if the stn has no solution
+        """
+        entry = self._get(fingerprint)
+        if entry is None:
+            entry = self._get_stored(fingerprint)
+            if entry is not None:
+                self.store_hits += 1
+                self._add(fingerprint, entry)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        dispatchable_graph = entry[1]
+        return True, dispatchable_graph.clone() if dispatchable_graph is not None else None
+
+    def put(self, fingerprint, dispatchable_graph):
+        """ Caches the solution (dispatchable graph or None) of the stn with the given fingerprint
+        """
+        if dispatchable_graph is not None:
+            dispatchable_graph = dispatchable_graph.clone()
+        entry = (time.time(), dispatchable_graph)
+        self._add(fingerprint, entry)
+        if self.store is not None and dispatchable_graph is not None:
+            self._store(fingerprint, entry)
+
+    def clear(self):
+        """ Removes the solutions in memory. The stored solutions are kept
+        """
+        self._solutions.clear()
+
+    def get_stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'store_hits': self.store_hits,
+                'evictions': self.evictions,
+                'size': len(self._solutions)}
+
+    def _is_expired(self, entry):
+        return self.ttl is not None and time.time() - entry[0] > self.ttl
+
+    def _get(self, fingerprint):
+        entry = self._solutions.get(fingerprint)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            del self._solutions[fingerprint]
+            return None
+        self._solutions.move_to_end(fingerprint)
+        return entry
+
+    def _add(self, fingerprint, entry):
+        self._solutions[fingerprint] = entry
+        self._solutions.move_to_end(fingerprint)
+        while len(self._solutions) > self.maxsize:
+            self._solutions.popitem(last=False)
+            self.evictions += 1
+
+    def _get_metadata_path(self, fingerprint):
+        return os.path.join(self.store.directory, fingerprint + '.json')
+
+    def _store(self, fingerprint, entry):
+        time_, dispatchable_graph = entry
+        metadata = {'time': time_,
+                    'stn_class': type(dispatchable_graph).__name__,
+                    'risk_metric': dispatchable_graph.risk_metric,
+                    'graph': dict(dispatchable_graph.graph)}
+        try:
+            metadata_json = json.dumps(metadata)
+        except (TypeError, ValueError):
+            logger.warning("The solution %s is not stored, its graph attributes cannot be written to json",
+                           fingerprint)
+            return
+        self.store.save(fingerprint, dispatchable_graph)
+        with open(self._get_metadata_path(fingerprint), 'w') as metadata_file:
+            metadata_file.write(metadata_json)
+
+    def _get_stored(self, fingerprint):
+        if self.store is None or fingerprint not in self.store:
+            return None
+        try:
+            with open(self._get_metadata_path(fingerprint)) as metadata_file:
+                metadata = json.load(metadata_file)
+        except (OSError, ValueError):
+            return None
+
+        entry = (metadata['time'], None)
+        if self._is_expired(entry):
+            return None
+        if 'graph' not in metadata:
+            # Stored without its graph attributes
+            return None
+        dispatchable_graph = self.store.load(fingerprint, stn_classes.get(metadata['stn_class'], STN))
+        dispatchable_graph.risk_metric = metadata['risk_metric']
+        dispatchable_graph.graph.update(get_graph_attributes(metadata['graph']))
+        return metadata['time'], dispatchable_graph
+
+
+def get_graph_attributes(graph):
+    """ Returns the graph attributes read from json. Json has no tuples, lists of lists
+    are lists of tuples, as the waits of a dc solution
+    """
+    return {key: [tuple(item) if isinstance(item, list) else item for item in value]
+            if isinstance(value, list) else value
+            for key, value in graph.items()}
@@ -1,9 +1,12 @@
 from stn.stn import STN
+from stn.dense.dense_stn import DenseSTN
 from stn.pstn.pstn import PSTN
 from stn.stnu.stnu import STNU
 from stn.methods.srea import srea
-from stn.methods.fpc import get_minimal_network
-from stn.methods.dsc_lp import DSC_LP
+from stn.methods.fpc import get_minimal_network, get_chain_minimal_network
+from stn.methods.dsc_lp import get_dsc_schedule, dsc_insertions
+from stn.methods.drea import DREA
+from stn.methods.dc import get_dispatchable_stnu
 
 
 class STNFactory(object):
@@ -52,32 +55,39 @@ class STPSolverFactory(object):
         """
         self._solvers[solver_name] = solver
 
-    def get_solver(self, solver_name):
+    def get_solver(self, solver_name, **kwargs):
         """ Returns the class that implements the solver
 
         :param solver_name: solver name
+        :param kwargs: options of the solver, e.g. workers for srea
         :return: class that implements the solver
         """
         solver = self._solvers.get(solver_name)
         if not solver:
             raise ValueError(solver_name)
 
-        return solver()
+        return solver(**kwargs)
 
 
 class StaticRobustExecution(object):
 
-    def __init__(self):
+    def __init__(self, workers=1, canonical=False):
+        """
+        :param workers: number of processes used to try alphas at the same time
+        :param canonical: whether to choose an optimal solution of the LP that does not depend
+        on the LP backend (see stn.methods.srea.srea)
+        """
+        self.workers = workers
+        self.canonical = canonical
         self.compute_dispatchable_graph = self.srea_algorithm
 
-    @staticmethod
-    def srea_algorithm(stn):
+    def srea_algorithm(self, stn):
         """ Computes the dispatchable graph of an stn using the
         srea algorithm
 
         :param stn: stn (object)
         """
-        result = srea(stn, debug=True)
+        result = srea(stn, debug=True, workers=self.workers, canonical=self.canonical)
         if result is None:
             return
         risk_metric, dispatchable_graph = result
@@ -87,9 +97,48 @@ class StaticRobustExecution(object):
         return dispatchable_graph
 
 
+class DynamicRobustExecution(object):
+
+    # The solver keeps the DREA engine of the solved stn, so its solutions are not cached
+    is_cacheable = False
+
+    def __init__(self, risk_threshold=1.0, workers=1):
+        """
+        :param risk_threshold: srea is re-run after each execution event while the
+        risk metric of the guide is above the risk threshold
+        :param workers: number of processes used to try alphas at the same time
+        """
+        self.risk_threshold = risk_threshold
+        self.workers = workers
+        # DREA engine of the last solved stn
+        self.engine = None
+        self.compute_dispatchable_graph = self.drea_algorithm
+
+    def get_engine(self, stn):
+        """ Returns a DREA engine that executes the stn. The engine recomputes
+        the dispatchable graph with srea when execution updates require it
+
+        :param stn: stn (object)
+        """
+        return DREA(stn, risk_threshold=self.risk_threshold, workers=self.workers)
+
+    def drea_algorithm(self, stn):
+        """ Computes the dispatchable graph of an stn using the drea algorithm.
+        Execution updates are given to self.engine
+
+        :param stn: stn (object)
+        """
+        self.engine = self.get_engine(stn)
+        return self.engine.solve()
+
+
 class DegreeStongControllability(object):
 
-    def __init__(self):
+    def __init__(self, workers=1):
+        """
+        :param workers: number of processes used to evaluate task insertions (dsc_insertions)
+        """
+        self.workers = workers
         self.compute_dispatchable_graph = self.dsc_lp_algorithm
 
     @staticmethod
@@ -99,31 +148,59 @@ class DegreeStongControllability(object):
 
         :param stn: stn (object)
         """
-        dsc_lp = DSC_LP(stn)
-        status, bounds, epsilons = dsc_lp.original_lp()
-
-        if epsilons is None:
+        result = get_dsc_schedule(stn)
+        if result is None:
             return
-        original_intervals, shrinked_intervals = dsc_lp.new_interval(epsilons)
 
-        dsc = dsc_lp.compute_dsc(original_intervals, shrinked_intervals)
+        # The dispatchable graph is a schedule because it is an offline approach
+        dsc, schedule = result
 
-        stnu = dsc_lp.get_stnu(bounds)
+        return schedule
 
-        # The dispatchable graph is a schedule because it is an offline approach
-        schedule = dsc_lp.get_schedule(bounds)
+    def dsc_insertions(self, stn, task, positions, temporal_criterion='completion_time', deadline=None):
+        """ Computes the schedule (with its risk metric) and temporal metric of the stn with the
+        task inserted at each of the positions
 
-        # A strongly controllable STNU has a DSC of 1, i.e., a DSC value of 1 is better. We take
-        # 1 − DC to be the risk metric, so that small values are preferable
-        risk_metric = 1 - dsc
+        :param stn: stn (object)
+        :param task: task (object)
+        :param positions: list of positions
+        :param temporal_criterion: 'completion_time', 'makespan' or 'idle_time'
+        :param deadline: time (seconds) to evaluate the positions
+        :return: list of tuples (position, dsc, schedule, temporal_metric), see stn.methods.dsc_lp.dsc_insertions
+        """
+        return dsc_insertions(stn, task, positions, temporal_criterion, self.workers, deadline)
 
-        schedule.risk_metric = risk_metric
 
-        return schedule
+class DynamicControllability(object):
+
+    def __init__(self):
+        self.compute_dispatchable_graph = self.dc_algorithm
+
+    @staticmethod
+    def dc_algorithm(stn):
+        """ Computes the dispatchable graph of an stnu using the
+        dynamic controllability check. The dispatchable graph is executed
+        with stn.methods.dc.DCDispatcher
+
+        :param stn: stnu (object)
+        """
+        dispatchable_graph = get_dispatchable_stnu(stn)
+        if dispatchable_graph is None:
+            return
+        # A dynamically controllable stnu can be executed for all durations of its
+        # contingent constraints
+        risk_metric = 0
+
+        dispatchable_graph.risk_metric = risk_metric
+
+        return dispatchable_graph
 
 
 class FullPathConsistency(object):
 
+    # The solution is the minimal network of the stn
+    uses_minimal_network = True
+
     def __init__(self):
         self.compute_dispatchable_graph = self.fpc_algorithm
 
@@ -144,13 +221,43 @@ class FullPathConsistency(object):
         return dispatchable_graph
 
 
+class ChainPathConsistency(object):
+
+    def __init__(self):
+        self.compute_dispatchable_graph = self.fpc_chain_algorithm
+
+    @staticmethod
+    def fpc_chain_algorithm(stn):
+        """ Computes the dispatchable graph of a chain shaped stn (as built by add_task)
+        with one forward and one backward sweep. Uses full path consistency if the
+        stn is not a chain
+
+        :param stn: stn (object)
+        """
+        dispatchable_graph = get_chain_minimal_network(stn)
+        if dispatchable_graph is None:
+            return
+        risk_metric = 1
+
+        dispatchable_graph.risk_metric = risk_metric
+
+        return dispatchable_graph
+
+
 stn_factory = STNFactory()
 stn_factory.register_stn('fpc', STN)
 stn_factory.register_stn('srea', PSTN)
+stn_factory.register_stn('drea', PSTN)
 stn_factory.register_stn('dsc', STNU)
+stn_factory.register_stn('dc', STNU)
+stn_factory.register_stn('fpc-dense', DenseSTN)
+stn_factory.register_stn('fpc-chain', STN)
 
 stp_solver_factory = STPSolverFactory()
 stp_solver_factory.register_solver('fpc', FullPathConsistency)
+stp_solver_factory.register_solver('fpc-dense', FullPathConsistency)
+stp_solver_factory.register_solver('fpc-chain', ChainPathConsistency)
 stp_solver_factory.register_solver('srea', StaticRobustExecution)
-stp_solver_factory.register_solver('drea', StaticRobustExecution)
-stp_solver_factory.register_solver('dsc', DegreeStongControllability)
\ No newline at end of file
+stp_solver_factory.register_solver('drea', DynamicRobustExecution)
+stp_solver_factory.register_solver('dsc', DegreeStongControllability)
+stp_solver_factory.register_solver('dc', DynamicControllability)
\ No newline at end of file
@@ -0,0 +1,200 @@
+import logging
+
+import numpy as np
+
+from stn.methods.fpc import round_distances
+from stn.stn import STN
+
+
+class DenseSTN(STN):
+    """ Represents a Simple Temporal Network (STN) whose edge weights are stored in a
+    dense float64 distance matrix instead of in the networkx edge attribute dicts
+
+    The networkx graph keeps the topology, the node payloads and the remaining edge
+    attributes (e.g. is_executed). Each node id is mapped to a row (and column) of the
+    weight matrix. Missing edges have weight infinity, the diagonal is 0.
+    """
+    logger = logging.getLogger('stn.dense')
+
+    initial_capacity = 16
+
+    def __init__(self):
+        # The index has to exist before STN.__init__ adds the zero timepoint
+        self._index = dict()
+        self._free_rows = list()
+        self._n_rows = 0
+        self._weights = np.full((self.initial_capacity, self.initial_capacity), np.inf)
+        self._relabeling = False
+        super().__init__()
+
+    def _allocate_row(self, node_id):
+        if node_id in self._index or self._relabeling:
+            return
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._n_rows
+            self._n_rows += 1
+            if row >= self._weights.shape[0]:
+                self._grow(2 * self._weights.shape[0])
+        self._weights[row, :] = np.inf
+        self._weights[:, row] = np.inf
+        self._weights[row, row] = 0.
+        self._index[node_id] = row
+
+    def _release_row(self, node_id):
+        if self._relabeling:
+            return
+        row = self._index.pop(node_id, None)
+        if row is not None:
+            self._weights[row, :] = np.inf
+            self._weights[:, row] = np.inf
+            self._free_rows.append(row)
+
+    def _grow(self, capacity):
+        weights = np.full((capacity, capacity), np.inf)
+        n = self._weights.shape[0]
+        weights[:n, :n] = self._weights
+        self._weights = weights
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._allocate_row(node_for_adding)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes_for_adding = list(nodes_for_adding)
+        super().add_nodes_from(nodes_for_adding, **attr)
+        for n in nodes_for_adding:
+            node_id = n[0] if isinstance(n, tuple) else n
+            self._allocate_row(node_id)
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self._release_row(n)
+
+    def remove_nodes_from(self, nodes):
+        nodes = [n for n in nodes if self.has_node(n)]
+        super().remove_nodes_from(nodes)
+        for n in nodes:
+            self._release_row(n)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        weight = attr.pop('weight', None)
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        if self._relabeling:
+            return
+        self._allocate_row(u_of_edge)
+        self._allocate_row(v_of_edge)
+        if weight is not None:
+            self._set_edge_weight(u_of_edge, v_of_edge, float(weight))
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        for e in ebunch_to_add:
+            if len(e) == 3:
+                u, v, data = e
+                edge_attr = dict(attr)
+                edge_attr.update(data)
+            else:
+                u, v = e
+                edge_attr = dict(attr)
+            self.add_edge(u, v, **edge_attr)
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._weights[self._index[u], self._index[v]] = np.inf
+
+    def get_edge_weight(self, i, j):
+        """ Returns the weight of the edge between node starting_node and node ending_node
+        :param i: starting_node_id
+        :parma ending_node: ending_node_id
+        """
+        if self.has_edge(i, j):
+            return float(self._weights[self._index[i], self._index[j]])
+        else:
+            if i == j and self.has_node(i):
+                return 0
+            else:
+                return float('inf')
+
+    def _set_edge_weight(self, i, j, weight):
+        self._weights[self._index[i], self._index[j]] = weight
+        self._log_edge(i, j)
+
+    def _copy_to(self, stn):
+        stn._index = dict(self._index)
+        stn._free_rows = list(self._free_rows)
+        stn._n_rows = self._n_rows
+        stn._weights = self._weights.copy()
+        stn._relabeling = False
+        super()._copy_to(stn)
+
+    def relabel_nodes(self, mapping):
+        """ Relabels the nodes in place. The rows of the weight matrix are kept,
+        only the node id -> row index is updated
+        """
+        index = {mapping.get(node_id, node_id): row for node_id, row in self._index.items()}
+        self._relabeling = True
+        try:
+            super().relabel_nodes(mapping)
+        finally:
+            self._relabeling = False
+        self._index = index
+
+    def get_weight_matrix(self):
+        """ Returns the node ids and the weight matrix of the stn
+
+        The weight matrix is a copy with one row (and column) per node, in the order
+        given by the returned list of node ids. Missing edges have weight infinity.
+
+        Returns: (list of node ids, np.ndarray)
+        """
+        node_ids = list(self.nodes())
+        rows = [self._index[node_id] for node_id in node_ids]
+        return node_ids, self._weights[np.ix_(rows, rows)]
+
+    def get_edge_arrays(self):
+        """ Returns the edges of the stn as arrays, in the order of self.edges().
+        The weights are read from the weight matrix at once
+
+        Returns: (np.ndarray of source node ids, np.ndarray of target node ids, np.ndarray of weights)
+        """
+        edges = list(self.edges())
+        sources = np.fromiter((i for i, j in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((j for i, j in edges), dtype=np.int64, count=len(edges))
+        rows = np.fromiter((self._index[i] for i, j in edges), dtype=np.intp, count=len(edges))
+        columns = np.fromiter((self._index[j] for i, j in edges), dtype=np.intp, count=len(edges))
+        return sources, targets, self._weights[rows, columns]
+
+    def update_edges_from_matrix(self, node_ids, distances):
+        """ Updates the edges in the STN to reflect the distances in the given matrix
+
+        Writes the tightened weights of all existing edges into the weight matrix at once
+        """
+        index = {node_id: r for r, node_id in enumerate(node_ids)}
+        edges = list(self.edges())
+        if not edges:
+            return
+        sources = np.fromiter((index[i] for i, j in edges), dtype=np.intp, count=len(edges))
+        targets = np.fromiter((index[j] for i, j in edges), dtype=np.intp, count=len(edges))
+        rows = np.fromiter((self._index[i] for i, j in edges), dtype=np.intp, count=len(edges))
+        columns = np.fromiter((self._index[j] for i, j in edges), dtype=np.intp, count=len(edges))
+
+        weights = round_distances(distances[sources, targets])
+        old_weights = self._weights[rows, columns]
+        self._weights[rows, columns] = np.minimum(old_weights, weights)
+        for k in np.flatnonzero(weights < old_weights):
+            self._log_edge(*edges[k])
+
+    def subgraph(self, nodes):
+        """ Returns a DenseSTN with the given nodes and the edges between them
+
+        Unlike networkx.DiGraph.subgraph, the result is a copy and not a view
+        """
+        nodes = [n for n in nodes if self.has_node(n)]
+        node_set = set(nodes)
+        graph = self.__class__()
+        graph.remove_node(0)
+        graph.add_nodes_from((n, dict(self.nodes[n])) for n in nodes)
+        graph.add_edges_from((i, j, dict(data, weight=self.get_edge_weight(i, j)))
+                             for i, j, data in self.edges(data=True) if i in node_set and j in node_set)
+        return graph
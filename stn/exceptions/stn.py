@@ -0,0 +1,8 @@
+class PatchError(Exception):
+
+    def __init__(self, message):
+        """ Raised when a patch cannot be applied to an stn, e.g., because the stn is not at the
+        base version of the patch or because the patched stn diverges from the stn that
+        produced the patch
+        """
+        Exception.__init__(self, message)
@@ -0,0 +1,93 @@
+import logging
+from collections import deque
+
+from stn.methods.fpc import CONSISTENCY_TOLERANCE
+
+
+""" Checks the consistency of an STN by looking for negative cycles in its distance graph
+
+Uses the Shortest Path Faster Algorithm (SPFA), a queue based variant of Bellman-Ford,
+from a virtual source connected to all timepoints with weight 0. The search stops as soon as a
+negative cycle is found, so the all-pairs shortest path distances are never computed.
+
+Worst case O(n*m), but on consistent STNs the queue empties after a few passes.
+"""
+
+logger = logging.getLogger('stn.consistency')
+
+
+def find_negative_cycle(stn, tolerance=CONSISTENCY_TOLERANCE):
+    """ Returns a negative cycle of the stn as a list of node ids, or None if the stn is consistent
+
+    A distance is only improved if the improvement is larger than tolerance / n, so that
+    negative cycles whose weight is above -tolerance (e.g. due to rounding) are not reported,
+    while any cycle with weight below -tolerance is.
+
+    :param stn: stn (object)
+    :param tolerance: (float) tolerance on the weight of negative cycles
+    """
+    node_ids = list(stn.nodes())
+    n = len(node_ids)
+    if n == 0:
+        return
+    index = {node_id: k for k, node_id in enumerate(node_ids)}
+    successors = [[(index[j], stn.get_edge_weight(i, j)) for j in stn.successors(i)] for i in node_ids]
+
+    epsilon = tolerance / n
+    # Distances from the virtual source
+    distances = [0.] * n
+    # Number of edges in the shortest path from the virtual source (excluding the source edge)
+    lengths = [0] * n
+    predecessors = [None] * n
+    queue = deque(range(n))
+    in_queue = [True] * n
+
+    while queue:
+        u = queue.popleft()
+        in_queue[u] = False
+        distance_u = distances[u]
+        for v, weight in successors[u]:
+            if distance_u + weight < distances[v] - epsilon:
+                distances[v] = distance_u + weight
+                predecessors[v] = u
+                lengths[v] = lengths[u] + 1
+                if lengths[v] >= n:
+                    cycle = _get_cycle(predecessors, v)
+                    if cycle is not None:
+                        return [node_ids[k] for k in cycle]
+                if not in_queue[v]:
+                    queue.append(v)
+                    in_queue[v] = True
+
+
+def _get_cycle(predecessors, v):
+    """ Returns the cycle in the predecessor graph reached by walking back from v,
+    or None if the walk does not reach a cycle
+    """
+    visited = dict()
+    step = 0
+    while v is not None and v not in visited:
+        visited[v] = step
+        step += 1
+        v = predecessors[v]
+    if v is None:
+        return
+    # The walk follows the edges backwards
+    cycle = list(visited)[visited[v]:]
+    cycle.reverse()
+    return cycle
+
+
+def is_consistent(stn, return_cycle=False):
+    """ The STN is not consistent if it has negative cycles
+
+    :param stn: stn (object)
+    :param return_cycle: (bool) if True, also returns the negative cycle (list of node ids) or None
+    :return: bool or (bool, cycle)
+    """
+    cycle = find_negative_cycle(stn)
+    if cycle is not None:
+        logger.debug("Negative cycle: %s", cycle)
+    if return_cycle:
+        return cycle is None, cycle
+    return cycle is None
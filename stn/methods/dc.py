@@ -0,0 +1,268 @@
+import heapq
+import itertools
+import logging
+
+import numpy as np
+
+from stn.methods.fpc import floyd_warshall, CONSISTENCY_TOLERANCE
+
+""" Dynamic controllability (DC) of STNUs
+
+An STNU is dynamically controllable if its requirement timepoints can be scheduled while it is
+executed, reacting to the observed durations of the contingent constraints, so that all
+constraints hold for all durations. Checked with the O(n^3) algorithm in:
+
+Paul Morris. Dynamic Controllability and Dispatchability Relationships. In Integration of AI
+and OR Techniques in Constraint Programming (CPAIOR), 2014.
+
+The STNU is represented as a labeled distance graph. A contingent constraint A => C with
+bounds [l, u] gives the ordinary edges A -> C (u) and C -> A (-l), a lower-case edge A -> C (l)
+and an upper-case edge C -> A (-u). Paths are propagated backwards from each negative node
+(node with negative incoming edges) until their distance is non-negative, and the propagation
+of a negative node that is reached is done first. The STNU is not DC if a negative node is
+reached again while its own propagation is running, i.e., if there is a negative cycle (with
+the tolerance used to check the consistency of stns).
+
+The dispatchable STNU has the edges derived by the propagation and is minimal, i.e., its
+ordinary edges are the shortest path distances. Paths that start with an upper-case edge
+C -> A and end at a requirement timepoint B with a negative distance -w are waits: B cannot be
+executed before t_A + w unless C has been executed. The waits are kept in
+dispatchable_stnu.graph['waits'] as a list of (B, A, C, w) and used by DCDispatcher.
+"""
+
+logger = logging.getLogger('stn.dc')
+
+
+def get_labeled_in_edges(stnu):
+    """ Returns the incoming edges of each node in the labeled distance graph of the stnu
+
+    returns a dictionary {node_id: [(start node, weight, label), ...]}. The label is
+    ('lower', C) for lower-case edges, ('upper', C) for upper-case edges and None for ordinary
+    edges
+    """
+    in_edges = {node_id: list() for node_id in stnu.nodes()}
+    for i, j, weight in stnu.edges(data='weight'):
+        if i != j and weight != float('inf'):
+            in_edges[j].append((i, float(weight), None))
+    for (a, c) in stnu.get_contingent_constraints():
+        in_edges[c].append((a, -stnu.get_edge_weight(c, a), ('lower', c)))
+        in_edges[a].append((c, -stnu.get_edge_weight(a, c), ('upper', c)))
+    return in_edges
+
+
+class DCBackpropagation(object):
+    """ Propagates the negative edges of the labeled distance graph of an stnu (see module docstring)
+    """
+
+    def __init__(self, stnu, tolerance=CONSISTENCY_TOLERANCE):
+        self.tolerance = tolerance
+        self.in_edges = get_labeled_in_edges(stnu)
+        self.contingent_timepoints = set(stnu.get_contingent_timepoints())
+        self.negative_nodes = {node_id for node_id, edges in self.in_edges.items()
+                               if any(weight < 0 for start, weight, label in edges)}
+        # {(i, j): weight} of the ordinary edges derived by the propagation
+        self.edges = dict()
+        # {(node, activation, contingent): wait}
+        self.waits = dict()
+        # Negative nodes whose propagation is running, and the distance at which each of them
+        # was reached in the propagation of the previous one
+        self._running = list()
+        self._distances = list()
+        self._done = set()
+
+    def is_dc(self):
+        for node_id in sorted(self.negative_nodes):
+            if not self.backpropagate(node_id):
+                return False
+        return True
+
+    def add_edge(self, i, j, weight):
+        if weight < self.edges.get((i, j), float('inf')):
+            self.edges[(i, j)] = weight
+
+    def backpropagate(self, source):
+        """ Propagates the paths that end at source with a negative edge
+
+        Non-negative derived edges are added to the graph, so that they are used by the next
+        propagations. Returns False if the stnu is not DC
+        """
+        if source in self._done:
+            return True
+        self._running.append(source)
+
+        # The distance of a node depends on the contingent timepoint of the upper-case
+        # edge that starts the path (None if the path starts with an ordinary edge)
+        distances = {(source, None): 0.}
+        queue = list()
+        # Breaks ties in the queue
+        counter = itertools.count()
+        for start, weight, label in self.in_edges[source]:
+            if weight >= 0 or (label is not None and label[0] == 'lower'):
+                continue
+            key = (start, label[1] if label is not None else None)
+            if weight < distances.get(key, float('inf')):
+                distances[key] = weight
+                heapq.heappush(queue, (weight, next(counter), start, key[1]))
+
+        new_edges = list()
+        while queue:
+            distance, _, node_id, contingent = heapq.heappop(queue)
+            if distance > distances[(node_id, contingent)]:
+                continue
+            if distance >= 0:
+                new_edges.append((node_id, distance))
+                continue
+            if node_id in self._running:
+                k = self._running.index(node_id)
+                if distance + sum(self._distances[k:]) < -self.tolerance:
+                    logger.debug("Negative node %s is in a negative cycle", node_id)
+                    return False
+                continue
+            if contingent is None:
+                self.add_edge(node_id, source, distance)
+            elif node_id not in self.contingent_timepoints:
+                key = (node_id, source, contingent)
+                self.waits[key] = max(self.waits.get(key, -float('inf')), -distance)
+
+            if node_id in self.negative_nodes and node_id not in self._done:
+                self._distances.append(distance)
+                is_dc = self.backpropagate(node_id)
+                self._distances.pop()
+                if not is_dc:
+                    return False
+
+            for start, weight, label in self.in_edges[node_id]:
+                if weight < 0:
+                    continue
+                # The lower-case edge of the contingent constraint whose upper-case
+                # edge starts the path cannot be used
+                if label is not None and label[0] == 'lower' and label[1] == contingent:
+                    continue
+                key = (start, contingent)
+                if distance + weight < distances.get(key, float('inf')):
+                    distances[key] = distance + weight
+                    heapq.heappush(queue, (distance + weight, next(counter), start, contingent))
+
+        for node_id, distance in new_edges:
+            if node_id != source:
+                self.add_edge(node_id, source, distance)
+                self.in_edges[source].append((node_id, distance, None))
+
+        self._running.pop()
+        self._done.add(source)
+        return True
+
+
+def get_dispatchable_stnu(stnu, tolerance=CONSISTENCY_TOLERANCE):
+    """ Returns a dispatchable copy of the stnu if it is dynamically controllable or None otherwise
+
+    The copy has the edges derived by the DC check and its waits in graph['waits'], see the
+    module docstring
+
+    :param stnu: stnu (object)
+    :param tolerance: (float) tolerance on the weight of negative cycles
+    """
+    backpropagation = DCBackpropagation(stnu, tolerance)
+    if not backpropagation.is_dc():
+        logger.debug("The stnu is not dynamically controllable")
+        return None
+
+    dispatchable_stnu = stnu.clone()
+    for (i, j), weight in backpropagation.edges.items():
+        if not dispatchable_stnu.has_edge(i, j):
+            dispatchable_stnu.add_edge(i, j, weight=weight, is_executed=False, is_contingent=False)
+            if not dispatchable_stnu.has_edge(j, i):
+                dispatchable_stnu.add_edge(j, i, weight=float('inf'), is_executed=False, is_contingent=False)
+        elif not dispatchable_stnu[i][j].get('is_contingent'):
+            dispatchable_stnu.update_edge_weight(i, j, weight)
+
+    node_ids, distances = dispatchable_stnu.get_weight_matrix()
+    floyd_warshall(distances)
+    if not np.all(np.diagonal(distances) >= -tolerance):
+        logger.debug("The stnu is not dynamically controllable")
+        return None
+
+    # The bounds of the contingent constraints cannot be tightened
+    index = {node_id: k for k, node_id in enumerate(node_ids)}
+    for (a, c) in dispatchable_stnu.get_contingent_constraints():
+        for i, j in ((a, c), (c, a)):
+            weight = dispatchable_stnu.get_edge_weight(i, j)
+            if distances[index[i], index[j]] < weight - tolerance:
+                logger.debug("The stnu is not dynamically controllable: %s => %s is squeezed", a, c)
+                return None
+            distances[index[i], index[j]] = np.inf
+
+    dispatchable_stnu.update_edges_from_matrix(node_ids, distances)
+    dispatchable_stnu.graph['waits'] = [(node_id, activation, contingent, wait) for
+                                        (node_id, activation, contingent), wait in
+                                        sorted(backpropagation.waits.items())]
+    return dispatchable_stnu
+
+
+def is_dynamically_controllable(stnu):
+    return get_dispatchable_stnu(stnu) is not None
+
+
+class DCDispatcher(object):
+    """ Dispatches a dispatchable stnu (see get_dispatchable_stnu)
+
+    The requirement timepoints are executed when they are enabled and within their window. The
+    windows are updated with the times at which timepoints are executed, including the observed
+    times of the contingent timepoints, without solving the stnu again
+    """
+
+    def __init__(self, dispatchable_stnu):
+        self.stnu = dispatchable_stnu.clone()
+        self.node_ids, self.distances = self.stnu.get_minimal_distances()
+        self.index = {node_id: k for k, node_id in enumerate(self.node_ids)}
+        self.contingent_timepoints = set(self.stnu.get_contingent_timepoints())
+        self.waits = self.stnu.graph.get('waits', list())
+        # {node_id: time} of the executed timepoints
+        self.execution_times = {0: 0.}
+
+    def get_window(self, node_id):
+        """ Returns the (earliest, latest) time at which node_id can be executed given the
+        executed timepoints and the waits of the contingent timepoints that have not been
+        observed. The window is updated when a contingent timepoint is observed, which
+        happens before its wait ends
+        """
+        k = self.index[node_id]
+        executed = [self.index[i] for i in self.execution_times]
+        times = np.fromiter(self.execution_times.values(), dtype=float, count=len(executed))
+        earliest = float(np.max(times - self.distances[k, executed]))
+        latest = float(np.min(times + self.distances[executed, k]))
+        for wait_node_id, activation, contingent, wait in self.waits:
+            if wait_node_id == node_id and activation in self.execution_times \
+                    and contingent not in self.execution_times:
+                earliest = max(earliest, self.execution_times[activation] + wait)
+        return earliest, latest
+
+    def is_enabled(self, node_id):
+        """ A requirement timepoint is enabled if the timepoints that must be executed before
+        it have been executed
+        """
+        if node_id in self.execution_times or node_id in self.contingent_timepoints:
+            return False
+        k = self.index[node_id]
+        return all(i in self.execution_times for i in self.node_ids
+                   if i != node_id and self.distances[k, self.index[i]] < 0)
+
+    def get_enabled_timepoints(self):
+        return [node_id for node_id in self.node_ids if self.is_enabled(node_id)]
+
+    def execute_timepoint(self, node_id, time_):
+        """ Executes the requirement timepoint node_id or observes the contingent timepoint
+        node_id at time_
+        """
+        if node_id in self.execution_times:
+            raise ValueError("Node {} was already executed".format(node_id))
+        if node_id not in self.contingent_timepoints:
+            if not self.is_enabled(node_id):
+                raise ValueError("Node {} is not enabled".format(node_id))
+            earliest, latest = self.get_window(node_id)
+            if not earliest - CONSISTENCY_TOLERANCE <= time_ <= latest + CONSISTENCY_TOLERANCE:
+                raise ValueError("Node {} cannot be executed at {}, window: [{}, {}]".format(
+                    node_id, time_, earliest, latest))
+        self.execution_times[node_id] = time_
+        self.stnu.assign_timepoint(time_, node_id, force=True)
+        self.stnu.execute_timepoint(node_id)
@@ -0,0 +1,131 @@
+import logging
+
+from stn.methods.srea import srea
+
+""" Dynamic Robust Execution Algorithm (DREA)
+
+Executes a PSTN with a guide (dispatchable graph) computed by SREA, and recomputes the guide
+while the PSTN is executed. Based on:
+
+Kyle Lund, Sam Dietrich, Scott Chow, and James Boerkoel. Robust Execution of Probabilistic
+Temporal Plans. In Proceedings of the 31st AAAI Conference on Artificial Intelligence, 2017.
+
+Running SREA after every execution event is expensive, so SREA is only re-run when:
+- a timepoint is executed outside of its bounds in the guide, or the observed duration of a
+  constraint is outside of its bounds in the guide
+- the risk metric (alpha) of the guide is above the risk threshold
+
+SREA is re-run on the timepoints that have not been executed. Executed timepoints are kept only
+if they are constrained with timepoints that have not been executed. Their time is fixed to
+the time at which they were executed.
+"""
+
+
+class DREA(object):
+
+    logger = logging.getLogger('stn.drea')
+
+    def __init__(self, pstn, risk_threshold=1.0, workers=1, lp_solver=None):
+        """
+        :param pstn: pstn (object) to execute. The DREA keeps its own copy
+        :param risk_threshold: SREA is re-run after each execution event while the risk
+        metric of the guide is above the risk threshold
+        :param workers: number of processes used by SREA
+        :param lp_solver: name of the LP backend used by SREA (see stn.methods.lp)
+        """
+        self.pstn = pstn.clone()
+        self.risk_threshold = risk_threshold
+        self.workers = workers
+        self.lp_solver = lp_solver
+        self.guide = None
+        self.risk_metric = None
+        # Number of times SREA was run
+        self.n_solves = 0
+        # {node_id: time} of the executed timepoints
+        self.execution_times = dict()
+
+    def solve(self):
+        """ Runs SREA on the timepoints that have not been executed
+
+        Returns the guide (dispatchable graph) or None if SREA could not find a guide
+        """
+        pstn = self.get_unexecuted_pstn()
+        result = srea(pstn, workers=self.workers, lp_solver=self.lp_solver)
+        self.n_solves += 1
+        if result is None:
+            self.logger.warning("SREA could not find a guide")
+            self.guide = None
+            self.risk_metric = None
+            return None
+
+        alpha, guide = result
+        guide.risk_metric = alpha
+        self.guide = guide
+        self.risk_metric = alpha
+        self.logger.debug("Guide with risk metric %s", alpha)
+        return guide
+
+    def get_unexecuted_pstn(self):
+        """ Returns a copy of the pstn with the timepoints that have not been executed and
+        the executed timepoints constrained with them. Constraints between executed
+        timepoints are removed
+        """
+        pstn = self.pstn.clone()
+        executed = {node_id for node_id in self.execution_times if pstn.has_node(node_id)}
+        pstn.remove_edges_from([(i, j) for (i, j) in pstn.edges() if i in executed and j in executed])
+        pstn.remove_nodes_from([node_id for node_id in executed
+                                if not any(j not in executed for j in pstn.successors(node_id) if j != 0)
+                                and not any(i not in executed for i in pstn.predecessors(node_id) if i != 0)])
+        return pstn
+
+    def assign_timepoint(self, allotted_time, node_id):
+        """ Records the time at which the timepoint node_id is executed. The timepoint is
+        executed by execute_timepoint
+        """
+        self.pstn.assign_timepoint(allotted_time, node_id, force=True)
+        self.execution_times[node_id] = allotted_time
+
+    def execute_timepoint(self, node_id, allotted_time=None):
+        """ Executes the timepoint node_id at the time given by assign_timepoint or at allotted_time
+
+        SREA is re-run if the execution is not within the bounds of the guide or if the risk
+        metric of the guide is above the risk threshold.
+
+        Returns True if SREA was re-run
+        """
+        if allotted_time is not None:
+            self.assign_timepoint(allotted_time, node_id)
+        elif node_id not in self.execution_times:
+            raise ValueError("Node {} has no assigned time".format(node_id))
+        self.pstn.execute_timepoint(node_id)
+
+        within_guide = self.is_within_guide(node_id)
+        if within_guide:
+            time_ = self.execution_times[node_id]
+            self.guide.assign_timepoint(time_, node_id, force=True)
+            self.guide.execute_timepoint(node_id)
+
+        if not within_guide or self.risk_metric > self.risk_threshold:
+            self.logger.debug("Re-running SREA after executing node %s (within guide: %s, risk metric: %s)",
+                              node_id, within_guide, self.risk_metric)
+            self.solve()
+            return True
+        return False
+
+    def is_within_guide(self, node_id):
+        """ Returns True if the time at which node_id was executed and the durations of the
+        constraints between node_id and the executed timepoints are within the bounds of the guide
+        """
+        if self.guide is None or not self.guide.has_node(node_id):
+            return False
+        time_ = self.execution_times[node_id]
+        if not -self.guide.get_edge_weight(node_id, 0) <= time_ <= self.guide.get_edge_weight(0, node_id):
+            return False
+
+        for i in self.guide.predecessors(node_id):
+            if i == 0 or i not in self.execution_times:
+                continue
+            duration = time_ - self.execution_times[i]
+            if not -self.guide.get_edge_weight(node_id, i) <= duration <= self.guide.get_edge_weight(i, node_id):
+                return False
+        return True
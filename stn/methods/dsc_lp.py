@@ -22,13 +22,19 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-import copy
-
 import pulp
 import sys
 import logging
+import time
+from concurrent.futures import wait
 from math import ceil
 
+import numpy as np
+
+from stn.methods.lp import SparseLP, STNArrays, get_lp_solver, replace_infinite_weights
+from stn.methods.strong_controllability import get_strongly_controllable_bounds, has_requirement_schedule
+from stn.utils.pool import get_pool
+
 """
 Computes the Degree of Strong Controllability (DSC) using an LP program as presented in:
 
@@ -39,12 +45,23 @@ Proceedings of the 29th International Conference on Automated Planning and Sched
 MAX_FLOAT = sys.float_info.max
 
 
+def get_value(bound):
+    """ Returns the value of an LP variable or the bound itself if it is a number
+    """
+    return getattr(bound, 'varValue', bound)
+
+
 class DSC_LP(object):
 
     logger = logging.getLogger('stn.dsc_lp')
 
-    def __init__(self, stnu):
-        self.stnu = copy.deepcopy(stnu)
+    def __init__(self, stnu, lp_solver=None):
+        """
+        stnu           The STNU
+        lp_solver      Name of the LP backend (see stn.methods.lp), defaults to HiGHS
+        """
+        self.stnu = stnu.clone()
+        self.lp_solver = lp_solver
         self.constraints = stnu.get_constraints()
         self.contingent_constraints = stnu.get_contingent_constraints()
         self.contingent_timepoints = stnu.get_contingent_timepoints()
@@ -66,72 +83,81 @@ class DSC_LP(object):
         return   A tuple (bounds, deltas, prob) where bounds and
                   deltas are dictionaries of LP variables, and prob is the LP problem instance
         """
-        bounds = {}
-        epsilons = {}
-
         # Maximize for super and minimize for Subinterval
         if maxmin:
-            prob = pulp.LpProblem('SuperInterval LP', pulp.LpMaximize)
+            prob = SparseLP('SuperInterval LP', pulp.LpMaximize)
         else:
-            prob = pulp.LpProblem('Max Subinterval LP', pulp.LpMinimize)
+            prob = SparseLP('Max Subinterval LP', pulp.LpMinimize)
 
         # NOTE: Our LP requires each event to occur within a finite interval.
         # If the input LP does not have finite interval specified for all events, we want to set the setMakespan to MAX_FLOAT (infinity) so the LP works
+        # (STNArrays replaces infinite edge weights with MAX_FLOAT)
         #
         # We do not want to run minimal network first because we are going to modify the contingent edges in LP, while some constraints in  minimal network are obtained through contingent edges
         #
         # There might be better way to deal with this problem.
         # ##
-        for (i, j) in self.stnu.edges():
-            weight = self.stnu.get_edge_weight(i, j)
-            if weight == float('inf'):
-                self.stnu.update_edge_weight(i, j, MAX_FLOAT)
+        arrays = STNArrays(self.stnu)
+        node_ids = arrays.node_ids.tolist()
 
         # Store Original STN edges and objective variables for easy access. Not part of LP yet
+        hi = prob.add_variables(['t_%i_hi' % i for i in node_ids], 0, arrays.latest)
+        lowbound = np.where(arrays.earliest == -np.inf, 0, arrays.earliest)
+        lo = prob.add_variables(['t_%i_lo' % i for i in node_ids], lowbound, None)
 
-        for i in self.stnu.nodes():
-            bounds[(i, '+')] = pulp.LpVariable('t_%i_hi'%i, lowBound=0,
-                                                upBound=self.stnu.get_edge_weight(0, i))
-
-            lowbound = 0 if self.stnu.get_edge_weight(i, 0) == float('inf') else\
-                                -self.stnu.get_edge_weight(i, 0)
-
-            bounds[(i,'-')] = pulp.LpVariable('t_%i_lo'%i, lowBound=lowbound, upBound=None)
+        prob.add_constraints(np.column_stack([lo, hi]), [1, -1], pulp.LpConstraintLE, 0)
 
-            self.add_constraint(bounds[(i, '-')] <= bounds[(i, '+')], prob)
+        if 0 in arrays.position:
+            zero = arrays.position[0]
+            prob.add_constraints([[lo[zero]], [hi[zero]]], 1, pulp.LpConstraintEQ, 0)
 
-            if i == 0:
-                self.add_constraint(bounds[(i, '-')] == 0, prob)
-                self.add_constraint(bounds[(i, '+')] == 0, prob)
+        contingent_timepoints = set(self.contingent_timepoints)
+        requirement = np.array([i not in contingent_timepoints for i in node_ids], dtype=bool)
+        prob.add_constraints(np.column_stack([lo[requirement], hi[requirement]]), [1, -1],
+                             pulp.LpConstraintEQ, 0)
 
-            if i not in self.contingent_timepoints:
-                self.add_constraint(bounds[(i, '-')] == bounds[(i, '+')], prob)
+        bounds = dict()
+        for i, variable_hi, variable_lo in zip(node_ids, prob.get_variables(hi), prob.get_variables(lo)):
+            bounds[(i, '+')] = variable_hi
+            bounds[(i, '-')] = variable_lo
 
+        epsilons = dict()
         if proportion:
             return (bounds, epsilons, prob)
 
-        for (i, j) in self.constraints:
-            if (i, j) in self.contingent_constraints:
-
-                epsilons[(j, '+')] = pulp.LpVariable('eps_%i_hi' % j, lowBound=0, upBound=None)
-
-                epsilons[(j, '-')] = pulp.LpVariable('eps_%i_lo' % j, lowBound=0, upBound=None)
-
-                self.add_constraint(bounds[(j, '+')]-bounds[(i, '+')] ==
-                        self.stnu.get_edge_weight(i, j) - epsilons[(j,'+')], prob)
-                self.add_constraint(bounds[(j, '-')]-bounds[(i, '-')] ==
-                        -self.stnu.get_edge_weight(j, i) + epsilons[(j, '-')], prob)
-
-            else:
-                # NOTE: We need to handle the infinite weight edges. Otherwise the LP would be infeasible
-                upbound = MAX_FLOAT if self.stnu.get_edge_weight(i, j) == float('inf') \
-                            else self.stnu.get_edge_weight(i, j)
-
-                lowbound = MAX_FLOAT if self.stnu.get_edge_weight(j, i) == float('inf') \
-                            else self.stnu.get_edge_weight(j, i)
-
-                self.add_constraint(bounds[(j, '+')]-bounds[(i, '-')] <= upbound, prob)
-                self.add_constraint(bounds[(i, '+')]-bounds[(j, '-')] <= lowbound, prob)
+        contingent = arrays.is_contingent
+        targets = arrays.targets[contingent].tolist()
+        eps_hi = prob.add_variables(['eps_%i_hi' % j for j in targets], 0, None)
+        eps_lo = prob.add_variables(['eps_%i_lo' % j for j in targets], 0, None)
+        for j, variable_hi, variable_lo in zip(targets, prob.get_variables(eps_hi), prob.get_variables(eps_lo)):
+            epsilons[(j, '+')] = variable_hi
+            epsilons[(j, '-')] = variable_lo
+
+        i = arrays.get_positions(arrays.sources[contingent])
+        j = arrays.get_positions(arrays.targets[contingent])
+        # t_j_hi - t_i_hi = w(i, j) - eps_j_hi and t_j_lo - t_i_lo = -w(j, i) + eps_j_lo
+        columns = np.empty((2 * len(i), 3), dtype=np.intp)
+        coefficients = np.empty((2 * len(i), 3))
+        rhs = np.empty(2 * len(i))
+        columns[0::2] = np.column_stack([hi[j], hi[i], eps_hi])
+        coefficients[0::2] = [1, -1, 1]
+        rhs[0::2] = arrays.weights[contingent]
+        columns[1::2] = np.column_stack([lo[j], lo[i], eps_lo])
+        coefficients[1::2] = [1, -1, -1]
+        rhs[1::2] = -arrays.reverse_weights[contingent]
+        prob.add_constraints(columns, coefficients, pulp.LpConstraintEQ, rhs)
+
+        # NOTE: We need to handle the infinite weight edges. Otherwise the LP would be infeasible
+        i = arrays.get_positions(arrays.sources[~contingent])
+        j = arrays.get_positions(arrays.targets[~contingent])
+        columns = np.empty((2 * len(i), 2), dtype=np.intp)
+        rhs = np.empty(2 * len(i))
+        columns[0::2] = np.column_stack([hi[j], lo[i]])
+        rhs[0::2] = arrays.weights[~contingent]
+        columns[1::2] = np.column_stack([hi[i], lo[j]])
+        rhs[1::2] = np.where(arrays.reverse_weights[~contingent] == np.inf, MAX_FLOAT,
+                             arrays.reverse_weights[~contingent])
+        prob.add_constraints(columns, [1, -1], pulp.LpConstraintLE, rhs)
 
         return (bounds, epsilons, prob)
 
@@ -150,25 +176,25 @@ class DSC_LP(object):
 
         # Set up objective function for the LP
         if naive_obj:
-            obj = sum([epsilons[(i, j)] for i, j in epsilons])
+            prob.set_objective([epsilon.index for epsilon in epsilons.values()], 1)
         else:
-            eps = list()
+            columns = list()
+            coefficients = list()
 
             for i, j in self.contingent_constraints:
-                c = self.stnu[i][j]['weight'] + self.stnu[j][i]['weight']
-
-                eps.append((epsilons[(j, '+')]+epsilons[j, '-'])/c)
-            obj = sum(eps)
+                c = self.stnu.get_edge_weight(i, j) + self.stnu.get_edge_weight(j, i)
 
-        prob += obj, "Maximize the Super-Interval/Max-Subinterval for the input STN"
+                columns += [epsilons[(j, '+')].index, epsilons[(j, '-')].index]
+                coefficients += [1 / c, 1 / c]
+            prob.set_objective(columns, coefficients)
 
         # write LP into file for debugging (optional)
+        solver = get_lp_solver(self.lp_solver, msg=debug)
         if debug:
             prob.writeLP('original.lp')
-            pulp.LpSolverDefault.msg = 10
 
         try:
-            prob.solve()
+            prob.solve(solver)
         except Exception:
             self.logger.error("The model is invalid.")
             return 'Invalid', None, None
@@ -197,14 +223,14 @@ class DSC_LP(object):
         shrinked = list()
 
         for (i, j) in self.contingent_constraints:
-            orig = (-self.stnu[j][i]['weight'], self.stnu[i][j]['weight'])
+            orig = (-self.stnu.get_edge_weight(j, i), self.stnu.get_edge_weight(i, j))
             original.append(orig)
 
             low = epsilons[(j, '-')].varValue
             high = epsilons[(j, '+')].varValue
 
             self.stnu.shrink_contingent_constraint(i, j, low, high)
-            new = (-self.stnu[j][i]['weight'], self.stnu[i][j]['weight'])
+            new = (-self.stnu.get_edge_weight(j, i), self.stnu.get_edge_weight(i, j))
             shrinked.append(new)
 
         return original, shrinked
@@ -233,10 +259,10 @@ class DSC_LP(object):
         for i, sign in bounds:
             if sign == '+':
                 self.stnu.update_edge_weight(
-                    0, i, ceil(bounds[(i, '+')].varValue))
+                    0, i, ceil(get_value(bounds[(i, '+')])))
             else:
                 self.stnu.update_edge_weight(
-                    i, 0, ceil(-bounds[(i, '-')].varValue))
+                    i, 0, ceil(-get_value(bounds[(i, '-')])))
 
         return self.stnu
 
@@ -247,12 +273,152 @@ class DSC_LP(object):
 
         for i in self.stnu.nodes():
             if i not in self.contingent_timepoints:
-                time = (bounds[(i, '-')].varValue + bounds[(i, '+')].varValue)/2
+                time = (get_value(bounds[(i, '-')]) + get_value(bounds[(i, '+')]))/2
                 self.stnu.update_edge_weight(0, i, time)
                 self.stnu.update_edge_weight(i, 0, -time)
             else:
                 # time = bounds[(i, '+')].varValue
-                self.stnu.update_edge_weight(0, i, bounds[(i, '+')].varValue)
-                self.stnu.update_edge_weight(i, 0, -bounds[(i, '-')].varValue)
+                self.stnu.update_edge_weight(0, i, get_value(bounds[(i, '+')]))
+                self.stnu.update_edge_weight(i, 0, -get_value(bounds[(i, '-')]))
 
         return self.stnu
+
+
+def get_dsc_schedule(stnu, lp_solver=None):
+    """ Computes the degree of strong controllability (DSC) of the stnu and an offline
+    solution (schedule)
+
+    The LP is not run if the stnu is strongly controllable (DSC of 1) or if the constraints
+    between its requirement timepoints are not consistent (the LP has no solution), see
+    stn.methods.strong_controllability
+
+    returns a tuple (dsc, schedule) or None if the LP has no solution
+    """
+    dsc_lp = DSC_LP(stnu, lp_solver)
+    if not has_requirement_schedule(dsc_lp.stnu):
+        DSC_LP.logger.debug("The requirement timepoints cannot be scheduled")
+        return None
+
+    bounds = get_strongly_controllable_bounds(dsc_lp.stnu)
+    if bounds is not None:
+        replace_infinite_weights(dsc_lp.stnu)
+        dsc = 1.0
+    else:
+        status, bounds, epsilons = dsc_lp.original_lp()
+
+        if epsilons is None:
+            return None
+        original_intervals, shrinked_intervals = dsc_lp.new_interval(epsilons)
+
+        dsc = dsc_lp.compute_dsc(original_intervals, shrinked_intervals)
+
+    dsc_lp.get_stnu(bounds)
+
+    # The dispatchable graph is a schedule because it is an offline approach
+    schedule = dsc_lp.get_schedule(bounds)
+
+    # A strongly controllable STNU has a DSC of 1, i.e., a DSC value of 1 is better. We take
+    # 1 − DC to be the risk metric, so that small values are preferable
+    schedule.risk_metric = 1 - dsc
+
+    return dsc, schedule
+
+
+def dsc_insertions(stnu, task, positions, temporal_criterion='completion_time', workers=1, deadline=None,
+                   lp_solver=None):
+    """ Computes the DSC, schedule and temporal metric of the stnu with the task inserted at
+    each of the positions. The stnu is not modified
+
+    If workers > 1 or if there is a deadline, the positions are split among the processes of a
+    process pool. Each process gets the stnu (binary format) once, with its share of the
+    positions, and inserts the task in a copy of it for each position
+
+    :param stnu: stnu (object)
+    :param task: task (object) to insert
+    :param positions: list of positions (see STN.add_task)
+    :param temporal_criterion: 'completion_time', 'makespan' or 'idle_time'
+    :param workers: number of processes
+    :param deadline: time (seconds) to evaluate the positions. The results are returned when the
+    deadline is reached, even if an LP is still running: the positions of a process that has
+    not finished its share by then are not evaluated. The positions are evaluated in the
+    process pool even if workers is 1, so that a running LP does not delay the results
+    :param lp_solver: name of the LP backend (see stn.methods.lp)
+
+    returns a list of tuples (position, dsc, schedule, temporal_metric), in the order of the
+    positions. dsc, schedule and temporal_metric are None if the LP has no solution or the
+    position was not evaluated within the deadline
+    """
+    # Wall-clock time, shared by the worker processes
+    end_time = None if deadline is None else time.time() + deadline
+    results = [(position, None, None, None) for position in positions]
+    n_evaluated = 0
+
+    if workers > 1 or end_time is not None:
+        pool = get_pool(workers)
+        shares = [list(range(k, len(positions), workers)) for k in range(min(workers, len(positions)))]
+        stnu_binary = stnu.to_binary()
+        futures = [pool.submit(evaluate_insertions_worker, stnu.__class__, stnu_binary, task,
+                               [positions[k] for k in share], temporal_criterion, lp_solver, end_time)
+                   for share in shares]
+        done, not_done = wait(futures, timeout=None if end_time is None else max(end_time - time.time(), 0.))
+        for future in not_done:
+            # A running process stops before its next position, as end_time has passed
+            future.cancel()
+        for share, future in zip(shares, futures):
+            if future not in done:
+                continue
+            share_results = future.result()
+            n_evaluated += len(share_results)
+            for k, result in zip(share, share_results):
+                if result is not None:
+                    dsc, schedule_binary, temporal_metric = result
+                    schedule = stnu.__class__.from_binary(schedule_binary)
+                    schedule.risk_metric = 1 - dsc
+                    results[k] = (positions[k], dsc, schedule, temporal_metric)
+    else:
+        for k, position in enumerate(positions):
+            result = evaluate_insertion(stnu, task, position, temporal_criterion, lp_solver)
+            n_evaluated += 1
+            if result is not None:
+                results[k] = (position,) + result
+
+    if n_evaluated < len(positions):
+        DSC_LP.logger.warning("Deadline reached, %s positions were not evaluated", len(positions) - n_evaluated)
+    return results
+
+
+def evaluate_insertion(stnu, task, position, temporal_criterion='completion_time', lp_solver=None):
+    """ Computes the DSC, schedule and temporal metric of a copy of the stnu with the task
+    inserted at the position
+
+    returns a tuple (dsc, schedule, temporal_metric) or None if the LP has no solution
+    """
+    stnu = stnu.clone()
+    stnu.add_task(task, position)
+    result = get_dsc_schedule(stnu, lp_solver)
+    if result is None:
+        return None
+    dsc, schedule = result
+    return dsc, schedule, schedule.compute_temporal_metric(temporal_criterion)
+
+
+def evaluate_insertions_worker(stnu_class, stnu_binary, task, positions, temporal_criterion, lp_solver=None,
+                               end_time=None):
+    """ Evaluates the insertion of the task at each of the positions in a worker process, until
+    the wall-clock time end_time
+
+    returns a list with a tuple (dsc, schedule in the binary format, temporal_metric) or None
+    (if the LP has no solution) for each position evaluated before end_time
+    """
+    stnu = stnu_class.from_binary(stnu_binary)
+    results = list()
+    for position in positions:
+        if end_time is not None and time.time() > end_time:
+            break
+        result = evaluate_insertion(stnu, task, position, temporal_criterion, lp_solver)
+        if result is None:
+            results.append(None)
+            continue
+        dsc, schedule, temporal_metric = result
+        results.append((dsc, schedule.to_binary(), temporal_metric))
+    return results
@@ -1,20 +1,227 @@
 import logging
-import networkx as nx
-import copy
+
+import numpy as np
 
 
 """ Achieves full path consistency (fpc) by applying the Floyd Warshall algorithm to the STN"""
 
+# Tolerance used when checking for negative cycles
+CONSISTENCY_TOLERANCE = 1e-01
+
+
+def floyd_warshall(distances):
+    """ Computes the all-pairs shortest path distances in place
+
+    :param distances: (n x n) np.ndarray with the edge weights of the distance graph,
+    infinity if there is no edge and 0 in the diagonal
+    :return: distances
+    """
+    with np.errstate(over='ignore'):
+        for k in range(distances.shape[0]):
+            np.minimum(distances, distances[:, k, None] + distances[None, k, :], out=distances)
+    return distances
+
+
+def round_distances(distances):
+    """ Rounds the distances to two decimals
+
+    The distances are first rounded to six decimals, so that sums of the same weights computed
+    in a different order (e.g. 2.9749999999999996 and 2.975) are rounded to the same value
+
+    :param distances: np.ndarray or float
+    """
+    return np.round(np.round(distances, 6), 2)
+
+
+def is_consistent(distances):
+    """ The STN is not consistent if it has negative cycles, i.e., if a node has a negative
+    distance to itself
+
+    :param distances: (n x n) np.ndarray with all-pairs shortest path distances
+    """
+    return bool(np.all(np.abs(np.diagonal(distances)) <= CONSISTENCY_TOLERANCE))
+
 
 def get_minimal_network(stn):
 
     logger = logging.getLogger('stn.fpc')
-    minimal_network = copy.deepcopy(stn)
 
-    shortest_path_array = nx.floyd_warshall(stn)
-    if stn.is_consistent(shortest_path_array):
+    # If the stn tracks its minimal network, the distances are not recomputed
+    node_ids, distances = stn.get_minimal_distances()
+
+    if is_consistent(distances):
         # Get minimal stn by updating the edges of the stn to reflect the shortest path distances
-        minimal_network.update_edges(shortest_path_array)
+        minimal_network = stn.clone()
+        minimal_network.track_minimal_network(False)
+        minimal_network.update_edges_from_matrix(node_ids, distances)
         return minimal_network
     else:
         logger.debug("The minimal network is inconsistent. STP could not be solved")
+
+
+class IncrementalAPSP(object):
+    """ Keeps the all-pairs shortest path distances of an stn up to date while edges are
+    added or tightened
+
+    Each tightened edge i -> j is propagated in O(n^2):
+    d(u, v) = min(d(u, v), d(u, i) + w(i, j) + d(j, v))
+
+    Loosening or removing an edge cannot be propagated incrementally, the distances have to
+    be recomputed.
+    """
+    logger = logging.getLogger('stn.fpc')
+
+    def __init__(self, node_ids, distances):
+        self.index = {node_id: r for r, node_id in enumerate(node_ids)}
+        self.distances = np.array(distances, dtype=float)
+        self.is_consistent = is_consistent(self.distances)
+
+    @classmethod
+    def from_stn(cls, stn):
+        node_ids, weights = stn.get_weight_matrix()
+        return cls(node_ids, floyd_warshall(weights))
+
+    def _get_row(self, node_id):
+        """ Returns the row of the node, adding the node as an isolated timepoint if it is new
+        """
+        row = self.index.get(node_id)
+        if row is None:
+            row = len(self.index)
+            if row >= self.distances.shape[0]:
+                capacity = max(2 * self.distances.shape[0], 4)
+                distances = np.full((capacity, capacity), np.inf)
+                distances[:row, :row] = self.distances[:row, :row]
+                self.distances = distances
+            self.distances[row, :] = np.inf
+            self.distances[:, row] = np.inf
+            self.distances[row, row] = 0.
+            self.index[node_id] = row
+        return row
+
+    def add_edge(self, i, j, weight):
+        """ Propagates the (new or tightened) edge i -> j with the given weight
+
+        Returns False if the edge creates a negative cycle
+        """
+        if not self.is_consistent:
+            return False
+        r_i = self._get_row(i)
+        r_j = self._get_row(j)
+        n = len(self.index)
+        distances = self.distances[:n, :n]
+
+        if weight >= distances[r_i, r_j]:
+            return True
+
+        if distances[r_j, r_i] + weight < -CONSISTENCY_TOLERANCE:
+            self.logger.debug("Edge %s => %s with weight %s creates a negative cycle", i, j, weight)
+            # Record the negative cycle through i
+            distances[r_i, r_i] = distances[r_j, r_i] + weight
+            self.is_consistent = False
+            return False
+
+        with np.errstate(over='ignore'):
+            np.minimum(distances, distances[:, r_i, None] + (weight + distances[None, r_j, :]), out=distances)
+        return True
+
+    def copy(self):
+        apsp = self.__class__.__new__(self.__class__)
+        apsp.index = dict(self.index)
+        apsp.distances = self.distances.copy()
+        apsp.is_consistent = self.is_consistent
+        return apsp
+
+    def relabel(self, mapping):
+        self.index = {mapping.get(node_id, node_id): row for node_id, row in self.index.items()}
+
+    def get_matrix(self, node_ids):
+        """ Returns a copy of the distances between the given nodes
+
+        :param node_ids: list of node ids
+        :return: np.ndarray
+        """
+        rows = [self._get_row(node_id) for node_id in node_ids]
+        return self.distances[np.ix_(rows, rows)]
+
+
+def get_chain(stn):
+    """ Returns the timepoints of the stn (excluding the zero timepoint) in order if the stn is
+    a chain, i.e., if all its constraints are either between consecutive timepoints or between a
+    timepoint and the zero timepoint. This is the structure of the stns built by STN.add_task
+
+    Returns None if the stn is not a chain
+    """
+    chain = stn.get_ordered_node_ids()
+    if len(chain) != stn.number_of_nodes() - 1:
+        return
+    position = {node_id: k for k, node_id in enumerate(chain)}
+    for i, j in stn.edges():
+        if i != 0 and j != 0 and abs(position[i] - position[j]) != 1:
+            return
+    return chain
+
+
+def get_chain_minimal_network(stn):
+    """ Computes the minimal network of a chain shaped stn in O(n)
+
+    In a chain, a shortest path from the zero timepoint to a timepoint k goes from the zero
+    timepoint to some timepoint j and then along the chain to k. Thus, the distances from and to
+    the zero timepoint are computed with one forward and one backward sweep. The distance between
+    two consecutive timepoints is either the weight of the edge between them or the distance of
+    the path through the zero timepoint.
+
+    Falls back to get_minimal_network if the stn is not a chain.
+    """
+    logger = logging.getLogger('stn.fpc')
+
+    chain = get_chain(stn)
+    if chain is None:
+        logger.debug("The stn is not a chain. Using Floyd Warshall")
+        return get_minimal_network(stn)
+
+    n = len(chain)
+    # Distances from and to the zero timepoint
+    from_zero = [stn.get_edge_weight(0, k) for k in chain]
+    to_zero = [stn.get_edge_weight(k, 0) for k in chain]
+    # Weights of the edges between consecutive timepoints
+    forward = [stn.get_edge_weight(chain[k], chain[k+1]) for k in range(n-1)]
+    backward = [stn.get_edge_weight(chain[k+1], chain[k]) for k in range(n-1)]
+
+    for k in range(n-1):
+        if forward[k] + backward[k] < -CONSISTENCY_TOLERANCE:
+            logger.debug("The minimal network is inconsistent. STP could not be solved")
+            return
+
+    for k in range(1, n):
+        from_zero[k] = min(from_zero[k], from_zero[k-1] + forward[k-1])
+    for k in range(n-2, -1, -1):
+        from_zero[k] = min(from_zero[k], from_zero[k+1] + backward[k])
+
+    for k in range(n-2, -1, -1):
+        to_zero[k] = min(to_zero[k], forward[k] + to_zero[k+1])
+    for k in range(1, n):
+        to_zero[k] = min(to_zero[k], backward[k-1] + to_zero[k-1])
+
+    for k in range(n):
+        if from_zero[k] + to_zero[k] < -CONSISTENCY_TOLERANCE:
+            logger.debug("The minimal network is inconsistent. STP could not be solved")
+            return
+
+    distances = dict()
+    for k, node_id in enumerate(chain):
+        distances[(0, node_id)] = from_zero[k]
+        distances[(node_id, 0)] = to_zero[k]
+    for k in range(n-1):
+        distances[(chain[k], chain[k+1])] = min(forward[k], to_zero[k] + from_zero[k+1])
+        distances[(chain[k+1], chain[k])] = min(backward[k], to_zero[k+1] + from_zero[k])
+
+    minimal_network = stn.clone()
+    minimal_network.track_minimal_network(False)
+
+    # Rounds the distances as update_edges_from_matrix does, so that the minimal network is the
+    # same as the one computed by get_minimal_network
+    for (i, j), distance in distances.items():
+        if minimal_network.has_edge(i, j):
+            minimal_network.update_edge_weight(i, j, round_distances(distance))
+
+    return minimal_network
@@ -0,0 +1,479 @@
+import logging
+import sys
+
+import numpy as np
+import pulp
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+""" Assembly and solvers of the LPs of the LP based methods (srea, dsc-lp)
+
+The LPs are assembled as arrays (SparseLP): variable bounds, objective and blocks of constraint
+rows, from which the sparse constraint matrices are built. STNArrays has the timepoint
+bounds and the constraints of an stn as arrays, read from the edges of the stn.
+
+The LPs are solved by a pulp solver, the LP backend:
+
+- highs:    HiGHS through scipy.optimize.linprog, in process. The constraints are passed
+            as sparse matrices
+- cbc:      CBC through pulp, which writes the LP to a file and runs CBC in a subprocess.
+            A SparseLP is converted to a pulp problem once. Later changes of its bounds,
+            right-hand sides and objective are applied to that problem in place
+
+The backends find the same optimal objective value, but if an LP has several optimal
+solutions, each backend may return a different one, so the srea guide and the DSC schedule
+may depend on the backend. srea can choose an optimal solution that does not depend on the
+backend, at the cost of three more LP solves (srea(..., canonical=True))
+"""
+
+logger = logging.getLogger('stn.lp')
+
+DEFAULT_LP_SOLVER = 'highs'
+
+# Max float used instead of infinite edge weights
+MAX_FLOAT = sys.float_info.max
+
+# scipy.optimize.linprog status -> pulp status
+LINPROG_STATUS = {0: pulp.LpStatusOptimal,
+                  1: pulp.LpStatusNotSolved,
+                  2: pulp.LpStatusInfeasible,
+                  3: pulp.LpStatusUnbounded,
+                  4: pulp.LpStatusUndefined}
+
+
+class HiGHS(pulp.LpSolver):
+    """ Solves continuous pulp problems in process with HiGHS (scipy.optimize.linprog)
+    """
+    name = 'HiGHS_SCIPY'
+
+    def available(self):
+        return True
+
+    def actualSolve(self, lp):
+        variables = lp.variables()
+        index = {variable: k for k, variable in enumerate(variables)}
+        n = len(variables)
+
+        c = np.zeros(n)
+        if lp.objective is not None:
+            for variable, coefficient in lp.objective.items():
+                c[index[variable]] = coefficient
+        if lp.sense == pulp.LpMaximize:
+            c = -c
+
+        # Rows of the <= and == constraints, >= constraints are negated
+        rows = {pulp.LpConstraintLE: ([], [], [], []), pulp.LpConstraintEQ: ([], [], [], [])}
+        for constraint in get_constraints(lp):
+            sign = -1 if constraint.sense == pulp.LpConstraintGE else 1
+            row_indices, column_indices, coefficients, rhs = \
+                rows[pulp.LpConstraintEQ if constraint.sense == pulp.LpConstraintEQ else pulp.LpConstraintLE]
+            row = len(rhs)
+            for variable, coefficient in constraint.items():
+                row_indices.append(row)
+                column_indices.append(index[variable])
+                coefficients.append(sign * coefficient)
+            rhs.append(-sign * constraint.constant)
+
+        low, up = zip(*[self._get_bounds(variable) for variable in variables]) if variables else ((), ())
+        low = np.array([-np.inf if bound is None else bound for bound in low], dtype=float)
+        up = np.array([np.inf if bound is None else bound for bound in up], dtype=float)
+
+        a_ub, b_ub = self._get_matrix(rows[pulp.LpConstraintLE], n)
+        a_eq, b_eq = self._get_matrix(rows[pulp.LpConstraintEQ], n)
+        status, values = self._linprog(c, a_ub, b_ub, a_eq, b_eq, low, up)
+        if values is not None:
+            for variable, value in zip(variables, values.tolist()):
+                variable.varValue = value
+        lp.assignStatus(status)
+        return lp.status
+
+    def solve_sparse(self, lp):
+        """ Solves a SparseLP. Returns the pulp status and the values of the variables or None
+        """
+        order = lp.get_column_order()
+        c = lp.objective[order]
+        if lp.sense == pulp.LpMaximize:
+            c = -c
+        a_ub, b_ub = lp.get_matrix(pulp.LpConstraintLE)
+        a_eq, b_eq = lp.get_matrix(pulp.LpConstraintEQ)
+        low, up = lp.low.copy(), lp.up.copy()
+        # As _get_bounds
+        low[(low == 0) & (up < 0)] = -np.inf
+        status, values = self._linprog(c,
+                                       a_ub[:, order] if a_ub is not None else None, b_ub,
+                                       a_eq[:, order] if a_eq is not None else None, b_eq,
+                                       low[order], up[order])
+        if values is None:
+            return status, None
+        x = np.empty(len(order))
+        x[order] = values
+        return status, x
+
+    def _linprog(self, c, a_ub, b_ub, a_eq, b_eq, low, up):
+        if (low > up).any():
+            return pulp.LpStatusInfeasible, None
+        result = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=np.column_stack([low, up]),
+                         method='highs', options={'disp': bool(self.msg)})
+        if self.msg:
+            logger.debug("HiGHS: %s", result.message)
+        if result.status != 0:
+            return LINPROG_STATUS.get(result.status, pulp.LpStatusUndefined), None
+        return pulp.LpStatusOptimal, result.x
+
+    @staticmethod
+    def _get_bounds(variable):
+        """ Returns the bounds of the variable as CBC reads them from the MPS file written by pulp
+
+        pulp does not write lower bounds of 0, and a negative upper bound without a lower bound
+        makes the lower bound -inf. Both backends solve the same LP, e.g. srea relies on this
+        for deltas whose upper bound is negative
+        """
+        low, up = variable.lowBound, variable.upBound
+        if low == 0 and up is not None and up < 0:
+            low = None
+        return low, up
+
+    @staticmethod
+    def _get_matrix(rows, n):
+        row_indices, column_indices, coefficients, rhs = rows
+        if not rhs:
+            return None, None
+        matrix = coo_matrix((coefficients, (row_indices, column_indices)), shape=(len(rhs), n)).tocsr()
+        return matrix, np.array(rhs)
+
+
+def get_constraints(lp):
+    """ Returns the constraints of the pulp problem
+    """
+    constraints = lp.constraints
+    # Since pulp 3.3, lp.constraints is also a function that returns the list of constraints
+    return constraints() if callable(constraints) else list(constraints.values())
+
+
+def get_constraint(lp, name):
+    """ Returns the constraint of the pulp problem with the given name
+    """
+    if hasattr(lp, 'get_constraint_by_name'):
+        return lp.get_constraint_by_name(name)
+    return lp.constraints[name]
+
+
+class LPVariable(object):
+    """ Variable of a SparseLP, with the attributes of a pulp variable
+    """
+    __slots__ = ('lp', 'index')
+
+    def __init__(self, lp, index):
+        self.lp = lp
+        self.index = index
+
+    def __repr__(self):
+        return self.name
+
+    @property
+    def name(self):
+        return self.lp.names[self.index]
+
+    @property
+    def lowBound(self):
+        low = self.lp.low[self.index]
+        return None if low == -np.inf else float(low)
+
+    @lowBound.setter
+    def lowBound(self, value):
+        self.lp.low[self.index] = -np.inf if value is None else value
+
+    @property
+    def upBound(self):
+        up = self.lp.up[self.index]
+        return None if up == np.inf else float(up)
+
+    @upBound.setter
+    def upBound(self, value):
+        self.lp.up[self.index] = np.inf if value is None else value
+
+    @property
+    def varValue(self):
+        if self.lp.values is None:
+            return None
+        return float(self.lp.values[self.index])
+
+
+class SparseLP(object):
+    """ LP assembled as arrays
+
+    Variables are added in blocks (add_variables) and have an index (column). Constraints are
+    added in blocks of rows (add_constraints) with the same number of terms per row. The
+    constraint matrices are built from the blocks as sparse matrices
+
+    The columns are passed to the solver ordered by variable name, as pulp does, so that all
+    backends choose the same optimum among LP solutions with the same objective value
+    """
+
+    def __init__(self, name, sense=pulp.LpMinimize):
+        self.name = name
+        self.sense = sense
+        self.names = list()
+        self.low = np.zeros(0)
+        self.up = np.zeros(0)
+        self.objective = np.zeros(0)
+        # Blocks of rows (sense, first row, columns, coefficients), in the order they were added
+        self._blocks = list()
+        self._rhs = {pulp.LpConstraintLE: np.zeros(0), pulp.LpConstraintEQ: np.zeros(0)}
+        # {row name: (sense, row)}
+        self._row_names = dict()
+        self._matrices = dict()
+        self._column_order = None
+        # Pulp problem of the LP for the backends other than HiGHS: (problem, variables, rows)
+        self._pulp = None
+        self.values = None
+        self.status = pulp.LpStatusNotSolved
+
+    def __len__(self):
+        """ Number of constraints
+        """
+        return sum(len(rhs) for rhs in self._rhs.values())
+
+    def add_variables(self, names, low=None, up=None):
+        """ Adds a block of variables
+
+        :param names: names of the variables
+        :param low: lower bound(s), None for -inf
+        :param up: upper bound(s), None for inf
+        :return: np.ndarray with the indices of the variables
+        """
+        names = list(names)
+        start = len(self.names)
+        self.names.extend(names)
+        self.low = np.concatenate([self.low, np.broadcast_to(-np.inf if low is None else low, len(names))])
+        self.up = np.concatenate([self.up, np.broadcast_to(np.inf if up is None else up, len(names))])
+        self.objective = np.concatenate([self.objective, np.zeros(len(names))])
+        self._matrices.clear()
+        self._column_order = None
+        self._pulp = None
+        self.values = None
+        return np.arange(start, start + len(names))
+
+    def get_variables(self, indices):
+        return [LPVariable(self, index) for index in np.asarray(indices).tolist()]
+
+    def variables(self):
+        """ Returns the variables ordered by name, as pulp.LpProblem.variables
+        """
+        return self.get_variables(self.get_column_order())
+
+    def add_constraints(self, columns, coefficients, sense, rhs, names=None):
+        """ Adds a block of rows: sum(coefficients[r] * x[columns[r]]) <sense> rhs[r]
+
+        :param columns: (number of rows, number of terms) array of variable indices
+        :param coefficients: coefficients of the terms, broadcast to the shape of columns
+        :param sense: pulp.LpConstraintLE, pulp.LpConstraintGE or pulp.LpConstraintEQ.
+        >= rows are stored as <= rows
+        :param rhs: right-hand side(s), broadcast to the number of rows
+        :param names: optional names of the rows, to change their right-hand sides (set_rhs)
+        """
+        columns = np.asarray(columns, dtype=np.intp)
+        if not len(columns):
+            return
+        columns = columns.reshape(len(columns), -1)
+        coefficients = np.broadcast_to(np.asarray(coefficients, dtype=float), columns.shape)
+        rhs = np.broadcast_to(np.asarray(rhs, dtype=float), len(columns))
+        if sense == pulp.LpConstraintGE:
+            sense, coefficients, rhs = pulp.LpConstraintLE, -coefficients, -rhs
+        first_row = len(self._rhs[sense])
+        self._blocks.append((sense, first_row, columns, coefficients))
+        self._rhs[sense] = np.concatenate([self._rhs[sense], rhs])
+        if names is not None:
+            for row, name in enumerate(names, first_row):
+                self._row_names[name] = (sense, row)
+        self._matrices.pop(sense, None)
+        self._pulp = None
+
+    def set_objective(self, columns, coefficients):
+        self.objective = np.zeros(len(self.names))
+        np.add.at(self.objective, np.asarray(columns, dtype=np.intp),
+                  np.broadcast_to(np.asarray(coefficients, dtype=float), np.shape(columns)))
+
+    def set_rhs(self, name, value):
+        """ Changes the right-hand side of the row with the given name
+        """
+        sense, row = self._row_names[name]
+        self._rhs[sense][row] = value
+        if self._pulp is not None:
+            prob, variables, rows = self._pulp
+            rows[sense][row].constant = -value
+
+    def get_column_order(self):
+        """ Returns the indices of the variables ordered by name
+        """
+        if self._column_order is None:
+            self._column_order = np.array(sorted(range(len(self.names)), key=self.names.__getitem__),
+                                          dtype=np.intp)
+        return self._column_order
+
+    def get_matrix(self, sense):
+        """ Returns the CSR matrix and the right-hand sides of the <= (LE) or == (EQ) rows,
+        or (None, None) if there are no such rows
+        """
+        rhs = self._rhs[sense]
+        if not len(rhs):
+            return None, None
+        matrix = self._matrices.get(sense)
+        if matrix is None:
+            blocks = [(first_row, columns, coefficients)
+                      for block_sense, first_row, columns, coefficients in self._blocks if block_sense == sense]
+            rows = np.concatenate([np.repeat(np.arange(first_row, first_row + len(columns)), columns.shape[1])
+                                   for first_row, columns, coefficients in blocks])
+            matrix = coo_matrix((np.concatenate([coefficients.ravel() for _, _, coefficients in blocks]),
+                                 (rows, np.concatenate([columns.ravel() for _, columns, _ in blocks]))),
+                                shape=(len(rhs), len(self.names))).tocsr()
+            self._matrices[sense] = matrix
+        return matrix, rhs.copy()
+
+    def solve(self, solver=None):
+        """ Solves the LP with a pulp solver (see get_lp_solver)
+
+        :return: pulp status
+        """
+        if solver is None:
+            solver = get_lp_solver()
+        if isinstance(solver, HiGHS):
+            self.status, values = solver.solve_sparse(self)
+        else:
+            prob, variables = self._get_pulp()
+            prob.solve(solver)
+            self.status = prob.status
+            values = None
+            if self.status == pulp.LpStatusOptimal:
+                values = np.array([np.nan if variable.varValue is None else variable.varValue
+                                   for variable in variables])
+        if values is not None:
+            self.values = values
+        return self.status
+
+    def _get_pulp(self):
+        """ Returns the pulp problem of the LP and its variables, built once and then updated in
+        place with the current bounds, objective and sense. The right-hand sides are updated by
+        set_rhs
+        """
+        if self._pulp is None:
+            prob, variables = self.to_pulp()
+            # Rows in the order in which they were added, by sense
+            constraints = iter(get_constraints(prob))
+            rows = {pulp.LpConstraintLE: [None] * len(self._rhs[pulp.LpConstraintLE]),
+                    pulp.LpConstraintEQ: [None] * len(self._rhs[pulp.LpConstraintEQ])}
+            for sense, first_row, columns, coefficients in self._blocks:
+                for row in range(first_row, first_row + len(columns)):
+                    rows[sense][row] = next(constraints)
+            self._pulp = (prob, variables, rows)
+            return prob, variables
+
+        prob, variables, rows = self._pulp
+        for variable, low, up in zip(variables, self.low.tolist(), self.up.tolist()):
+            variable.lowBound = None if low == -np.inf else low
+            variable.upBound = None if up == np.inf else up
+        prob.sense = self.sense
+        prob.setObjective(self._get_pulp_objective(variables))
+        return prob, variables
+
+    def _get_pulp_objective(self, variables):
+        return pulp.LpAffineExpression([(variables[column], coefficient) for column, coefficient
+                                        in enumerate(self.objective.tolist()) if coefficient])
+
+    def to_pulp(self):
+        """ Returns the LP as a pulp problem and its variables (in the order of their indices)
+        """
+        prob = pulp.LpProblem(self.name, self.sense)
+        variables = [pulp.LpVariable(name,
+                                     lowBound=None if low == -np.inf else low,
+                                     upBound=None if up == np.inf else up)
+                     for name, low, up in zip(self.names, self.low.tolist(), self.up.tolist())]
+        for sense, first_row, columns, coefficients in self._blocks:
+            rhs = self._rhs[sense][first_row:first_row + len(columns)]
+            for row_columns, row_coefficients, row_rhs in zip(columns.tolist(), coefficients.tolist(),
+                                                                rhs.tolist()):
+                expression = pulp.LpAffineExpression([(variables[column], coefficient) for column, coefficient
+                                                      in zip(row_columns, row_coefficients)])
+                prob += pulp.LpConstraint(expression, sense, rhs=row_rhs)
+        prob += self._get_pulp_objective(variables)
+        return prob, variables
+
+    def writeLP(self, filename):
+        self.to_pulp()[0].writeLP(filename)
+
+
+def replace_infinite_weights(stn):
+    """ Replaces the infinite edge weights of the stn by MAX_FLOAT
+
+    returns the edge arrays (sources, targets, weights) of the stn (see STN.get_edge_arrays)
+    """
+    sources, targets, weights = stn.get_edge_arrays()
+    for i, j in zip(sources[weights == np.inf].tolist(), targets[weights == np.inf].tolist()):
+        stn.update_edge_weight(i, j, MAX_FLOAT)
+    weights[weights == np.inf] = MAX_FLOAT
+    return sources, targets, weights
+
+
+class STNArrays(object):
+    """ Timepoint bounds and constraints of an stn as arrays
+
+    Infinite edge weights are replaced by MAX_FLOAT in the stn, so that the LPs are feasible.
+
+    Attributes:
+        node_ids:       ids of the timepoints, in the order of stn.nodes()
+        position:       {node id: position in node_ids}
+        earliest:       -w(i, 0) of each timepoint, -inf if there is no edge
+        latest:         w(0, i) of each timepoint, inf if there is no edge
+        sources, targets, weights, reverse_weights, is_contingent:
+                        the constraints (i, j) of the stn (see STN.get_constraints), with
+                        w(i, j), w(j, i) (inf if there is no edge (j, i)) and whether (i, j)
+                        is a contingent constraint
+    """
+
+    def __init__(self, stn):
+        sources, targets, weights = replace_infinite_weights(stn)
+
+        self.node_ids = np.fromiter(stn.nodes(), dtype=np.int64, count=stn.number_of_nodes())
+        self.position = {node_id: k for k, node_id in enumerate(self.node_ids.tolist())}
+
+        self.latest = np.full(len(self.node_ids), np.inf)
+        self.earliest = np.full(len(self.node_ids), -np.inf)
+        from_zero = sources == 0
+        self.latest[self.get_positions(targets[from_zero])] = weights[from_zero]
+        to_zero = targets == 0
+        self.earliest[self.get_positions(sources[to_zero])] = -weights[to_zero]
+        if 0 in self.position:
+            self.latest[self.position[0]] = 0
+            self.earliest[self.position[0]] = 0
+
+        edge_weights = dict(zip(zip(sources.tolist(), targets.tolist()), weights.tolist()))
+        constraints = [(i, j, stn[i][j].get('is_contingent') is True)
+                       for i, j in zip(sources.tolist(), targets.tolist()) if stn.precedes(i, j)]
+        self.sources = np.array([i for i, j, is_contingent in constraints], dtype=np.int64)
+        self.targets = np.array([j for i, j, is_contingent in constraints], dtype=np.int64)
+        self.is_contingent = np.array([is_contingent for i, j, is_contingent in constraints], dtype=bool)
+        self.weights = np.array([edge_weights[(i, j)] for i, j, is_contingent in constraints], dtype=float)
+        self.reverse_weights = np.array([edge_weights.get((j, i), np.inf) for i, j, is_contingent in constraints],
+                                        dtype=float)
+
+    def get_positions(self, node_ids):
+        """ Returns the positions of the node ids in self.node_ids
+        """
+        return np.fromiter((self.position[node_id] for node_id in np.asarray(node_ids).tolist()),
+                           dtype=np.intp, count=len(node_ids))
+
+
+lp_solvers = {'highs': HiGHS,
+              'cbc': pulp.PULP_CBC_CMD}
+
+
+def get_lp_solver(name=None, msg=False):
+    """ Returns a pulp solver
+
+    :param name: name of the LP backend ('highs' or 'cbc'), defaults to DEFAULT_LP_SOLVER
+    :param msg: (bool) if True, the solver logs its output
+    """
+    solver = lp_solvers.get(name or DEFAULT_LP_SOLVER)
+    if not solver:
+        raise ValueError(name)
+    return solver(msg=msg)
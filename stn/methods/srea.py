@@ -21,15 +21,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from collections import deque
 from math import floor, ceil
 import pulp
-import copy
+import numpy as np
 import sys
 import logging
 
 from stn.pstn.pstn import PSTN
-from stn.pstn.distempirical import invcdf_norm, invcdf_uniform
+from stn.pstn.distempirical import invcdf_norm_array, invcdf_uniform
 from stn.methods.fpc import get_minimal_network
+from stn.methods.lp import SparseLP, STNArrays, get_lp_solver
+from stn.utils.pool import get_pool
+from stn.utils.uuid import generate_uuid
 
 
 # \brief A global variable that stores the max float that will be used to deal
@@ -37,6 +41,9 @@ from stn.methods.fpc import get_minimal_network
 MAX_FLOAT = sys.float_info.max
 
 
+# Relative tolerance on the objective of the optimal solutions of the LP
+OBJECTIVE_TOLERANCE = 1e-06
+
 logger = logging.getLogger('stn.srea')
 
 """ SREA algorithm
@@ -51,56 +58,83 @@ def addConstraint(constraint, problem):
 def setUpLP(stn, decouple):
     """ Initializes the LP problem and the LP variables that will not change with alpha
     Returns a tuple (bounds, deltas, prob) where bounds and deltas are dictionaries of LP variables, and prob is the LP problem instance
-    """
-    bounds = {}
-    deltas = {}
 
-    prob = pulp.LpProblem('PSTN Robust Execution LP', pulp.LpMaximize)
+    The constraints on the contingent constraints (Lund et al. LP (3) and (4)) are added with
+    right-hand side 0. srea_LP sets their right-hand sides and the upper bounds of the deltas
+    for an alpha, so that the same LP is solved for all alphas
 
-    for (i, j) in stn.edges():
-        weight = stn.get_edge_weight(i, j)
-        if weight == float('inf'):
-            stn.update_edge_weight(i, j, MAX_FLOAT)
+    The LP is assembled from the timepoint bounds and constraints of the stn as arrays
+    (see stn.methods.lp.STNArrays)
+    """
+    prob = SparseLP('PSTN Robust Execution LP', pulp.LpMaximize)
+    arrays = STNArrays(stn)
+    node_ids = arrays.node_ids.tolist()
 
     # ##
     # Store Original STN edges and objective variables for easy access.
     # Not part of LP yet
     # ##
+    hi = prob.add_variables(['t_%d_hi' % i for i in node_ids], arrays.earliest, arrays.latest)
+    lo = prob.add_variables(['t_%d_lo' % i for i in node_ids], arrays.earliest, arrays.latest)
+    prob.add_constraints(np.column_stack([hi, lo]), [1, -1], pulp.LpConstraintGE, 0)
 
-    for i in stn.nodes():
-        bounds[(i, '+')] = pulp.LpVariable('t_%d_hi' % i,
-                                           lowBound=-stn.get_edge_weight(i, 0),
-                                           upBound=stn.get_edge_weight(0, i))
-
-        bounds[(i, '-')] = pulp.LpVariable('t_%d_lo' % i,
-                                           lowBound=-stn.get_edge_weight(i, 0),
-                                           upBound=stn.get_edge_weight(0, i))
-
-        condition = bounds[(i, '+')] >= bounds[(i, '-')]
-        addConstraint(condition, prob)
+    contingent = arrays.is_contingent
+    sources, targets = arrays.sources[contingent].tolist(), arrays.targets[contingent].tolist()
+    delta_ij = prob.add_variables(['delta_%d_%d' % (i, j) for i, j in zip(sources, targets)], 0)
+    delta_ji = prob.add_variables(['delta_%d_%d' % (j, i) for i, j in zip(sources, targets)], 0)
 
-    constraints = stn.get_constraints()
-    contingent_constraints = stn.get_contingent_constraints()
+    # ignore edges from z. these edges are implicitly handled
+    # with the bounds on the LP variables
+    if not decouple:
+        contingent_constraints = set(zip(sources, targets))
+        requirement = ~contingent & (arrays.sources != 0) & (arrays.targets != 0) & \
+            np.array([(j, i) not in contingent_constraints
+                      for i, j in zip(arrays.sources.tolist(), arrays.targets.tolist())], dtype=bool)
+        i = arrays.get_positions(arrays.sources[requirement])
+        j = arrays.get_positions(arrays.targets[requirement])
+        # t_j_hi - t_i_lo <= w(i, j) and t_i_hi - t_j_lo <= w(j, i), one after the other
+        columns = np.empty((2 * len(i), 2), dtype=np.intp)
+        columns[0::2] = np.column_stack([hi[j], lo[i]])
+        columns[1::2] = np.column_stack([hi[i], lo[j]])
+        rhs = np.empty(2 * len(i))
+        rhs[0::2] = arrays.weights[requirement]
+        rhs[1::2] = arrays.reverse_weights[requirement]
+        prob.add_constraints(columns, [1, -1], pulp.LpConstraintLE, rhs)
+
+    i = arrays.get_positions(sources)
+    j = arrays.get_positions(targets)
+    columns = np.empty((2 * len(i), 3), dtype=np.intp)
+    coefficients = np.empty((2 * len(i), 3))
+    # Lund et al. LP (3)
+    columns[0::2] = np.column_stack([hi[j], hi[i], delta_ij])
+    coefficients[0::2] = [1, -1, -1]
+    # Lund et al. LP (4)
+    columns[1::2] = np.column_stack([lo[j], lo[i], delta_ji])
+    coefficients[1::2] = [1, -1, 1]
+    names = [get_constraint_name(i, j, sign) for i, j in zip(sources, targets) for sign in ('+', '-')]
+    prob.add_constraints(columns, coefficients, pulp.LpConstraintEQ, 0, names)
 
-    for (i, j) in constraints:
-        if (i, j) in contingent_constraints:
+    # ##
+    # Generate the objective function.
+    #   Our objective function is SUM delta_ij
+    # ##
+    prob.set_objective(np.concatenate([delta_ij, delta_ji]), 1)
+
+    bounds = dict()
+    for i, variable_hi, variable_lo in zip(node_ids, prob.get_variables(hi), prob.get_variables(lo)):
+        bounds[(i, '+')] = variable_hi
+        bounds[(i, '-')] = variable_lo
+    deltas = dict()
+    for i, j, variable_ij, variable_ji in zip(sources, targets, prob.get_variables(delta_ij),
+                                              prob.get_variables(delta_ji)):
+        deltas[(i, j)] = variable_ij
+        deltas[(j, i)] = variable_ji
 
-            deltas[(i, j)] = pulp.LpVariable('delta_%d_%d' %
-                                             (i, j), lowBound=0, upBound=None)
-            deltas[(j, i)] = pulp.LpVariable('delta_%d_%d' %
-                                             (j, i), lowBound=0, upBound=None)
+    return (bounds, deltas, prob)
 
-        else:
-            # ignore edges from z. these edges are implicitly handled
-            # with the bounds on the LP variables
-            # if i != 0 and not decouple:
-            if i != 0 and j != 0 and (j, i) not in contingent_constraints and not decouple:
-                addConstraint(bounds[(j, '+')] - bounds[(i, '-')]
-                              <= stn.get_edge_weight(i, j), prob)
-                addConstraint(bounds[(i, '+')] - bounds[(j, '-')]
-                              <= stn.get_edge_weight(j, i), prob)
 
-    return (bounds, deltas, prob)
+def get_constraint_name(i, j, sign):
+    return 'contingent_%d_%d_%s' % (i, j, 'hi' if sign == '+' else 'lo')
 
 
 def srea(inputstn,
@@ -109,7 +143,10 @@ def srea(inputstn,
          returnAlpha=True,
          decouple=False,
          lb=0.0,
-         ub=0.999):
+         ub=0.999,
+         lp_solver=None,
+         workers=1,
+         canonical=False):
 
     """ Runs the SREA algorithm on an input STN
     @param inputstn The STN that we are running SREA on
@@ -117,13 +154,23 @@ def srea(inputstn,
     @param debugLP Print optional status messages about each run of the LP
     @param lb The starting lower bound on alpha for the binary search
     @param ub The starting upper bound on alpha for the binary search
+    @param lp_solver Name of the LP backend (see stn.methods.lp), defaults to HiGHS
+    @param workers Number of processes. If more than 1, workers alphas are tried at
+           the same time in each round of the search (see parallel_alpha_search)
+    @param canonical If True, the LP at the alpha found is solved again to choose an optimal
+           solution that does not depend on the LP backend (see canonical_bounds_LP). The LP
+           usually has several optimal solutions and, by default, the bounds are those of the
+           solution returned by the backend, which may differ between backends
+
+    The LP is set up once and each alpha only changes its right-hand sides and bounds, with
+    all LP backends (see stn.methods.lp.SparseLP). The LPs are not warm started: HiGHS
+    (scipy.optimize.linprog) does not take the basis of a previous LP, and pulp runs CBC in a
+    new process that reads the LP from a file for each alpha
 
     @returns a tuple (alpha, outputstn) if there is a solution,
     or None if there is no solution
     """
 
-    stn = copy.deepcopy(inputstn)
-
     # dictionary of alphas for binary search
     alphas = {i: i / 1000.0 for i in range(1001)}
 
@@ -135,73 +182,212 @@ def srea(inputstn,
 
     # set up LP
     if not decouple:
-        stn = get_minimal_network(stn)
+        # The minimal network is a copy of the input stn
+        stn = get_minimal_network(inputstn)
         if stn is None:
             return result
         if debug:
             logger.debug("Minimal STN %s: ", stn)
-    bounds, deltas, probBase = setUpLP(stn, decouple)
+    else:
+        stn = inputstn.clone()
+    bounds, deltas, prob = setUpLP(stn, decouple)
+    solver = get_lp_solver(lp_solver)
 
     if debug:
-        logger.debug("probBase: %s ", probBase)
+        logger.debug("prob: %s ", prob)
+
+    if workers > 1:
+        result = parallel_alpha_search(stn, alphas, lower, upper, decouple, workers, lp_solver, debug)
+    else:
+        result = alpha_search(stn, alphas, lower, upper, decouple, (bounds, deltas, prob), solver, debug,
+                              debugLP)
 
-    # First run binary search on alpha
+    # skip the rest if there was no decoupling at all
+    if result is None:
+        if debug:
+            logger.warning('could not produce feasible LP.')
+        return None
+
+    # finished our search, load the smallest alpha decoupling
+    alpha, LPbounds = result
+    if canonical:
+        LPbounds = canonical_bounds_LP(stn, alpha, decouple, (bounds, deltas, prob), solver) or LPbounds
+    if debug:
+        logger.debug(
+            'modifying STN with lowest good alpha, %s', alpha)
+
+    for i, sign in LPbounds:
+        if sign == '+':
+            stn.update_edge_weight(
+                0, i, ceil(LPbounds[(i, '+')]))
+        else:
+            stn.update_edge_weight(
+                i, 0, ceil(-LPbounds[(i, '-')]))
+
+    if returnAlpha:
+        return alpha, stn
+    else:
+        return stn
+
+
+def alpha_search(stn, alphas, lower, upper, decouple, probContainer, solver, debug=False, debugLP=False):
+    """ Binary search on alpha. The LP in probContainer is solved for each alpha
+
+    The feasibility of the LP is not always monotone in alpha: at small alphas, an LP can be
+    feasible while the LP of a larger alpha is not. The alpha found is then not the smallest
+    alpha with a feasible LP, but it only depends on the LPs and not on how they are solved
+
+    @returns a tuple (alpha, values of the bounds) for the alpha found by the binary search,
+    or None if there is no such alpha
+    """
+    result = None
     while upper - lower > 1:
         alpha = alphas[(upper + lower) // 2]
         if debug:
             logger.debug('trying alpha %s', alpha)
 
         # run the LP
-        probContainer = (bounds, deltas, probBase.copy())
         LPbounds = srea_LP(stn,
                            alpha,
                            decouple,
                            debug=debugLP,
-                           probContainer=probContainer)
+                           probContainer=probContainer,
+                           solver=solver)
 
         # LP was feasible, try lower alpha
         if LPbounds is not None:
             upper = (upper + lower) // 2
-            result = (alpha, LPbounds)
+            # The LP variables are overwritten by the next LPs
+            result = (alpha, {key: bound.varValue for key, bound in LPbounds.items()})
         # LP was infeasable, try higher alpha
         else:
             lower = (upper + lower) // 2
+    return result
 
-        # finished our search, load the smallest alpha decoupling
-        if upper - lower <= 1:
-            if result is not None:
-                alpha, LPbounds = result
-                if debug:
-                    logger.debug(
-                        'modifying STN with lowest good alpha, %s', alpha)
-
-                for i, sign in LPbounds:
-                    if sign == '+':
-                        stn.update_edge_weight(
-                            0, i, ceil(bounds[(i, '+')].varValue))
-                    else:
-                        stn.update_edge_weight(
-                            i, 0, ceil(-bounds[(i, '-')].varValue))
-
-                if returnAlpha:
-                    return alpha, stn
-                else:
-                    return stn
-    # skip the rest if there was no decoupling at all
-    if result is None:
-        if debug:
-            logger.warning('could not produce feasible LP.')
+
+def canonical_bounds_LP(stn, alpha, decouple, probContainer, solver=None):
+    """ Returns the values of the bounds of one optimal solution of the LP at alpha that does
+    not depend on the LP backend
+
+    The objective only depends on the deltas, so the LP has many optimal solutions and each LP
+    backend returns a different one. Among the optimal solutions, the one with the earliest
+    lower bounds and then the latest upper bounds is chosen: the LP is solved again with the
+    previous objective fixed to its optimum, first minimizing the sum of the lower bounds and
+    then maximizing the sum of the upper bounds. Bounds that are not limited by the stn are
+    not part of these objectives. This takes three more LP solves. The LP in probContainer is
+    modified and cannot be used for other alphas
+
+    @returns a dictionary {key: value} of the bounds or None if an LP could not be solved
+    """
+    bounds, deltas, prob = probContainer
+    if srea_LP(stn, alpha, decouple, probContainer=probContainer, solver=solver) is None:
         return None
 
-    # Fail here
-    assert(False)
+    lower_bounds = [bound.index for (i, sign), bound in bounds.items()
+                    if sign == '-' and bound.lowBound is not None and bound.lowBound > -MAX_FLOAT]
+    upper_bounds = [bound.index for (i, sign), bound in bounds.items()
+                    if sign == '+' and bound.upBound is not None and bound.upBound < MAX_FLOAT]
+    for sense, columns in [(pulp.LpMinimize, lower_bounds), (pulp.LpMaximize, upper_bounds)]:
+        fix_objective(prob)
+        prob.sense = sense
+        prob.set_objective(columns, 1)
+        prob.solve(solver)
+        if prob.status != pulp.LpStatusOptimal:
+            return None
+    return {key: bound.varValue for key, bound in bounds.items()}
+
+
+def fix_objective(prob):
+    """ Adds a constraint that keeps the objective of the solved LP at its optimal value
+    (with a relative tolerance)
+    """
+    columns = np.flatnonzero(prob.objective)
+    if not len(columns):
+        return
+    objective = float(prob.objective @ prob.values)
+    tolerance = OBJECTIVE_TOLERANCE * max(1.0, abs(objective))
+    if prob.sense == pulp.LpMaximize:
+        prob.add_constraints([columns], prob.objective[columns], pulp.LpConstraintGE, objective - tolerance)
+    else:
+        prob.add_constraints([columns], prob.objective[columns], pulp.LpConstraintLE, objective + tolerance)
+
+
+# LP of the stn being solved, in a worker process {key: (stn, probContainer, solver)}
+_worker_lp = dict()
+
+
+def parallel_alpha_search(stn, alphas, lower, upper, decouple, workers, lp_solver=None, debug=False):
+    """ Binary search on alpha that tries workers alphas at the same time on a process pool
+
+    Each round tries the alphas that the binary search (alpha_search) would try in its next
+    rounds, i.e., the first workers midpoints of the search tree below the interval
+    (lower, upper), in breadth-first order. The search then goes down the tree with the
+    results. With 2^k - 1 workers, each round does k rounds of the binary search. The alphas
+    tried by the binary search do not depend on workers, so the same alpha is found as with
+    alpha_search, also when the feasibility of the LP is not monotone in alpha
+
+    The stn is sent to the workers in the binary format. Each worker sets up the LP once
+    and updates it for each alpha
+
+    @returns a tuple (alpha, values of the bounds) for the alpha found by the binary search,
+    or None if there is no such alpha
+    """
+    pool = get_pool(workers)
+    key = generate_uuid()
+    stn_binary = stn.to_binary()
+    result = None
+    while upper - lower > 1:
+        probes = list()
+        intervals = deque([(lower, upper)])
+        while intervals and len(probes) < workers:
+            interval_lower, interval_upper = intervals.popleft()
+            if interval_upper - interval_lower > 1:
+                middle = (interval_upper + interval_lower) // 2
+                probes.append(middle)
+                intervals.extend([(interval_lower, middle), (middle, interval_upper)])
+        if debug:
+            logger.debug('trying alphas %s', [alphas[probe] for probe in probes])
+
+        futures = [pool.submit(probe_alpha, key, stn.__class__, stn_binary, alphas[probe], decouple, lp_solver)
+                   for probe in probes]
+        values = {probe: future.result() for probe, future in zip(probes, futures)}
+
+        while upper - lower > 1 and (upper + lower) // 2 in values:
+            middle = (upper + lower) // 2
+            # LP was feasible, try lower alpha
+            if values[middle] is not None:
+                upper = middle
+                result = (alphas[middle], values[middle])
+            # LP was infeasable, try higher alpha
+            else:
+                lower = middle
+    return result
+
+
+def probe_alpha(key, stn_class, stn_binary, alpha, decouple, lp_solver=None):
+    """ Solves the LP of the stn for alpha in a worker process
+
+    @returns the values of the bounds or None if the LP is infeasible
+    """
+    if key not in _worker_lp:
+        _worker_lp.clear()
+        stn = stn_class.from_binary(stn_binary)
+        probContainer = setUpLP(stn, decouple)
+        _worker_lp[key] = (stn, probContainer, get_lp_solver(lp_solver))
+    stn, probContainer, solver = _worker_lp[key]
+
+    LPbounds = srea_LP(stn, alpha, decouple, probContainer=probContainer, solver=solver)
+    if LPbounds is None:
+        return None
+    return {name: bound.varValue for name, bound in LPbounds.items()}
 
 
 def srea_LP(inputstn,
             alpha,
             decouple,
             debug=False,
-            probContainer=None
+            probContainer=None,
+            solver=None
             ):
 
     """
@@ -211,7 +397,9 @@ def srea_LP(inputstn,
      @param alpha The risk level (between 0 and 1) that we are using for the LP
      @param decouple originally was meant to indicate if we wanted decoupling or not but then we discovered that this already decouples the STN
      @param debug Print optional status messages
-     @param probContainer Optional tuple of LP variables and the LP problem instance, returned from setUpLP
+     @param probContainer Optional tuple of LP variables and the LP problem instance, returned from setUpLP.
+            The LP problem is modified in place
+     @param solver Optional pulp solver, defaults to the default LP backend (see stn.methods.lp)
 
      returns A dictionary of the LP_variables for the bounds on timepoints.
     """
@@ -231,12 +419,19 @@ def srea_LP(inputstn,
 
     contingent_constraints = inputstn.get_contingent_constraints()
 
+    # Inverse cdfs of all the gaussian constraints, one row per constraint
+    gaussians = {(i, j): constraint for (i, j), constraint in contingent_constraints.items()
+                 if constraint.dtype() == "gaussian"}
+    invcdfs = invcdf_norm_array([1.0 - alpha * 0.5, alpha * 0.5, 0.997, 0.003],
+                                np.reshape([c.mu for c in gaussians.values()], (-1, 1)),
+                                np.reshape([c.sigma for c in gaussians.values()], (-1, 1)))
+    gaussian_invcdfs = dict(zip(gaussians, invcdfs.tolist()))
+
     for (i, j), constraint in contingent_constraints.items():
         if constraint.dtype() == "gaussian":
-            p_ij = invcdf_norm(1.0 - alpha * 0.5, constraint.mu, constraint.sigma)
-            p_ji = -invcdf_norm(alpha * 0.5, constraint.mu, constraint.sigma)
-            limit_ij = invcdf_norm(0.997, constraint.mu, constraint.sigma)
-            limit_ji = -invcdf_norm(0.003, constraint.mu, constraint.sigma)
+            p_ij, p_ji, limit_ij, limit_ji = gaussian_invcdfs[(i, j)]
+            p_ji = -p_ji
+            limit_ji = -limit_ji
 
         elif constraint.dtype() == "uniform":
             p_ij = invcdf_uniform(1.0 - alpha * 0.5, constraint.dist_lb,
@@ -248,29 +443,22 @@ def srea_LP(inputstn,
         deltas[(i, j)].upBound = limit_ij - p_ij
         deltas[(j, i)].upBound = limit_ji - p_ji
 
-        cons1 = bounds[(j, "+")] - bounds[(i, "+")] == p_ij + deltas[(i, j)]
-        cons2 = bounds[(j, "-")] - bounds[(i, "-")] == -p_ji - deltas[(j, i)]
-
         # Lund et al. LP (3)
-        addConstraint(cons1, prob)
+        prob.set_rhs(get_constraint_name(i, j, '+'), p_ij)
         # Lund et al. LP (4)
-        addConstraint(cons2, prob)
-    # ##
-    # Generate the objective function.
-    #   Our objective function is SUM delta_ij
-    # ##
-    deltaSum = sum([deltas[(i, j)] for i, j in deltas])
-    prob += deltaSum, 'Maximize time added back to \
-        constraints while decoupling'
+        prob.set_rhs(get_constraint_name(i, j, '-'), -p_ji)
+
+    if solver is None:
+        solver = get_lp_solver(msg=debug)
 
     if debug:
         prob.writeLP('STN.lp')
-        pulp.LpSolverDefault.msg = 10
+        solver.msg = True
 
     # Based on https://stackoverflow.com/questions/27406858/pulp-solver-error
     # Sometimes pulp throws an exception instead of returning a problem with unfeasible status
     try:
-        prob.solve()
+        prob.solve(solver)
     except pulp.PulpSolverError:
         print("Problem unfeasible")
         return None
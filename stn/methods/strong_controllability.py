@@ -0,0 +1,171 @@
+import logging
+
+import numpy as np
+
+from stn.methods.fpc import floyd_warshall, is_consistent
+
+""" Strong controllability of STNUs
+
+An STNU is strongly controllable if there is a schedule of its requirement (controllable)
+timepoints that satisfies all constraints for all durations of the contingent constraints.
+Based on:
+
+Thierry Vidal and Hélène Fargier. Handling contingency in temporal constraint networks:
+from consistency to controllabilities. Journal of Experimental & Theoretical Artificial
+Intelligence, 11(1):23–45, 1999.
+
+The STNU is reduced to an STN over its requirement timepoints: each contingent timepoint is
+its root activation timepoint (the first requirement timepoint of its chain of contingent
+constraints, e.g. the start of a task for its pickup and delivery) plus the durations of the
+contingent constraints in between. A constraint t_y - t_x <= w holds for all durations if
+t_root(y) - t_root(x) <= w - (sum of the upper bounds of the durations of y that are not
+durations of x - sum of the lower bounds of the durations of x that are not durations of y).
+
+The STNU is strongly controllable if and only if the reduced STN is consistent. The timepoints
+are given the bounds of their variables in the DSC LP (see get_lp_lower_bounds), which allow
+times before the zero timepoint, so that the reduced STN is consistent if and only if the LP
+has a solution that does not shrink the contingent constraints.
+
+The constraints between requirement timepoints and their bounds do not depend on the
+contingent constraints. If they are not consistent, the DSC LP has no solution.
+"""
+
+logger = logging.getLogger('stn.strong_controllability')
+
+
+def get_contingent_chains(stnu):
+    """ Returns the root activation timepoint and the contingent constraints between the
+    root and each contingent timepoint
+
+    returns a dictionary {contingent timepoint: (root timepoint, [(i, j), ...])}
+    """
+    activations = {j: i for (i, j) in stnu.get_contingent_constraints()}
+    chains = dict()
+    for j in activations:
+        links = list()
+        root = j
+        while root in activations:
+            links.append((activations[root], root))
+            root = activations[root]
+            if root == j:
+                raise ValueError("Cycle of contingent constraints at node {}".format(j))
+        chains[j] = (root, links)
+    return chains
+
+
+def get_lp_lower_bounds(stnu, node_id):
+    """ Returns the lower bounds of the variables t_hi and t_lo of a timepoint in the DSC LP
+    (see stn.methods.dsc_lp)
+
+    t_hi is bounded by [0, latest time], read as [-inf, latest time] by the LP backends if the
+    latest time is negative, and t_lo is not below the earliest time, or 0 if it has none
+
+    returns a tuple (lower bound of t_hi, lower bound of t_lo)
+    """
+    hi_lower = 0. if stnu.get_edge_weight(0, node_id) >= 0 else -np.inf
+    lo_lower = -stnu.get_edge_weight(node_id, 0) if stnu.has_edge(node_id, 0) else 0.
+    return hi_lower, lo_lower
+
+
+def get_reduced_stn(stnu, requirement_only=False):
+    """ Reduces the STNU to an STN over its requirement timepoints (see module docstring)
+
+    :param stnu: stnu (object)
+    :param requirement_only: (bool) if True, only the constraints between requirement
+    timepoints are used
+
+    returns (list of requirement node ids, weight matrix of the reduced STN, chains) where
+    chains is given by get_contingent_chains. The weight matrix is None if a constraint
+    cannot hold for all durations of the contingent constraints of a single chain
+    """
+    chains = get_contingent_chains(stnu)
+    node_ids = [i for i in stnu.nodes() if i not in chains]
+    position = {node_id: k for k, node_id in enumerate(node_ids)}
+    if not requirement_only and any(-stnu.get_edge_weight(j, i) > stnu.get_edge_weight(i, j)
+                                    for (i, j) in stnu.get_contingent_constraints()):
+        return node_ids, None, chains
+
+    weights = np.full((len(node_ids), len(node_ids)), np.inf)
+    np.fill_diagonal(weights, 0.)
+
+    for x, y in stnu.edges():
+        if requirement_only and (x in chains or y in chains):
+            continue
+        root_x, links_x = chains.get(x, (x, []))
+        root_y, links_y = chains.get(y, (y, []))
+        offset = sum(stnu.get_edge_weight(i, j) for (i, j) in links_y if (i, j) not in links_x) + \
+            sum(stnu.get_edge_weight(j, i) for (i, j) in links_x if (i, j) not in links_y)
+        weight = stnu.get_edge_weight(x, y) - offset
+        r, c = position[root_x], position[root_y]
+        if r == c:
+            if weight < 0:
+                return node_ids, None, chains
+            continue
+        weights[r, c] = min(weights[r, c], weight)
+
+    if 0 in position:
+        # Lower bounds of the LP variables: a requirement timepoint is both t_hi and t_lo, and
+        # the t_hi and t_lo of a contingent timepoint are its root plus the upper and lower
+        # bounds of its durations
+        zero = position[0]
+        for node_id in node_ids:
+            if node_id != 0:
+                k = position[node_id]
+                weights[k, zero] = min(weights[k, zero], -max(get_lp_lower_bounds(stnu, node_id)))
+        if not requirement_only:
+            for node_id, (root, links) in chains.items():
+                hi_lower, lo_lower = get_lp_lower_bounds(stnu, node_id)
+                upper = sum(stnu.get_edge_weight(i, j) for (i, j) in links)
+                lower = -sum(stnu.get_edge_weight(j, i) for (i, j) in links)
+                weight = min(upper - hi_lower, lower - lo_lower)
+                r = position[root]
+                if r == zero:
+                    if weight < 0:
+                        return node_ids, None, chains
+                    continue
+                weights[r, zero] = min(weights[r, zero], weight)
+
+    return node_ids, weights, chains
+
+
+def get_strongly_controllable_bounds(stnu):
+    """ Returns a schedule of the stnu if it is strongly controllable or None otherwise
+
+    The requirement timepoints are scheduled at their earliest time in the reduced STN, and the
+    contingent timepoints are given the interval in which they can happen
+
+    returns a dictionary {(node_id, '+'): latest time, (node_id, '-'): earliest time} or None
+    """
+    node_ids, weights, chains = get_reduced_stn(stnu)
+    if weights is None:
+        logger.debug("The stnu is not strongly controllable")
+        return None
+    distances = floyd_warshall(weights)
+    if not is_consistent(distances):
+        logger.debug("The stnu is not strongly controllable")
+        return None
+
+    zero = node_ids.index(0)
+    times = {node_id: float(-distances[k, zero]) + 0. for k, node_id in enumerate(node_ids)}
+    bounds = dict()
+    for node_id in stnu.nodes():
+        if node_id in chains:
+            root, links = chains[node_id]
+            bounds[(node_id, '+')] = times[root] + sum(stnu.get_edge_weight(i, j) for (i, j) in links)
+            bounds[(node_id, '-')] = times[root] - sum(stnu.get_edge_weight(j, i) for (i, j) in links)
+        else:
+            bounds[(node_id, '+')] = times[node_id]
+            bounds[(node_id, '-')] = times[node_id]
+    return bounds
+
+
+def is_strongly_controllable(stnu):
+    return get_strongly_controllable_bounds(stnu) is not None
+
+
+def has_requirement_schedule(stnu):
+    """ Returns False if the constraints between requirement timepoints are not consistent,
+    i.e., if the stnu has no schedule whatever the durations of the contingent constraints
+    """
+    node_ids, weights, chains = get_reduced_stn(stnu, requirement_only=True)
+    return weights is not None and is_consistent(floyd_warshall(weights))
@@ -1,18 +1,93 @@
+import sys
+import threading
+import weakref
+from enum import Enum
+from uuid import UUID
+
 from stn.utils.uuid import from_str
 
 
+class NodeType(str, Enum):
+    """ Types of timepoints
+
+    A NodeType compares and hashes as its value, e.g., NodeType.START == 'start'
+    """
+    ZERO_TIMEPOINT = 'zero_timepoint'
+    START = 'start'
+    PICKUP = 'pickup'
+    DELIVERY = 'delivery'
+
+    def __hash__(self):
+        return str.__hash__(self)
+
+    def __str__(self):
+        return self.value
+
+
+def get_node_type(node_type):
+    """ Returns the NodeType of node_type. Node types that are not in NodeType (e.g.
+    in stns saved by older versions) are kept as interned strings
+    """
+    try:
+        return NodeType(node_type)
+    except ValueError:
+        return sys.intern(str(node_type))
+
+
+class TaskIdTable(object):
+    """ Interns task ids: all the nodes of a task in all the stns of the process share the
+    same task id object (UUID)
+
+    Entries are weak: a task id is dropped from the table once no node refers to it, e.g.,
+    when its task has been removed from all the stns. Task ids that are not UUIDs are not
+    interned
+    """
+    def __init__(self):
+        # {task_id.int: task_id}. The keys must not refer to the task ids
+        self._task_ids = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._task_ids)
+
+    def __contains__(self, task_id):
+        return isinstance(task_id, UUID) and task_id.int in self._task_ids
+
+    def intern(self, task_id):
+        if not isinstance(task_id, UUID):
+            return task_id
+        interned_task_id = self._task_ids.get(task_id.int)
+        if interned_task_id is None:
+            with self._lock:
+                interned_task_id = self._task_ids.setdefault(task_id.int, task_id)
+        return interned_task_id
+
+
+task_id_table = TaskIdTable()
+
+
 class Node(object):
     """Represents a timepoint in the STN """
 
-    def __init__(self, task_id, node_type, is_executed=False, **kwargs):
+    __slots__ = ('_task_id', 'node_type', 'is_executed', 'action_id')
+
+    def __init__(self, task_id, node_type, is_executed=False, action_id=None, **kwargs):
         # id of the task represented by this node
-        if isinstance(task_id, str):
-            task_id = from_str(task_id)
         self.task_id = task_id
         # The node can be of node_type zero_timepoint, start, pickup or delivery
-        self.node_type = node_type
+        self.node_type = get_node_type(node_type)
         self.is_executed = is_executed
-        self.action_id = kwargs.get("action_id")
+        self.action_id = action_id
+
+    @property
+    def task_id(self):
+        return self._task_id
+
+    @task_id.setter
+    def task_id(self, task_id):
+        if isinstance(task_id, str):
+            task_id = from_str(task_id)
+        self._task_id = task_id_table.intern(task_id)
 
     def __str__(self):
         to_print = ""
@@ -23,12 +98,12 @@ class Node(object):
         return str(self.to_dict())
 
     def __hash__(self):
-        return hash((self.task_id, self.node_type, self.is_executed))
+        return hash((self._task_id, self.node_type, self.is_executed))
 
     def __eq__(self, other):
         if other is None:
             return False
-        return (self.task_id == other.task_id and
+        return (self._task_id == other._task_id and
                 self.node_type == other.node_type and
                 self.is_executed == other.is_executed and
                 self.action_id == other.action_id)
@@ -36,13 +111,16 @@ class Node(object):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __reduce__(self):
+        return self.__class__, (self.task_id, str(self.node_type), self.is_executed, self.action_id)
+
     def execute(self):
         self.is_executed = True
 
     def to_dict(self):
         node_dict = dict()
         node_dict['task_id'] = str(self.task_id)
-        node_dict['node_type'] = self.node_type
+        node_dict['node_type'] = str(self.node_type)
         node_dict['is_executed'] = self.is_executed
         if self.action_id:
             node_dict['action_id'] = str(self.action_id)
@@ -56,6 +134,7 @@ class Node(object):
         node_type = node_dict['node_type']
         is_executed = node_dict.get('is_executed', False)
         node = Node(task_id, node_type, is_executed)
-        if node_dict.get('action_id'):
-            node.action_id = from_str(node_dict['action_id'])
+        action_id = node_dict.get('action_id')
+        if action_id:
+            node.action_id = from_str(action_id) if isinstance(action_id, str) else action_id
         return node
@@ -22,16 +22,18 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import random
+from functools import lru_cache
+
 import numpy as np
 from scipy.stats import norm
 
 # These variables should never be imported from this file.
 _samples = {}
 """Stores a dictionary of the form {key: list of distribution samples}"""
-_invcdfs = {}
-"""Stores a dictionary of the form {key: list of inverse cdf points}"""
 
 MAX_RESAMPLE = 10
+# Maximum number of discretised curves kept in memory
+MAX_CURVES = 128
 
 
 def collect_data(rundir):
@@ -92,21 +94,17 @@ def norm_sample(mu: float, sigma: float, state=None, res=1000,
     return ans
 
 
+@lru_cache(maxsize=MAX_CURVES)
 def norm_curve(mu: float, sigma: float, res=1000, neg=False):
     """Produces a descritised normal curve.
 
     Note:
-        This function is memoised. We don't want to redo work that we've
-        already done.
+        This function is memoised (least recently used curves are dropped).
+        We don't want to redo work that we've already done.
 
     Example:
         norm_curve(1.0, 0.0)
     """
-    global _samples
-
-    # Memoisation check
-    if (mu, sigma, res, neg) in _samples:
-        return _samples[(mu, sigma, res, neg)]
     if neg:
         x = np.linspace(norm.ppf(0.003, loc=mu, scale=sigma),
                         norm.ppf(0.997, loc=mu, scale=sigma),
@@ -116,24 +114,30 @@ def norm_curve(mu: float, sigma: float, res=1000, neg=False):
                         max(norm.ppf(0.997, loc=mu, scale=sigma), 0.0),
                         res)
     y = norm.pdf(x, loc=mu, scale=sigma)
-    # Memoisation
-    _samples[(mu, sigma, res, neg)] = (x, y)
     return (x, y)
 
 
+@lru_cache(maxsize=MAX_CURVES)
 def invcdf_norm_curve(mu: float, sigma: float, res=1000, neg=False):
     """Generate an inverse CDF curve for a normal distribution
     """
-    global _invcdfs
-    if (mu, sigma, res, neg) in _invcdfs:
-        return _invcdfs[(mu, sigma, res, neg)]
     normx, normy = norm_curve(mu, sigma, res=res, neg=neg)
     delx = normx[1] - normx[0]
     sol = (np.cumsum(normy) * delx, normx)
-    _invcdfs[(mu, sigma, res, neg)] = sol
     return sol
 
 
+@lru_cache(maxsize=8)
+def standard_invcdf_curve(res=1000):
+    """Generate the inverse CDF curve of the standard normal distribution.
+
+    The curve of a normal distribution that is not truncated at 0 is this
+    curve scaled by sigma and shifted by mu, so it is shared by all of them.
+    """
+    z = np.linspace(norm.ppf(0.003), norm.ppf(0.997), res)
+    return (np.cumsum(norm.pdf(z)) * (z[1] - z[0]), z)
+
+
 def binary_search_lookup(val, l):
     """Returns the index of where the val is in a sorted list.
 
@@ -175,11 +179,59 @@ def invcdf_norm(val: float, mu: float, sigma: float, res=1000, neg=False):
         res (int, optional): resolution of the normal curve.
         neg (bool, optional): Should include negative values in the cdf.
     """
-    curve = invcdf_norm_curve(mu, sigma, res=res, neg=neg)
-    ans = curve[1][binary_search_lookup(val, curve[0])]
+    return invcdf_norm_array(val, mu, sigma, res=res, neg=neg).item()
+
+
+def invcdf_norm_array(val, mu, sigma, res=1000, neg=False):
+    """Returns the inverse cumulative density function for normal curves,
+    element-wise. Gives the same values as invcdf_norm.
+
+    Args:
+        val (array_like): inputs (x-axis) for the inverse CDF.
+        mu (array_like): means of the normal curves.
+        sigma (array_like): sds of the normal curves.
+        res (int, optional): resolution of the normal curves.
+        neg (bool, optional): Should include negative values in the cdf.
+
+    Return:
+        np.ndarray with the broadcast shape of val, mu and sigma.
+
+    Example:
+        >>> invcdf_norm_array([0.003, 0.997], 10.0, 1.0).round(2).tolist()
+        [7.48, 12.74]
+    """
+    val, mu, sigma = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (val, mu, sigma)))
+    cdf, z = standard_invcdf_curve(res)
+    # Index of the element directly below val, as binary_search_lookup
+    index = np.clip(np.searchsorted(cdf, val, side='right') - 1, 0, res - 2)
+    ans = np.array(mu + sigma * z[index])
+
+    # Curves without negative values start at 0 instead of at mu + sigma * z[0],
+    # their discretisation depends on mu / sigma
+    degenerate = sigma == 0.0
+    truncated = (not neg) & (mu + sigma * z[0] < 0.0) & ~degenerate
+    if truncated.any():
+        ans[truncated] = _invcdf_truncated_norm(val[truncated], mu[truncated],
+                                                sigma[truncated], res)
+    ans[degenerate] = mu[degenerate] if neg else np.maximum(mu[degenerate], 0.0)
     return ans
 
 
+def _invcdf_truncated_norm(val, mu, sigma, res):
+    """Inverse cdf lookup for 1-d arrays of normal curves truncated at 0
+    """
+    z_0 = -mu / sigma
+    z_1 = np.maximum(norm.ppf(0.997), z_0)
+    delz = (z_1 - z_0) / (res - 1)
+    z = z_0[:, None] + delz[:, None] * np.arange(res)
+    cdf = np.cumsum(norm.pdf(z), axis=1) * delz[:, None]
+    index = np.clip((cdf <= val[:, None]).sum(axis=1) - 1, 0, res - 2)
+    x = np.maximum(mu + sigma * z[np.arange(len(val)), index], 0.0)
+    # All the points of a curve with mu + sigma * z[-1] <= 0 are 0
+    x[mu + sigma * norm.ppf(0.997) <= 0.0] = 0.0
+    return x
+
+
 def uniform_sample(lb: float, ub: float, random_state=None) -> float:
     """Returns a randomly selected uniform sample
 
@@ -46,24 +46,24 @@ class PSTN(STN):
     def __str__(self):
         to_print = ""
         for (i, j, data) in self.edges.data():
-            if self.has_edge(j, i) and i < j:
+            if self.has_edge(j, i) and self.precedes(i, j):
                 # Constraints with the zero timepoint
                 if i == 0:
                     timepoint = self.nodes[j]['data']
-                    lower_bound = -self[j][i]['weight']
-                    upper_bound = self[i][j]['weight']
+                    lower_bound = -self.get_edge_weight(j, i)
+                    upper_bound = self.get_edge_weight(i, j)
                     to_print += "Timepoint {}: [{}, {}]".format(timepoint, lower_bound, upper_bound)
                     if timepoint.is_executed:
                         to_print += " Ex"
                 # Constraints between the other timepoints
                 else:
                     if 'is_contingent' in self[j][i]:
-                        to_print += "Constraint {} => {}: [{}, {}] ({})".format(i, j, -self[j][i]['weight'], self[i][j]['weight'], self[i][j]['distribution'])
+                        to_print += "Constraint {} => {}: [{}, {}] ({})".format(i, j, -self.get_edge_weight(j, i), self.get_edge_weight(i, j), self[i][j]['distribution'])
                         if self[i][j]['is_executed']:
                             to_print += " Ex"
                     else:
 
-                        to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self[j][i]['weight'], self[i][j]['weight'])
+                        to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self.get_edge_weight(j, i), self.get_edge_weight(i, j))
                         if self[i][j]['is_executed']:
                             to_print += " Ex"
 
@@ -94,10 +94,11 @@ class PSTN(STN):
         # The constraint is contingent if it has a probability distribution
         is_contingent = distribution is not ""
 
-        super().add_constraint(i, j, wji, wij)
+        consistent = super().add_constraint(i, j, wji, wij)
 
         self.add_edge(i, j, distribution=distribution, is_contingent=is_contingent)
         self.add_edge(j, i, distribution=distribution, is_contingent=is_contingent)
+        return consistent
 
     def get_contingent_constraints(self):
         """ Returns a dictionary with the contingent constraints in the PSTN
@@ -106,7 +107,7 @@ class PSTN(STN):
         contingent_constraints = dict()
 
         for (i, j, data) in self.edges.data():
-            if self[i][j]['is_contingent'] is True and i < j:
+            if self[i][j]['is_contingent'] is True and self.precedes(i, j):
                 contingent_constraints[(i, j)] = Constraint(i, j, self[i][j]['distribution'])
 
         return contingent_constraints
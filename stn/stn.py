@@ -5,13 +5,22 @@ from json import JSONEncoder
 from stn.utils.uuid import generate_uuid
 
 import networkx as nx
-from networkx.readwrite import json_graph
+import numpy as np
 
+from stn.exceptions.stn import PatchError
+from stn.exceptions.stp import NoSTPSolution
+from stn.methods.consistency import find_negative_cycle
+from stn.methods.fpc import floyd_warshall, round_distances, IncrementalAPSP
+from stn.methods.fpc import is_consistent as has_no_negative_cycles
 from stn.node import Node
 from uuid import UUID
 import copy
 import math
 from stn.task import Timepoint
+from stn.utils import binary_format
+from stn.utils.order_list import OrderList
+from stn.utils.slots_dict import NodeAttributes, EdgeAttributes
+from stn.utils.uuid import from_str
 
 MAX_FLOAT = sys.float_info.max
 
@@ -29,27 +38,54 @@ class STN(nx.DiGraph):
 
     logger = logging.getLogger('stn.stn')
 
+    # Compact attribute dicts for the nodes and edges
+    node_attr_dict_factory = NodeAttributes
+    edge_attr_dict_factory = EdgeAttributes
+
     def __init__(self):
         super().__init__()
+        # {task_id: {node_type: node_id}}
+        self._task_index = dict()
+        # {action_id: node_id}
+        self._action_index = dict()
+        # Task ids in the order in which the tasks are scheduled
+        self._sequence = OrderList()
+        # Node ids are not positional, a node keeps its id while it is in the stn
+        self._next_node_id = 1
+        # Nodes whose payload is shared with a clone of the stn
+        self._shared_nodes = set()
+        # Change tracking, see get_patch. Every change increments the version, and the
+        # version of the last change of each node, edge and the task sequence is logged
+        self._version = 0
+        # Version from which the change logs are complete
+        self._log_version = 0
+        self._node_versions = dict()
+        self._edge_versions = dict()
+        self._removed_nodes = dict()
+        self._removed_edges = dict()
+        self._sequence_version = 0
         self.add_zero_timepoint()
         self.max_makespan = MAX_FLOAT
         self.risk_metric = None
+        # All-pairs shortest path distances, kept up to date if the minimal network is tracked
+        self._track_minimal_network = False
+        self._minimal_distances = None
 
     def __str__(self):
         to_print = ""
         for (i, j, data) in self.edges.data():
-            if self.has_edge(j, i) and i < j:
+            if self.has_edge(j, i) and self.precedes(i, j):
                 # Constraints with the zero timepoint
                 if i == 0:
                     timepoint = self.nodes[j]['data']
-                    lower_bound = -self[j][i]['weight']
-                    upper_bound = self[i][j]['weight']
+                    lower_bound = -self.get_edge_weight(j, i)
+                    upper_bound = self.get_edge_weight(i, j)
                     to_print += "Timepoint {}: [{}, {}]".format(timepoint, lower_bound, upper_bound)
                     if timepoint.is_executed:
                         to_print += " Ex"
                 # Constraints between the other timepoints
                 else:
-                    to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self[j][i]['weight'], self[i][j]['weight'])
+                    to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self.get_edge_weight(j, i), self.get_edge_weight(i, j))
                     if self[i][j]['is_executed']:
                         to_print += " Ex"
 
@@ -64,7 +100,7 @@ class STN(nx.DiGraph):
             return False
         for (i, j, data) in self.edges.data():
             if other.has_edge(i, j):
-                if other[i][j]['weight'] != self[i][j]['weight']:
+                if other.get_edge_weight(i, j) != self.get_edge_weight(i, j):
                     return False
             else:
                 return False
@@ -78,19 +114,226 @@ class STN(nx.DiGraph):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    @property
+    def version(self):
+        return self._version
+
+    def add_node(self, node_for_adding, **attr):
+        if node_for_adding in self._node:
+            self._unindex_node(node_for_adding)
+        super().add_node(node_for_adding, **attr)
+        self._index_node(node_for_adding)
+        self._log_node(node_for_adding)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes_for_adding = list(nodes_for_adding)
+        node_ids = [n[0] if isinstance(n, tuple) else n for n in nodes_for_adding]
+        for node_id in node_ids:
+            if node_id in self._node:
+                self._unindex_node(node_id)
+        super().add_nodes_from(nodes_for_adding, **attr)
+        for node_id in node_ids:
+            self._index_node(node_id)
+            self._log_node(node_id)
+
+    def remove_node(self, n):
+        if n in self._node:
+            self._unindex_node(n)
+            self._log_node_removal(n)
+        super().remove_node(n)
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        for n in nodes:
+            if n in self._node:
+                self._unindex_node(n)
+                self._log_node_removal(n)
+        super().remove_nodes_from(nodes)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._log_edge(u_of_edge, v_of_edge)
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        ebunch_to_add = list(ebunch_to_add)
+        super().add_edges_from(ebunch_to_add, **attr)
+        for e in ebunch_to_add:
+            self._log_edge(e[0], e[1])
+
+    def remove_edge(self, u, v):
+        if self.has_edge(u, v):
+            self._log_edge_removal(u, v)
+        super().remove_edge(u, v)
+
+    def remove_edges_from(self, ebunch):
+        for e in list(ebunch):
+            if self.has_edge(e[0], e[1]):
+                self.remove_edge(e[0], e[1])
+
+    def _log_node(self, node_id):
+        self._version += 1
+        self._node_versions[node_id] = self._version
+
+    def _log_node_removal(self, node_id):
+        """ Logs the removal of the node and forgets the changes of the node and its edges.
+        Removing the node also removes its edges from the receiver of the patch
+        """
+        self._version += 1
+        self._removed_nodes[node_id] = self._version
+        self._node_versions.pop(node_id, None)
+        for j in self._succ[node_id]:
+            self._edge_versions.pop((node_id, j), None)
+        for i in self._pred[node_id]:
+            self._edge_versions.pop((i, node_id), None)
+
+    def _log_edge(self, i, j):
+        self._version += 1
+        self._edge_versions[(i, j)] = self._version
+
+    def _log_edge_removal(self, i, j):
+        self._version += 1
+        self._removed_edges[(i, j)] = self._version
+        self._edge_versions.pop((i, j), None)
+
+    def _log_sequence(self):
+        self._version += 1
+        self._sequence_version = self._version
+
+    def _reset_logs(self, version):
+        """ Starts the change logs at the given version
+        """
+        self._version = version
+        self._log_version = version
+        self._node_versions = dict()
+        self._edge_versions = dict()
+        self._removed_nodes = dict()
+        self._removed_edges = dict()
+        self._sequence_version = version
+
+    def _index_node(self, node_id):
+        """ Adds the node to the (task_id, node_type) and action_id indexes
+        """
+        node = self._node[node_id].get('data')
+        if node is None:
+            return
+        self._task_index.setdefault(node.task_id, dict())[node.node_type] = node_id
+        if node.action_id:
+            self._action_index[node.action_id] = node_id
+        if node.node_type != 'zero_timepoint' and node.task_id not in self._sequence:
+            self._sequence.append(node.task_id)
+            self._log_sequence()
+        if isinstance(node_id, int) and node_id >= self._next_node_id:
+            self._next_node_id = node_id + 1
+
+    def _unindex_node(self, node_id):
+        node = self._node[node_id].get('data')
+        if node is None:
+            return
+        task_nodes = self._task_index.get(node.task_id)
+        if task_nodes is not None and task_nodes.get(node.node_type) == node_id:
+            del task_nodes[node.node_type]
+            if not task_nodes:
+                del self._task_index[node.task_id]
+                if node.task_id in self._sequence:
+                    self._sequence.remove(node.task_id)
+                    self._log_sequence()
+        if node.action_id and self._action_index.get(node.action_id) == node_id:
+            del self._action_index[node.action_id]
+
+    def _get_task_index(self):
+        """ Returns the index {task_id: {node_type: node_id}}
+
+        Subgraph views share the nodes of the original graph but not its index,
+        so the index of a view is built on demand
+        """
+        if not nx.is_frozen(self):
+            return self._task_index
+        task_index = dict()
+        for node_id, data in self.nodes.data():
+            node = data['data']
+            task_index.setdefault(node.task_id, dict())[node.node_type] = node_id
+        return task_index
+
+    def _get_action_index(self):
+        if not nx.is_frozen(self):
+            return self._action_index
+        return {data['data'].action_id: node_id for node_id, data in self.nodes.data() if data['data'].action_id}
+
+    def _get_node_id(self, task_id, node_type):
+        return self._get_task_index().get(task_id, dict()).get(node_type)
+
+    def _get_root_graph(self):
+        """ Returns the graph that owns the nodes of the stn. Subgraph views share the
+        nodes of the original graph
+        """
+        graph = self
+        while nx.is_frozen(graph) and hasattr(graph, '_graph'):
+            graph = graph._graph
+        return graph
+
+    def _get_sequence(self):
+        """ Returns the task sequence of the stn. Subgraph views use the sequence of
+        the original graph
+        """
+        return self._get_root_graph()._sequence
+
+    def _get_task_at(self, position):
+        sequence = self._get_sequence()
+        if 1 <= position <= len(sequence):
+            return sequence[position-1]
+
+    def precedes(self, i, j):
+        """ Returns True if timepoint i is before timepoint j in the sequence of the stn
+
+        The zero timepoint is before all other timepoints
+        """
+        node_i = self.nodes[i]['data']
+        node_j = self.nodes[j]['data']
+        if node_j.node_type == 'zero_timepoint':
+            return False
+        if node_i.node_type == 'zero_timepoint':
+            return True
+        if node_i.task_id == node_j.task_id:
+            # The timepoints of a task get consecutive ids, in order
+            return i < j
+        return self._get_sequence().precedes(node_i.task_id, node_j.task_id)
+
+    def get_ordered_node_ids(self):
+        """ Returns the ids of the timepoints (excluding the zero timepoint) in sequence order
+        """
+        task_index = self._get_task_index()
+        node_ids = list()
+        for task_id in self._get_sequence():
+            if task_id in task_index:
+                node_ids += self.get_task_node_ids(task_id)
+        return node_ids
+
+    def get_next_node_id(self, node_id):
+        """ Returns the id of the timepoint after node_id in the sequence, or None
+        """
+        node = self.nodes[node_id]['data']
+        if node.node_type == 'zero_timepoint':
+            task_id = self._get_sequence().first
+        else:
+            task_node_ids = self.get_task_node_ids(node.task_id)
+            position = task_node_ids.index(node_id)
+            if position < len(task_node_ids) - 1:
+                return task_node_ids[position+1]
+            task_id = self._get_sequence().next(node.task_id)
+        if task_id is not None:
+            return self.get_task_node_ids(task_id)[0]
+
     def add_zero_timepoint(self):
         node = Node(generate_uuid(), 'zero_timepoint')
         self.add_node(0, data=node)
 
     def get_earliest_time(self):
-        edges = [e for e in self.edges]
-        first_edge = edges[0]
-        return -self[first_edge[1]][0]['weight']
+        first_node_id = self.get_task_node_ids(self._get_sequence().first)[0]
+        return -self.get_edge_weight(first_node_id, 0)
 
     def get_latest_time(self):
-        edges = [e for e in self.edges]
-        last_edge = edges[-1]
-        return self[0][last_edge[0]]['weight']
+        last_node_id = self.get_task_node_ids(self._get_sequence().last)[-1]
+        return self.get_edge_weight(0, last_node_id)
 
     def is_empty(self):
         return nx.is_empty(self)
@@ -111,21 +354,88 @@ class STN(nx.DiGraph):
          wij is the upper bound (maximum allocated time between i and j)
 
         The default upper and lower bounds are 0 and infinity
+
+        Returns False if the minimal network is tracked and the constraint makes the stn
+        inconsistent, True if the stn remains consistent and None if the minimal distances
+        are not known (see track_minimal_network)
         """
         # Minimum allocated time between i and j
         min_time = -wji
         # Maximum allocated time between i and j
         max_time = wij
 
+        if self._minimal_distances is not None and \
+                (self.get_edge_weight(j, i) < min_time or self.get_edge_weight(i, j) < max_time):
+            self._invalidate_minimal_distances()
+
         self.add_edge(j, i, weight=min_time, is_executed=False)
         self.add_edge(i, j, weight=max_time, is_executed=False)
 
+        self._propagate_edge(j, i, min_time)
+        self._propagate_edge(i, j, max_time)
+        if self._minimal_distances is not None:
+            return self._minimal_distances.is_consistent
+
     def remove_constraint(self, i, j):
         """ i : starting node id
             j : ending node id
         """
         self.remove_edge(i, j)
         self.remove_edge(j, i)
+        self._invalidate_minimal_distances()
+
+    def track_minimal_network(self, track=True):
+        """ Keeps the all-pairs shortest path distances (minimal network) of the stn up to date
+
+        Once computed, the distances are updated incrementally in O(n^2) per added or tightened
+        edge (add_task, update_task, assign_timepoint, ...). Removing or loosening a constraint
+        discards them and they are recomputed the next time they are needed. add_task and
+        update_task recompute them right away, so that they can tell whether the stn is still
+        consistent.
+
+        STP tracks the minimal network of the stns of the solvers that use it (e.g. fpc).
+
+        :param track: (bool) whether to track the minimal network
+        """
+        self._track_minimal_network = track
+        if not track:
+            self._minimal_distances = None
+
+    def get_minimal_distances(self):
+        """ Returns the node ids and the all-pairs shortest path distances of the stn
+
+        If the minimal network is tracked, the distances are not recomputed
+
+        Returns: (list of node ids, np.ndarray)
+        """
+        node_ids = list(self.nodes())
+        if self._minimal_distances is not None:
+            return node_ids, self._minimal_distances.get_matrix(node_ids)
+
+        node_ids, distances = self.get_weight_matrix()
+        floyd_warshall(distances)
+        if self._track_minimal_network:
+            self._minimal_distances = IncrementalAPSP(node_ids, distances)
+        return node_ids, distances
+
+    def _propagate_edge(self, i, j, weight):
+        if self._minimal_distances is None:
+            return
+        if not self._minimal_distances.add_edge(i, j, weight):
+            self.logger.debug("Edge %s => %s with weight %s makes the STN inconsistent", i, j, weight)
+
+    def _get_tracked_consistency(self):
+        """ Returns whether the stn is consistent if its minimal network is tracked, None
+        otherwise. Minimal distances that were discarded are recomputed
+        """
+        if not self._track_minimal_network:
+            return None
+        if self._minimal_distances is None:
+            self.get_minimal_distances()
+        return self._minimal_distances.is_consistent
+
+    def _invalidate_minimal_distances(self):
+        self._minimal_distances = None
 
     def get_constraints(self):
         """
@@ -136,7 +446,7 @@ class STN(nx.DiGraph):
         constraints = dict()
 
         for (i, j) in self.edges():
-            if i < j:
+            if self.precedes(i, j):
                 constraints[(i, j)] = self[i][j]
 
         return constraints
@@ -168,54 +478,233 @@ class STN(nx.DiGraph):
 
         Note: Position 0 is reserved for the zero_timepoint
         Add tasks from postion 1 onwards
+
+        Returns False if the minimal network is tracked and the task makes the stn inconsistent,
+        True if the stn remains consistent and None if the minimal network is not tracked
+        (see track_minimal_network)
         """
         self.logger.info("Adding task %s in position %s", task.task_id, position)
+        return self.add_tasks([(task, position)])
 
-        start_node_id = 2 * position + (position-2)
-        pickup_node_id = start_node_id + 1
-        delivery_node_id = pickup_node_id + 1
+    def add_tasks(self, tasks):
+        """ Adds several tasks to the STN in one pass
 
-        # Remove constraint linking start_node_id and previous node (if any)
-        if self.has_edge(start_node_id-1, start_node_id) and start_node_id-1 != 0:
-            self.logger.debug("Deleting constraint: %s  => %s", start_node_id-1, start_node_id)
+        The result is the same as calling add_task(task, position) for each (task, position)
+        in the given order, but the final sequence of tasks is computed first and each
+        timepoint and constraint is created once. Wait constraints between tasks that are
+        no longer consecutive are removed.
 
-            self.remove_constraint(start_node_id-1, start_node_id)
+        If the minimal network is tracked, it is updated once at the end
 
-        # Displace by 3 all nodes and constraints after position
-        mapping = {}
-        for node_id, data in self.nodes(data=True):
-            if node_id >= start_node_id:
-                mapping[node_id] = node_id + 3
-        self.logger.debug("mapping: %s ", mapping)
-        nx.relabel_nodes(self, mapping, copy=False)
+        Args:
+            tasks (list): list of tuples (task, position)
 
-        # Add new timepoints
-        self.add_timepoint(start_node_id, task, "start")
-        self.add_timepoint_constraint(start_node_id, task.get_timepoint("start"))
+        Returns False if the minimal network is tracked and the tasks make the stn inconsistent,
+        True if the stn remains consistent and None if the minimal network is not tracked
 
-        self.add_timepoint(pickup_node_id, task, "pickup", action_id=task.pickup_action_id)
-        self.add_timepoint_constraint(pickup_node_id, task.get_timepoint("pickup"))
+        Raises ValueError, without modifying the stn, if a task is already in the stn or appears
+        twice in tasks, or if a position is lower than 1
+        """
+        self.logger.debug("Adding %s tasks", len(tasks))
+        sequence = list(self._sequence)
+        new_tasks = dict()
+        for task, position in tasks:
+            task_id = from_str(task.task_id) if isinstance(task.task_id, str) else task.task_id
+            if task_id in new_tasks or task_id in self._sequence:
+                raise ValueError("Task {} is already in the stn".format(task_id))
+            if position < 1:
+                raise ValueError("Position {} of task {} is lower than 1".format(position, task_id))
+            sequence.insert(min(position, len(sequence) + 1) - 1, task_id)
+            new_tasks[task_id] = task
+
+        minimal_distances = self._minimal_distances
+        # The new constraints are propagated once all tasks have been added
+        self._minimal_distances = None
+
+        # Remove the constraints linking consecutive tasks that get new tasks in between
+        final_positions = {task_id: k for k, task_id in enumerate(sequence)}
+        removed_constraints = list()
+        old_sequence = list(self._sequence)
+        for prev_task_id, next_task_id in zip(old_sequence[:-1], old_sequence[1:]):
+            if final_positions[next_task_id] == final_positions[prev_task_id] + 1:
+                continue
+            prev_node_id = self.get_edge_node_idx(prev_task_id, "delivery")
+            next_node_id = self.get_edge_node_idx(next_task_id, "start")
+            if prev_node_id is None or next_node_id is None or not self.has_edge(prev_node_id, next_node_id):
+                continue
+            self.logger.debug("Deleting constraint: %s  => %s", prev_node_id, next_node_id)
+            # The minimal distances remain valid if the removed constraint is implied by
+            # the constraints of the new tasks. This is checked after adding the tasks
+            removed_constraints.append((prev_node_id, next_node_id,
+                                        self.get_edge_weight(next_node_id, prev_node_id),
+                                        self.get_edge_weight(prev_node_id, next_node_id)))
+            self.remove_edge(prev_node_id, next_node_id)
+            self.remove_edge(next_node_id, prev_node_id)
+
+        # Existing nodes keep their ids, the new timepoints get new ids
+        prev_task_id = None
+        new_node_ids = list()
+        for task_id in sequence:
+            if task_id in new_tasks:
+                self._sequence.insert_after(prev_task_id, task_id)
+                self._log_sequence()
+                task = new_tasks[task_id]
+                start_node_id = self._next_node_id
+                pickup_node_id = start_node_id + 1
+                delivery_node_id = pickup_node_id + 1
+
+                # Add new timepoints
+                self.add_timepoint(start_node_id, task, "start")
+                self.add_timepoint_constraint(start_node_id, task.get_timepoint("start"))
+
+                self.add_timepoint(pickup_node_id, task, "pickup", action_id=task.pickup_action_id)
+                self.add_timepoint_constraint(pickup_node_id, task.get_timepoint("pickup"))
+
+                self.add_timepoint(delivery_node_id, task, "delivery", action_id=task.delivery_action_id)
+                self.add_timepoint_constraint(delivery_node_id, task.get_timepoint("delivery"))
+                new_node_ids += [start_node_id, pickup_node_id, delivery_node_id]
+            prev_task_id = task_id
+
+        # Add constraints between new nodes and between the new nodes and their neighbours
+        for position, task_id in enumerate(sequence):
+            if task_id not in new_tasks:
+                continue
+            new_constraints_between = self.get_task_node_ids(task_id)
 
-        self.add_timepoint(delivery_node_id, task, "delivery", action_id=task.delivery_action_id)
-        self.add_timepoint_constraint(delivery_node_id, task.get_timepoint("delivery"))
+            # Check if there is a node after the new delivery node
+            if position < len(sequence) - 1:
+                next_node_id = self.get_edge_node_idx(sequence[position+1], "start")
+                if next_node_id is not None:
+                    new_constraints_between.append(next_node_id)
 
-        # Add constraints between new nodes
-        new_constraints_between = [start_node_id, pickup_node_id, delivery_node_id]
+            # Check if there is a node before the new start node, unless it belongs to a new
+            # task, which already added the constraint
+            if position > 0 and sequence[position-1] not in new_tasks:
+                prev_node_id = self.get_edge_node_idx(sequence[position-1], "delivery")
+                if prev_node_id is not None:
+                    new_constraints_between.insert(0, prev_node_id)
 
-        # Check if there is a node after the new delivery node
-        if self.has_node(delivery_node_id+1):
-            new_constraints_between.append(delivery_node_id+1)
+            self.logger.debug("New constraints between nodes: %s", new_constraints_between)
 
-        # Check if there is a node before the new start node
-        if self.has_node(start_node_id-1):
-            new_constraints_between.insert(0, start_node_id-1)
+            constraints = list(zip(new_constraints_between[:-1], new_constraints_between[1:]))
+            self.logger.debug("Constraints: %s", constraints)
 
-        self.logger.debug("New constraints between nodes: %s", new_constraints_between)
+            self.add_intertimepoints_constraints(constraints, new_tasks[task_id])
+
+        new_edges = set(self.in_edges(new_node_ids)) | set(self.out_edges(new_node_ids))
+        # The distances are recomputed if the removed constraints are not implied or if
+        # recomputing them is cheaper than propagating each edge
+        if minimal_distances is not None and len(new_edges) <= self.number_of_nodes() and \
+                all(self._is_implied(i, j, wji, wij) for (i, j, wji, wij) in removed_constraints):
+            self._minimal_distances = minimal_distances
+            for (i, j) in new_edges:
+                self._propagate_edge(i, j, self.get_edge_weight(i, j))
+        return self._get_tracked_consistency()
+
+    def _is_implied(self, i, j, wji, wij):
+        """ Returns True if the path of consecutive nodes from i to j implies the
+        constraint i --- [-wji, wij] ---> j
+        """
+        forward = backward = 0
+        k = i
+        while k != j:
+            next_k = self.get_next_node_id(k)
+            forward += self.get_edge_weight(k, next_k)
+            backward += self.get_edge_weight(next_k, k)
+            k = next_k
+        return forward <= wij and backward <= wji
+
+    def evaluate_insertions(self, task, solver, temporal_criterion='completion_time', positions=None):
+        """ Evaluates the insertion of the task at each position, without modifying the stn
+
+        The minimal network of the stn is computed once and shared by all positions:
+        - A position is rejected without solving if the stn with the task is not consistent.
+          The new timepoints are only constrained with the zero timepoint and the timepoints
+          before and after them, so this is checked on the minimal distances between those
+          timepoints and the constraints of the task (at most 6 timepoints)
+        - The other positions are solved on a copy of the stn with the task. If the solver
+          uses the minimal network (e.g. fpc), it is updated incrementally when the task is added
 
-        constraints = [((i), (i + 1)) for i in new_constraints_between[:-1]]
-        self.logger.debug("Constraints: %s", constraints)
+        Args:
+            task (Task): task to insert
+            solver: STP (object) or name of the solver, e.g. 'fpc'
+            temporal_criterion (str): 'completion_time', 'makespan' or 'idle_time'
+            positions (list): positions to evaluate, defaults to all positions (1 to number of tasks + 1)
+
+        Returns: list of tuples (position, feasible, temporal_metric, risk_metric) sorted from
+        best to worst: feasible positions first, by temporal metric, risk metric and position.
+        temporal_metric and risk_metric are None if the position is not feasible
+        """
+        if isinstance(solver, str):
+            from stn.stp import STP
+            solver = STP(solver)
+        n_tasks = len(self.get_tasks())
+        if positions is None:
+            positions = range(1, n_tasks + 2)
+
+        stn = self.clone()
+        # The copies are only kept minimal if the solver uses their minimal network
+        stn.track_minimal_network(getattr(solver.solver, 'uses_minimal_network', False))
+        node_ids, distances = stn.get_minimal_distances()
+        index = {node_id: k for k, node_id in enumerate(node_ids)}
+
+        # Timepoints and constraints of the task, with the zero timepoint in the first row
+        task_stn = self.__class__()
+        task_stn.add_task(task, 1)
+        task_node_ids, task_weights = task_stn.get_weight_matrix()
+        task_order = [0] + [node_id for node_id in task_node_ids if node_id != 0]
+        task_rows = [task_node_ids.index(node_id) for node_id in task_order]
+        task_weights = task_weights[np.ix_(task_rows, task_rows)]
+
+        results = list()
+        consistent = has_no_negative_cycles(distances)
+        for position in positions:
+            position = min(position, n_tasks + 1)
+            if not consistent or not self._is_insertion_consistent(distances, index, task_weights, position):
+                self.logger.debug("The task cannot be inserted in position %s", position)
+                results.append((position, False, None, None))
+                continue
 
-        self.add_intertimepoints_constraints(constraints, task)
+            insertion_stn = stn.clone()
+            insertion_stn.add_task(task, position)
+            try:
+                dispatchable_graph = solver.solve(insertion_stn)
+            except NoSTPSolution:
+                results.append((position, False, None, None))
+                continue
+            results.append((position, True, dispatchable_graph.compute_temporal_metric(temporal_criterion),
+                            dispatchable_graph.risk_metric))
+
+        return sorted(results, key=lambda result: (not result[1], result[2] or 0, result[3] or 0, result[0]))
+
+    def _is_insertion_consistent(self, distances, index, task_weights, position):
+        """ Returns True if the stn with a task in the given position is consistent
+
+        Args:
+            distances (np.ndarray): minimal distances of the stn
+            index (dict): {node_id: row in distances}
+            task_weights (np.ndarray): weight matrix of the zero timepoint and the start,
+            pickup and delivery timepoints of the task (in this order)
+            position (int): position of the task
+        """
+        # Timepoints constrained with the new timepoints, the zero timepoint first
+        interface = [0]
+        prev_node_id = self.get_edge_node_idx(self._get_task_at(position - 1), "delivery") if position > 1 else None
+        next_node_id = self.get_edge_node_idx(self._get_task_at(position), "start")
+        interface += [node_id for node_id in (prev_node_id, next_node_id) if node_id is not None]
+        rows = [index[node_id] for node_id in interface]
+
+        n = len(interface)
+        weights = np.full((n + 3, n + 3), np.inf)
+        weights[:n, :n] = distances[np.ix_(rows, rows)]
+        new_rows = [0, n, n + 1, n + 2]
+        weights[np.ix_(new_rows, new_rows)] = np.minimum(weights[np.ix_(new_rows, new_rows)], task_weights)
+        # Wait time between the delivery of a task and the start of the next one, [0, inf]
+        if prev_node_id is not None:
+            weights[n, interface.index(prev_node_id)] = 0
+        if next_node_id is not None:
+            weights[interface.index(next_node_id), n + 2] = 0
+        return has_no_negative_cycles(floyd_warshall(weights))
 
     def add_intertimepoints_constraints(self, constraints, task):
         """ Adds constraints between the timepoints of a task
@@ -279,10 +768,16 @@ class STN(nx.DiGraph):
         self.logger.info("Edges: %s ", self.number_of_edges())
 
     def update_task(self, task):
-        position = self.get_task_position(task.task_id)
-        start_node_id = 2 * position + (position-2)
-        pickup_node_id = start_node_id + 1
-        delivery_node_id = pickup_node_id + 1
+        """ Updates the constraints of the task
+
+        Returns False if the minimal network is tracked and the new constraints make the stn
+        inconsistent, True if the stn remains consistent and None if the minimal network is not
+        tracked (see track_minimal_network)
+        """
+        start_node_id, pickup_node_id = self.get_edge_nodes_idx(task.task_id, "start", "pickup")
+        delivery_node_id = self.get_edge_node_idx(task.task_id, "delivery")
+        prev_task_id = self._sequence.prev(task.task_id)
+        next_task_id = self._sequence.next(task.task_id)
 
         # Adding an existing timepoint constraint updates the constraint
         self.add_timepoint_constraint(start_node_id, task.get_timepoint("start"))
@@ -293,62 +788,45 @@ class STN(nx.DiGraph):
         new_constraints_between = [start_node_id, pickup_node_id, delivery_node_id]
 
         # Check if there is a node after the new delivery node
-        if self.has_node(delivery_node_id+1):
-            new_constraints_between.append(delivery_node_id+1)
+        next_node_id = self.get_edge_node_idx(next_task_id, "start")
+        if next_node_id is not None:
+            new_constraints_between.append(next_node_id)
 
         # Check if there is a node before the new start node
-        if self.has_node(start_node_id-1):
-            new_constraints_between.insert(0, start_node_id-1)
+        prev_node_id = self.get_edge_node_idx(prev_task_id, "delivery")
+        if prev_node_id is not None:
+            new_constraints_between.insert(0, prev_node_id)
 
-        constraints = [((i), (i + 1)) for i in new_constraints_between[:-1]]
+        constraints = list(zip(new_constraints_between[:-1], new_constraints_between[1:]))
         self.add_intertimepoints_constraints(constraints, task)
+        return self._get_tracked_consistency()
 
     def remove_task(self, position=1):
         """ Removes the task from the given position"""
 
         self.logger.info("Removing task at position: %s", position)
-        start_node_id = 2 * position + (position-2)
-        pickup_node_id = start_node_id + 1
-        delivery_node_id = pickup_node_id + 1
-
-        new_constraints_between = list()
-
-        if self.has_node(start_node_id-1) and self.has_node(delivery_node_id+1):
-            new_constraints_between = [start_node_id-1, start_node_id]
-
-        # Remove node and all adjacent edges
-        self.remove_node(start_node_id)
-        self.remove_node(pickup_node_id)
-        self.remove_node(delivery_node_id)
-
-        # Displace by -3 all nodes and constraints after position
-        mapping = {}
-        for node_id, data in self.nodes(data=True):
-            if node_id >= start_node_id:
-                mapping[node_id] = node_id - 3
-        self.logger.debug("mapping: %s", mapping)
-        nx.relabel_nodes(self, mapping, copy=False)
+        task_id = self.get_task_id(position)
+        if task_id is None:
+            return
 
-        if new_constraints_between:
-            constraints = [((i), (i + 1)) for i in new_constraints_between[:-1]]
-            self.logger.debug("Constraints: %s", constraints)
+        prev_node_id = self.get_edge_node_idx(self._sequence.prev(task_id), "delivery")
+        next_node_id = self.get_edge_node_idx(self._sequence.next(task_id), "start")
 
-            for (i, j) in constraints:
-                if self.nodes[i]['data'].node_type == "delivery":
-                    # wait time between finish of one task and start of the next one
-                    self.add_constraint(i, j)
+        # Remove node and all adjacent edges. The other nodes keep their ids
+        self.remove_nodes_from(self.get_task_node_ids(task_id))
+        self._invalidate_minimal_distances()
 
-    def remove_node_ids(self, node_ids):
-        # Assumes that the node_ids are in consecutive order from node_id 1 onwards
-        for node_id in node_ids:
-            self.remove_node(node_id)
+        if prev_node_id is not None and next_node_id is not None:
+            self.logger.debug("Constraints: %s", [(prev_node_id, next_node_id)])
+            # wait time between finish of one task and start of the next one
+            self.add_constraint(prev_node_id, next_node_id)
 
-        # Displace all remaining nodes by 3
-        mapping = {}
-        for node_id, data in self.nodes(data=True):
-            if node_id > 0:
-                mapping[node_id] = node_id - 3
-        nx.relabel_nodes(self, mapping, copy=False)
+    def remove_node_ids(self, node_ids):
+        """ Removes the given nodes. A task is removed from the sequence once all its
+        nodes have been removed
+        """
+        self.remove_nodes_from(node_ids)
+        self._invalidate_minimal_distances()
 
     def get_tasks(self):
         """
@@ -356,14 +834,24 @@ class STN(nx.DiGraph):
         Each timepoint in the STN is associated with a task.
         return  list of task ids
         """
-        tasks = list()
-        for i in self.nodes():
-            if self.nodes[i]['data'].task_id not in tasks and self.nodes[i]['data'].node_type != 'zero_timepoint':
-                tasks.append(self.nodes[i]['data'].task_id)
-        return tasks
+        if not nx.is_frozen(self):
+            return list(self._sequence)
+        task_index = self._get_task_index()
+        return [task_id for task_id in self._get_sequence() if task_id in task_index]
+
+    def is_consistent(self, shortest_path_array=None):
+        """The STN is not consistent if it has negative cycles
+
+        If no shortest_path_array is given, the minimal distances are used
+        """
+        if shortest_path_array is None:
+            if self._minimal_distances is not None:
+                return self._minimal_distances.is_consistent
+            if self._track_minimal_network:
+                node_ids, distances = self.get_minimal_distances()
+                return has_no_negative_cycles(distances)
+            return find_negative_cycle(self) is None
 
-    def is_consistent(self, shortest_path_array):
-        """The STN is not consistent if it has negative cycles"""
         consistent = True
         for node, nodes in shortest_path_array.items():
             # Check if the tolerance is too large. Maybe it is better to use
@@ -394,14 +882,13 @@ class STN(nx.DiGraph):
 
         if self.has_edge(i, j):
 
-            if self[i][j]['weight'] == 'inf':
-                self[i][j]['weight'] = float('inf')
-
-            if weight < self[i][j]['weight']:
-                self[i][j]['weight'] = weight
+            if weight < self.get_edge_weight(i, j):
+                self._set_edge_weight(i, j, weight)
+                self._propagate_edge(i, j, weight)
 
-            if force:
-                self[i][j]['weight'] = weight
+            elif force:
+                self._set_edge_weight(i, j, weight)
+                self._invalidate_minimal_distances()
 
     def assign_timepoint(self, allotted_time, node_id, force=False):
         """
@@ -416,11 +903,9 @@ class STN(nx.DiGraph):
         self.update_edge_weight(node_id, 0, -allotted_time, force)
 
     def assign_earliest_time(self, time_, task_id, node_type, force=False):
-        for i in self.nodes():
-            node_data = self.nodes[i]['data']
-            if node_data.task_id == task_id and node_data.node_type == node_type:
-                self.update_edge_weight(i, 0, -time_, force)
-                break
+        node_id = self._get_node_id(task_id, node_type)
+        if node_id is not None:
+            self.update_edge_weight(node_id, 0, -time_, force)
 
     def get_edge_weight(self, i, j):
         """ Returns the weight of the edge between node starting_node and node ending_node
@@ -435,6 +920,143 @@ class STN(nx.DiGraph):
             else:
                 return float('inf')
 
+    def _set_edge_weight(self, i, j, weight):
+        """ Overwrites the weight of an existing edge, without rounding or checks
+        """
+        self[i][j]['weight'] = weight
+        self._log_edge(i, j)
+
+    def clone(self):
+        """ Returns a copy of the stn
+
+        Cheaper than copy.deepcopy: the node payloads (Node objects) are shared with the
+        original stn and only the graph structure and the edge attributes (weights) are
+        copied. A shared node is copied before the stn modifies it (copy-on-write), or before
+        it is returned by get_node, get_task_nodes, get_node_by_type, get_nodes_by_task and
+        get_nodes_by_action, which give nodes that the caller can modify (e.g. node.execute()).
+        The nodes in stn.nodes[node_id]['data'] are shared and must not be modified.
+        Changes made through the stn methods (e.g. execute_timepoint) are also logged for
+        get_patch
+        """
+        stn = self.__class__.__new__(self.__class__)
+        nx.DiGraph.__init__(stn)
+        self._copy_to(stn)
+        return stn
+
+    def _copy_to(self, stn):
+        """ Copies the graph and the attributes of this stn into stn, an empty graph
+        """
+        stn.graph.update(self.graph)
+        for n, attr in self._node.items():
+            stn._node[n] = stn.node_attr_dict_factory(attr)
+            stn._succ[n] = dict()
+            stn._pred[n] = dict()
+        for u, neighbors in self._succ.items():
+            for v, data in neighbors.items():
+                data = stn.edge_attr_dict_factory(data)
+                stn._succ[u][v] = data
+                stn._pred[v][u] = data
+
+        stn._task_index = {task_id: dict(task_nodes) for task_id, task_nodes in self._get_task_index().items()}
+        stn._action_index = dict(self._get_action_index())
+        stn._sequence = self._sequence.copy() if not nx.is_frozen(self) else OrderList(self.get_tasks())
+        stn._next_node_id = self._next_node_id
+        stn._shared_nodes = set(self._node)
+        self._get_root_graph()._shared_nodes.update(self._node)
+        stn.max_makespan = self.max_makespan
+        stn.risk_metric = self.risk_metric
+        stn._track_minimal_network = self._track_minimal_network
+        stn._minimal_distances = self._minimal_distances.copy() if self._minimal_distances is not None else None
+        stn._version = self._version
+        stn._log_version = self._log_version
+        stn._node_versions = dict(self._node_versions)
+        stn._edge_versions = dict(self._edge_versions)
+        stn._removed_nodes = dict(self._removed_nodes)
+        stn._removed_edges = dict(self._removed_edges)
+        stn._sequence_version = self._sequence_version
+
+    def _get_unshared_node(self, node_id):
+        """ Returns the Node of node_id, copying it first if it is shared with a clone
+        """
+        attr = self._node[node_id]
+        shared_nodes = self._get_root_graph()._shared_nodes
+        if node_id in shared_nodes:
+            attr['data'] = copy.copy(attr['data'])
+            shared_nodes.discard(node_id)
+        return attr['data']
+
+    def _get_own_node(self, node_id):
+        """ Returns the Node of node_id to be modified by the stn
+        """
+        node = self._get_unshared_node(node_id)
+        self._log_node(node_id)
+        return node
+
+    def relabel_nodes(self, mapping):
+        """ Relabels the nodes in place
+
+        :param mapping: dict {old_node_id: new_node_id}
+        """
+        nx.relabel_nodes(self, mapping, copy=False)
+        self._shared_nodes = {mapping.get(node_id, node_id) for node_id in self._shared_nodes}
+        if self._minimal_distances is not None:
+            self._minimal_distances.relabel(mapping)
+
+    def get_shortest_path_array(self):
+        """ Returns the all-pairs shortest path distances of the stn
+        as a dictionary {i: {j: distance}}
+        """
+        node_ids, distances = self.get_weight_matrix()
+        floyd_warshall(distances)
+        return {i: dict(zip(node_ids, distances[r].tolist())) for r, i in enumerate(node_ids)}
+
+    def get_weight_matrix(self):
+        """ Returns the node ids and the weight matrix of the stn
+
+        The weight matrix has one row (and column) per node, in the order
+        given by the returned list of node ids. Missing edges have weight infinity.
+
+        Returns: (list of node ids, np.ndarray)
+        """
+        node_ids = list(self.nodes())
+        index = {node_id: r for r, node_id in enumerate(node_ids)}
+        weights = np.full((len(node_ids), len(node_ids)), np.inf)
+        np.fill_diagonal(weights, 0.)
+        for i, neighbors in self.adjacency():
+            for j, data in neighbors.items():
+                weights[index[i], index[j]] = float(data['weight'])
+        return node_ids, weights
+
+    def get_edge_arrays(self):
+        """ Returns the edges of the stn as arrays, in the order of self.edges()
+
+        Returns: (np.ndarray of source node ids, np.ndarray of target node ids, np.ndarray of weights)
+        """
+        edges = list(self.edges(data='weight'))
+        sources = np.fromiter((i for i, j, weight in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((j for i, j, weight in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((weight for i, j, weight in edges), dtype=float, count=len(edges))
+        return sources, targets, weights
+
+    def update_edges_from_matrix(self, node_ids, distances):
+        """ Updates the edges in the STN to reflect the distances in the given matrix
+
+        Only existing edges are updated, and only if the new weight (rounded to two
+        decimals) is less than the previous weight
+
+        :param node_ids: list of node ids, in the order of the rows of distances
+        :param distances: np.ndarray with the new distances
+        """
+        index = {node_id: r for r, node_id in enumerate(node_ids)}
+        distances = round_distances(distances)
+        for i, neighbors in self.adjacency():
+            row = distances[index[i]]
+            for j, data in neighbors.items():
+                weight = row[index[j]]
+                if weight < float(data['weight']):
+                    data['weight'] = float(weight)
+                    self._log_edge(i, j)
+
     def compute_temporal_metric(self, temporal_criterion):
         if temporal_criterion == 'completion_time':
             temporal_metric = self.get_completion_time()
@@ -455,9 +1077,8 @@ class STN(nx.DiGraph):
         return completion_time
 
     def get_makespan(self):
-        nodes = list(self.nodes())
-        node_last_task = nodes[-1]
-        last_task_finish_time = - self[node_last_task][0]['weight']
+        node_last_task = self.get_ordered_node_ids()[-1]
+        last_task_finish_time = -self.get_edge_weight(node_last_task, 0)
 
         return last_task_finish_time
 
@@ -494,48 +1115,49 @@ class STN(nx.DiGraph):
 
     def get_time(self, task_id, node_type='start', lower_bound=True):
         _time = None
-        for i, data in self.nodes.data():
+        i = self._get_node_id(task_id, node_type)
 
-            if task_id == data['data'].task_id and data['data'].node_type == node_type:
-                if lower_bound:
-                    _time = -self[i][0]['weight']
-                else:  # upper bound
-                    _time = self[0][i]['weight']
+        if i is not None:
+            if lower_bound:
+                _time = -self.get_edge_weight(i, 0)
+            else:  # upper bound
+                _time = self.get_edge_weight(0, i)
 
         return _time
 
     def get_node_earliest_time(self, node_id):
-        return -self[node_id][0]['weight']
+        return -self.get_edge_weight(node_id, 0)
 
     def get_node_latest_time(self, node_id):
-        return self[0][node_id]['weight']
+        return self.get_edge_weight(0, node_id)
 
     def get_nodes_by_action(self, action_id):
         nodes = list()
-        for node_id, data in self.nodes.data():
-            if data['data'].action_id == action_id:
-                node = (node_id, self.nodes[node_id]['data'])
-                nodes.append(node)
+        node_id = self._get_action_index().get(action_id)
+        if node_id is not None:
+            node = (node_id, self._get_unshared_node(node_id))
+            nodes.append(node)
         return nodes
 
     def get_nodes_by_task(self, task_id):
         nodes = list()
-        for node_id, data in self.nodes.data():
-            if data['data'].task_id == task_id:
-                node = (node_id, self.nodes[node_id]['data'])
-                nodes.append(node)
+        for node_id in self._get_task_index().get(task_id, dict()).values():
+            node = (node_id, self._get_unshared_node(node_id))
+            nodes.append(node)
         return nodes
 
     def get_node_by_type(self, task_id, node_type):
-        for node_id, data in self.nodes.data():
-            if data['data'].task_id == task_id and data['data'].node_type == node_type:
-                return node_id, self.nodes[node_id]['data']
+        node_id = self._get_node_id(task_id, node_type)
+        if node_id is not None:
+            return node_id, self._get_unshared_node(node_id)
 
     def set_action_id(self, node_id, action_id):
-        self.nodes[node_id]['data'].action_id = action_id
+        self._unindex_node(node_id)
+        self._get_own_node(node_id).action_id = action_id
+        self._index_node(node_id)
 
     def get_node(self, node_id):
-        return self.nodes[node_id]['data']
+        return self._get_unshared_node(node_id)
 
     def get_task_id(self, position):
         """ Returns the id of the task in the given position
@@ -546,37 +1168,26 @@ class STN(nx.DiGraph):
         Returns: (string) task id
 
         """
-        start_node_id = 2 * position + (position-2)
-        pickup_node_id = start_node_id + 1
-        delivery_node_id = pickup_node_id + 1
-
-        if self.has_node(start_node_id):
-            task_id = self.nodes[start_node_id]['data'].task_id
-        elif self.has_node(pickup_node_id):
-            task_id = self.nodes[pickup_node_id]['data'].task_id
-        elif self.has_node(delivery_node_id):
-            task_id = self.nodes[delivery_node_id]['data'].task_id
-        else:
+        task_id = self._get_task_at(position)
+        if task_id is None:
             self.logger.error("There is no task in position %s", position)
             return
 
         return task_id
 
     def get_task_position(self, task_id):
-        for i, data in self.nodes.data():
-            if task_id == data['data'].task_id and data['data'].node_type == 'start':
-                return math.ceil(i/3)
+        sequence = self._get_sequence()
+        if task_id in sequence:
+            return sequence.index(task_id) + 1
 
     def get_earliest_task_id(self):
         """ Returns the id of the earliest task in the stn
 
         Returns: task_id (string)
         """
-        # The first task in the graph is the task with the earliest start time
-        # The first task is in node 1, node 0 is reserved for the zero timepoint
-
-        if self.has_node(1):
-            task_id = self.nodes[1]['data'].task_id
+        # The first task in the sequence is the task with the earliest start time
+        task_id = self._get_sequence().first
+        if task_id is not None:
             return task_id
 
         self.logger.debug("STN has no tasks yet")
@@ -591,9 +1202,8 @@ class STN(nx.DiGraph):
 
         """
         nodes = list()
-        for i in self.nodes():
-            if task_id == self.nodes[i]['data'].task_id:
-                nodes.append(self.nodes[i]['data'])
+        for i in self.get_task_node_ids(task_id):
+            nodes.append(self._get_unshared_node(i))
 
         return nodes
 
@@ -606,10 +1216,9 @@ class STN(nx.DiGraph):
         Returns: list of node ids
 
         """
-        node_ids = list()
-        for i in self.nodes():
-            if task_id == self.nodes[i]['data'].task_id:
-                node_ids.append(i)
+        task_nodes = self._get_task_index().get(task_id, dict())
+        # The timepoints of a task get consecutive ids, in order
+        node_ids = sorted(task_nodes.values())
 
         return node_ids
 
@@ -649,11 +1258,14 @@ class STN(nx.DiGraph):
         return sub_graph
 
     def execute_timepoint(self, node_id):
-        self.nodes[node_id]['data'].is_executed = True
+        self._get_own_node(node_id).is_executed = True
 
     def execute_edge(self, node_1, node_2):
         nx.set_edge_attributes(self, {(node_1, node_2): {'is_executed': True},
                                       (node_2, node_1): {'is_executed': True}})
+        for i, j in ((node_1, node_2), (node_2, node_1)):
+            if self.has_edge(i, j):
+                self._log_edge(i, j)
 
     def execute_incoming_edge(self, task_id, node_type):
         finish_node_idx = self.get_edge_node_idx(task_id, node_type)
@@ -671,54 +1283,159 @@ class STN(nx.DiGraph):
             node_data = self.nodes[i]['data']
             if not node_data.is_executed:
                 continue
-            if node_data.is_executed and (self.has_edge(i, i+1) and self[i][i+1]['is_executed']):
+            next_node_id = self.get_next_node_id(i)
+            if next_node_id is not None and self.has_edge(i, next_node_id) and self[i][next_node_id]['is_executed']:
                 nodes_to_remove.append(i)
 
         for node in nodes_to_remove:
             self.remove_node(node)
+        if nodes_to_remove:
+            self._invalidate_minimal_distances()
 
     def get_edge_node_idx(self, task_id, node_type):
-        for i in self.nodes():
-            node_data = self.nodes[i]['data']
-            if node_data.task_id == task_id and node_data.node_type == node_type:
-                return i
+        return self._get_node_id(task_id, node_type)
 
     def get_edge_nodes_idx(self, task_id, node_type_1, node_type_2):
-        for i in self.nodes():
-            node_data = self.nodes[i]['data']
-            if node_data.task_id == task_id and node_data.node_type == node_type_1:
-                start_node_idx = i
-            elif node_data.task_id == task_id and node_data.node_type == node_type_2:
-                finish_node_idx = i
+        start_node_idx = self._get_node_id(task_id, node_type_1)
+        finish_node_idx = self._get_node_id(task_id, node_type_2)
 
         return start_node_idx, finish_node_idx
 
     def to_json(self):
         stn_dict = self.to_dict()
-        MyEncoder().encode(stn_dict)
         stn_json = json.dumps(stn_dict, cls=MyEncoder)
         return stn_json
 
     def to_dict(self):
-        stn = copy.deepcopy(self)
-        for i, data in self.nodes.data():
-            stn.nodes[i]['data'] = self.nodes[i]['data'].to_dict()
-        stn_dict = json_graph.node_link_data(stn)
-        return stn_dict
+        """ Returns the stn as a dictionary in networkx node-link format
+
+        The task sequence is stored in stn_dict['graph']['task_sequence'] and the version
+        of the stn in stn_dict['graph']['version']
+        """
+        graph = dict(self.graph)
+        graph['task_sequence'] = [str(task_id) for task_id in self.get_tasks()]
+        graph['version'] = self._version
+
+        nodes = [{'data': data['data'].to_dict(), 'id': i} for i, data in self.nodes.data()]
+        links = [self._get_link(i, j) for i, j in self.edges()]
+
+        return {'directed': True, 'multigraph': False, 'graph': graph, 'nodes': nodes, 'links': links}
+
+    def _get_link(self, i, j):
+        link = dict(self[i][j].items())
+        link['weight'] = self.get_edge_weight(i, j)
+        link['source'] = i
+        link['target'] = j
+        return link
 
     @classmethod
     def from_json(cls, stn_json):
-        stn = cls()
-        dict_json = json.loads(stn_json)
-        graph = json_graph.node_link_graph(dict_json)
-        stn.add_nodes_from([(i, {'data': Node.from_dict(graph.nodes[i]['data'])}) for i in graph.nodes()])
-        stn.add_edges_from(graph.edges(data=True))
+        stn_dict = json.loads(stn_json)
+        return cls.from_dict(stn_dict)
+
+    def to_binary(self):
+        """ Returns the stn in a compact binary format (bytes), see stn.utils.binary_format
+        """
+        return binary_format.encode(self)
 
+    @classmethod
+    def from_binary(cls, stn_binary):
+        stn = cls()
+        version = binary_format.decode(stn, stn_binary)
+        stn._reset_logs(version)
         return stn
 
     @classmethod
     def from_dict(cls, stn_dict):
-        stn_json = json.dumps(stn_dict, cls=MyEncoder)
-        stn = cls.from_json(stn_json)
+        """ Returns an stn from a dictionary in networkx node-link format. The edges can be
+        under 'links' or 'edges'
+        """
+        stn = cls()
+        # Stns without a task sequence have positional node ids
+        for task_id in stn_dict.get('graph', dict()).get('task_sequence', list()):
+            stn._sequence.append(from_str(task_id) if isinstance(task_id, str) else task_id)
+
+        nodes = sorted(stn_dict['nodes'], key=lambda node: node['id'])
+        stn.add_nodes_from((node['id'], {'data': Node.from_dict(node['data'])}) for node in nodes)
+
+        links = stn_dict['links'] if 'links' in stn_dict else stn_dict['edges']
+        stn.add_edges_from((link['source'], link['target'],
+                            {key: value for key, value in link.items() if key not in ('source', 'target')})
+                           for link in links)
+        stn._reset_logs(stn_dict.get('graph', dict()).get('version', 0))
         return stn
 
+    def get_hash(self):
+        """ Returns a hash (hex string) of the task sequence, nodes and edges of the stn
+        """
+        return binary_format.get_hash(self)
+
+    def get_patch(self, since_version):
+        """ Returns the changes of the stn since since_version as a dictionary
+
+        Applying the patch to a copy of the stn at since_version (see apply_patch) brings
+        the copy to the current version. Only the nodes and edges that changed are included,
+        in the node-link format of to_dict, together with the removed nodes and edges, the
+        task sequence (if it changed) and a hash of the stn.
+
+        :param since_version: (int) version of the receiver's copy of the stn
+        """
+        if not self._log_version <= since_version <= self._version:
+            raise ValueError("No changes logged since version {} (logged versions: {}-{})".format(
+                since_version, self._log_version, self._version))
+
+        patch = {'base_version': since_version,
+                 'version': self._version,
+                 'hash': self.get_hash(),
+                 'nodes': [{'data': self._node[i]['data'].to_dict(), 'id': i}
+                           for i, version in self._node_versions.items()
+                           if version > since_version and 'data' in self._node[i]],
+                 'links': [self._get_link(i, j) for (i, j), version in self._edge_versions.items()
+                           if version > since_version],
+                 'removed_nodes': [i for i, version in self._removed_nodes.items() if version > since_version],
+                 'removed_links': [[i, j] for (i, j), version in self._removed_edges.items()
+                                   if version > since_version]}
+        if self._sequence_version > since_version:
+            patch['task_sequence'] = [str(task_id) for task_id in self.get_tasks()]
+        return patch
+
+    def get_binary_patch(self, since_version):
+        """ Returns the changes of the stn since since_version in a compact binary format (bytes),
+        see get_patch and stn.utils.binary_format
+        """
+        return binary_format.encode_patch(self.get_patch(since_version))
+
+    def apply_patch(self, patch):
+        """ Applies a patch produced by get_patch or get_binary_patch of another copy of the stn
+
+        :param patch: dict, json string or bytes
+        Raises PatchError if the stn is not at the base version of the patch or if the hash of
+        the patched stn does not match the hash in the patch. In the latter case, the stn has
+        diverged and should be replaced by a full copy (e.g. from_json)
+        """
+        if isinstance(patch, (bytes, bytearray, memoryview)):
+            patch = binary_format.decode_patch(patch)
+        elif isinstance(patch, str):
+            patch = json.loads(patch)
+
+        if patch['base_version'] != self._version:
+            raise PatchError("The patch applies to version {}, the stn is at version {}".format(
+                patch['base_version'], self._version))
+
+        # Removals come first, a node or an edge can be removed and added again
+        self.remove_edges_from(patch['removed_links'])
+        self.remove_nodes_from(patch['removed_nodes'])
+
+        if 'task_sequence' in patch:
+            self._sequence = OrderList(from_str(task_id) for task_id in patch['task_sequence'])
+        nodes = sorted(patch['nodes'], key=lambda node: node['id'])
+        self.add_nodes_from((node['id'], {'data': Node.from_dict(node['data'])}) for node in nodes)
+        self.add_edges_from((link['source'], link['target'],
+                             {key: value for key, value in link.items() if key not in ('source', 'target')})
+                            for link in patch['links'])
+
+        self._invalidate_minimal_distances()
+        self._reset_logs(patch['version'])
+        if self.get_hash() != patch['hash']:
+            raise PatchError("The patched stn does not match the stn at version {}".format(patch['version']))
+
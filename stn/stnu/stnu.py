@@ -20,24 +20,24 @@ class STNU(STN):
     def __str__(self):
         to_print = ""
         for (i, j, data) in self.edges.data():
-            if self.has_edge(j, i) and i < j:
+            if self.has_edge(j, i) and self.precedes(i, j):
                 # Constraints with the zero timepoint
                 if i == 0:
                     timepoint = self.nodes[j]['data']
-                    lower_bound = -self[j][i]['weight']
-                    upper_bound = self[i][j]['weight']
+                    lower_bound = -self.get_edge_weight(j, i)
+                    upper_bound = self.get_edge_weight(i, j)
                     to_print += "Timepoint {}: [{}, {}]".format(timepoint, lower_bound, upper_bound)
                     if timepoint.is_executed:
                         to_print += " Ex"
                 # Constraints between the other timepoints
                 else:
                     if self[j][i]['is_contingent'] is True:
-                        to_print += "Constraint {} => {}: [{}, {}] (contingent)".format(i, j, -self[j][i]['weight'], self[i][j]['weight'])
+                        to_print += "Constraint {} => {}: [{}, {}] (contingent)".format(i, j, -self.get_edge_weight(j, i), self.get_edge_weight(i, j))
                         if self[i][j]['is_executed']:
                             to_print += " Ex"
                     else:
 
-                        to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self[j][i]['weight'], self[i][j]['weight'])
+                        to_print += "Constraint {} => {}: [{}, {}]".format(i, j, -self.get_edge_weight(j, i), self.get_edge_weight(i, j))
                         if self[i][j]['is_executed']:
                             to_print += " Ex"
 
@@ -71,10 +71,11 @@ class STNU(STN):
         I a constraint is not contingent, then it is of node_type requirement and its value is assigned by the system.
         """
 
-        super().add_constraint(i, j, wji, wij)
+        consistent = super().add_constraint(i, j, wji, wij)
 
         self.add_edge(i, j, is_contingent=is_contingent)
         self.add_edge(j, i, is_contingent=is_contingent)
+        return consistent
 
     def get_contingent_constraints(self):
         """ Returns a dictionary with the contingent constraints in the STNU
@@ -83,7 +84,7 @@ class STNU(STN):
         contingent_constraints = dict()
 
         for (i, j, data) in self.edges.data():
-            if self[i][j]['is_contingent'] is True and i < j:
+            if self[i][j]['is_contingent'] is True and self.precedes(i, j):
                 contingent_constraints[(i, j)] = self[i][j]
 
         return contingent_constraints
@@ -94,15 +95,16 @@ class STNU(STN):
         contingent_timepoints = list()
 
         for (i, j, data) in self.edges.data():
-            if self[i][j]['is_contingent'] is True and i < j:
+            if self[i][j]['is_contingent'] is True and self.precedes(i, j):
                 contingent_timepoints.append(j)
 
         return contingent_timepoints
 
     def shrink_contingent_constraint(self, i, j, low, high):
         if self.has_edge(i, j):
-            self[i][j]['weight'] += high
-            self[j][i]['weight'] -= low
+            self._set_edge_weight(i, j, self.get_edge_weight(i, j) + high)
+            self._set_edge_weight(j, i, self.get_edge_weight(j, i) - low)
+            self._invalidate_minimal_distances()
 
     def add_intertimepoints_constraints(self, constraints, task):
         """ Adds constraints between the timepoints of a task
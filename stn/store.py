@@ -0,0 +1,99 @@
+import contextlib
+import mmap
+import os
+
+from stn.stn import STN
+from stn.utils import binary_format
+
+""" On-disk store of stns in the binary format (see stn.utils.binary_format)
+
+Each stn (e.g. the stn of a robot) is stored in its own file in the store directory
+and read through a read-only memory map. Weight matrices and versions can be read
+without loading the stn.
+
+A file is written to a temporary file that replaces the previous one, so a crash while
+saving leaves the previous version of the stn.
+"""
+
+
+class STNStore(object):
+
+    extension = '.stn'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __contains__(self, name):
+        return os.path.exists(self._get_path(name))
+
+    def __iter__(self):
+        return iter(self.get_names())
+
+    def _get_path(self, name):
+        name = str(name)
+        if not name or name in ('.', '..') or os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError("Invalid stn name: {}".format(name))
+        return os.path.join(self.directory, name + self.extension)
+
+    def get_names(self):
+        """ Returns the names of the stored stns
+        """
+        return sorted(file_name[:-len(self.extension)] for file_name in os.listdir(self.directory)
+                      if file_name.endswith(self.extension))
+
+    def save(self, name, stn, sync=True):
+        """ Stores the stn under the given name, replacing the stored stn with that name
+
+        :param name: name of the stn, e.g. the robot id
+        :param stn: stn (object)
+        :param sync: (bool) if True, the file is flushed to disk before replacing the stored stn
+        """
+        path = self._get_path(name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as stn_file:
+            stn_file.write(stn.to_binary())
+            if sync:
+                stn_file.flush()
+                os.fsync(stn_file.fileno())
+        os.replace(tmp_path, path)
+
+    def remove(self, name):
+        os.remove(self._get_path(name))
+
+    @contextlib.contextmanager
+    def open(self, name):
+        """ Yields a read-only memory map of the stored stn, in the binary format
+        """
+        with open(self._get_path(name), 'rb') as stn_file:
+            with mmap.mmap(stn_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    def load(self, name, stn_class=STN):
+        """ Returns the stored stn
+
+        :param name: name of the stn
+        :param stn_class: class of the stn (e.g. STN, PSTN, STNU)
+        """
+        with self.open(name) as data:
+            return stn_class.from_binary(data)
+
+    def load_all(self, stn_class=STN):
+        """ Returns a dictionary {name: stn} with all the stored stns
+        """
+        return {name: self.load(name, stn_class) for name in self.get_names()}
+
+    def get_version(self, name):
+        """ Returns the version of the stored stn, e.g. to request a patch (see STN.get_patch)
+        """
+        with self.open(name) as data:
+            return binary_format.read_version(data)
+
+    def get_weight_matrix(self, name):
+        """ Returns the node ids and the weight matrix of the stored stn without loading the stn,
+        as STN.get_weight_matrix
+
+        Returns: (list of node ids, np.ndarray)
+        """
+        with self.open(name) as data:
+            return binary_format.read_weight_matrix(data)
@@ -1,7 +1,7 @@
-import networkx as nx
-
+from stn.cache import get_fingerprint
 from stn.config.config import stn_factory, stp_solver_factory
 from stn.exceptions.stp import NoSTPSolution
+from stn.methods.consistency import is_consistent
 
 """ Solves a Simple Temporal Problem (STP)
 
@@ -15,6 +15,12 @@ Possible solvers:
         Applies the all-pairs-shortest path algorithm Floyd Warshall to establish
         minimality and decomposability
 
+- fpc-dense:    Full Path Consistency on an STN that stores its weights in a
+                dense distance matrix (DenseSTN)
+
+- fpc-chain:    Full Path Consistency for chain shaped STNs (as built by add_task).
+                Computes the minimal network with one forward and one backward sweep
+
 - srea: Static Robust Execution Algorithm
         Approximate method for solving the Robust Execution Problem.
         Computes the space of solutions that maximizes the robustness
@@ -24,33 +30,71 @@ Possible solvers:
             Approximate method for finding the DSC along with an offline solution
             (schedule)
 
+- dc:   Dynamic Controllability
+        Checks whether a STNU is dynamically controllable and computes a
+        dispatchable STNU, executed reacting to the observed durations of the
+        contingent constraints (see stn.methods.dc.DCDispatcher)
+
 - durability: Returns a durable dispatchable graph that
               withstands unexpected disturbances
+
+Solutions can be cached (see stn.cache) so that stns that were already solved, e.g. the
+same task insertion evaluated again, are not solved again.
 """
 
 
 class STP(object):
-    def __init__(self, solver_name):
+    def __init__(self, solver_name, cache=None, **kwargs):
+        """
+        :param solver_name: name of the solver
+        :param cache: SolutionCache (object) of the solutions of the solver, None to not cache solutions
+        :param kwargs: options of the solver, e.g. STP('srea', workers=4)
+        """
         self.solver_name = solver_name
-        self.solver = stp_solver_factory.get_solver(solver_name)
+        self.solver_options = kwargs
+        self.solver = stp_solver_factory.get_solver(solver_name, **kwargs)
+        self.cache = cache
 
     def get_stn(self, **kwargs):
         """ Returns an stn of the type used by the stp solver
 
-        :param kwargs: stn in json format
+        :param kwargs: stn in json format (stn_json) or in binary format (stn_binary)
         :return: stn (object)
         """
         stn_json = kwargs.pop('stn_json', None)
+        stn_binary = kwargs.pop('stn_binary', None)
         stn = stn_factory.get_stn(self.solver_name)
         if stn_json:
             stn = stn.from_json(stn_json)
+        elif stn_binary:
+            stn = stn.from_binary(stn_binary)
+
+        if getattr(self.solver, 'uses_minimal_network', False):
+            stn.track_minimal_network()
 
         return stn
 
     def solve(self, stn):
         """ Computes the dispatchable graph and risk metric of the given stn
+
+        If the solutions are cached, the solution of an stn with the same fingerprint is
+        returned without solving the stn. Solutions of solvers that keep state of the solved
+        stn (e.g. drea) are not cached
+
+        If the solver uses the minimal network of the stn (e.g. fpc), the stn tracks it from now
+        on, so that adding or updating tasks updates it incrementally instead of solving the stn
+        from scratch again (see STN.track_minimal_network)
         """
-        dispatchable_graph = self.solver.compute_dispatchable_graph(stn)
+        if getattr(self.solver, 'uses_minimal_network', False):
+            stn.track_minimal_network()
+        if self.cache is None or not getattr(self.solver, 'is_cacheable', True):
+            dispatchable_graph = self.solver.compute_dispatchable_graph(stn)
+        else:
+            fingerprint = get_fingerprint(stn, self.solver_name, self.solver_options)
+            is_cached, dispatchable_graph = self.cache.get(fingerprint)
+            if not is_cached:
+                dispatchable_graph = self.solver.compute_dispatchable_graph(stn)
+                self.cache.put(fingerprint, dispatchable_graph)
 
         if dispatchable_graph is None:
             raise NoSTPSolution()
@@ -58,10 +102,13 @@ class STP(object):
         return dispatchable_graph
 
     @staticmethod
-    def is_consistent(stn):
-        shortest_path_array = nx.floyd_warshall(stn)
-        if stn.is_consistent(shortest_path_array):
-            return True
-        return False
+    def is_consistent(stn, return_cycle=False):
+        """ Checks whether the stn has negative cycles, without computing its minimal network
+
+        :param stn: stn (object)
+        :param return_cycle: (bool) if True, also returns the negative cycle (list of node ids) or None
+        :return: bool or (bool, cycle)
+        """
+        return is_consistent(stn, return_cycle)
 
 
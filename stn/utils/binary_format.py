@@ -0,0 +1,317 @@
+""" Compact binary serialization of STNs, PSTNs and STNUs
+
+Layout (little endian):
+
+- header: magic, format version, version of the stn (see STN.get_patch) and the number of
+  task ids, tasks in the sequence, action ids, nodes, edges and strings
+- task id table: 16 bytes per task id. The first entries are the task sequence, in order
+- action id table: 16 bytes per action id
+- node table: node id, index in the task id table, node type, flags, index in the action id table
+- edge table: source, target, weight, flags, index of the distribution in the string table
+- string table: length (uint32) and utf-8 bytes of each string (distributions and node types
+  that are not in NodeType)
+
+Node types in NodeType are stored as their index in NodeType. Other node types are stored as
+len(NodeType) + their index in the string table.
+
+Edge attributes that are not set (e.g. is_contingent in an STN) are not set when loading.
+
+Patches (see STN.get_patch) use the same tables for the changed nodes and edges, followed by
+the ids of the removed nodes and the removed edges.
+"""
+import hashlib
+import struct
+from uuid import UUID
+
+import numpy as np
+
+from stn.node import Node, NodeType
+
+MAGIC = b'STNB'
+PATCH_MAGIC = b'STNP'
+VERSION = 2
+
+HEADER = struct.Struct('<4sHQIIIIII')
+# Version 1 had no stn version
+HEADER_V1 = struct.Struct('<4sHIIIIII')
+PATCH_HEADER = struct.Struct('<4sHQQ32sBIIIIIIII')
+STRING_LENGTH = struct.Struct('<I')
+
+NODE_TYPES = list(NodeType)
+
+NODE_DTYPE = np.dtype([('id', '<i8'),
+                       ('task', '<u4'),
+                       ('type', 'u1'),
+                       ('flags', 'u1'),
+                       ('action', '<i4')])
+
+EDGE_DTYPE = np.dtype([('source', '<i8'),
+                       ('target', '<i8'),
+                       ('weight', '<f8'),
+                       ('flags', 'u1'),
+                       ('distribution', '<i4')])
+
+# Node flags
+IS_EXECUTED = 1
+
+# Edge flags
+HAS_IS_EXECUTED = 1
+EDGE_IS_EXECUTED = 2
+HAS_IS_CONTINGENT = 4
+IS_CONTINGENT = 8
+
+
+class _Tables(object):
+    """ Builds the task id, action id, node, edge and string tables
+    """
+    def __init__(self, sequence):
+        self.task_ids = list(sequence)
+        self.task_index = {task_id: k for k, task_id in enumerate(self.task_ids)}
+        self.action_ids = list()
+        self.strings = list()
+        self.string_index = dict()
+        self.nodes = None
+        self.edges = None
+
+    def get_string_index(self, string):
+        index = self.string_index.get(string)
+        if index is None:
+            index = self.string_index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def add_nodes(self, nodes):
+        """ nodes: list of (node_id, Node)
+        """
+        self.nodes = np.zeros(len(nodes), dtype=NODE_DTYPE)
+        for k, (node_id, node) in enumerate(nodes):
+            task = self.task_index.get(node.task_id)
+            if task is None:
+                task = self.task_index[node.task_id] = len(self.task_ids)
+                self.task_ids.append(node.task_id)
+            action = -1
+            if node.action_id:
+                action = len(self.action_ids)
+                self.action_ids.append(node.action_id)
+            if isinstance(node.node_type, NodeType):
+                node_type = NODE_TYPES.index(node.node_type)
+            else:
+                node_type = len(NODE_TYPES) + self.get_string_index(node.node_type)
+            self.nodes[k] = (node_id, task, node_type, IS_EXECUTED if node.is_executed else 0, action)
+
+    def add_edges(self, edges):
+        """ edges: list of (i, j, weight, attributes)
+        """
+        self.edges = np.zeros(len(edges), dtype=EDGE_DTYPE)
+        for k, (i, j, weight, data) in enumerate(edges):
+            flags = 0
+            if 'is_executed' in data:
+                flags |= HAS_IS_EXECUTED | (EDGE_IS_EXECUTED if data['is_executed'] else 0)
+            if 'is_contingent' in data:
+                flags |= HAS_IS_CONTINGENT | (IS_CONTINGENT if data['is_contingent'] else 0)
+            distribution = -1
+            if 'distribution' in data:
+                distribution = self.get_string_index(data['distribution'])
+            self.edges[k] = (i, j, weight, flags, distribution)
+
+    def get_counts(self):
+        return len(self.task_ids), len(self.action_ids), len(self.nodes), len(self.edges), len(self.strings)
+
+    def get_chunks(self):
+        chunks = [task_id.bytes for task_id in self.task_ids]
+        chunks += [action_id.bytes for action_id in self.action_ids]
+        chunks.append(self.nodes.tobytes())
+        chunks.append(self.edges.tobytes())
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            chunks.append(STRING_LENGTH.pack(len(encoded)))
+            chunks.append(encoded)
+        return chunks
+
+
+def _read_tables(data, offset, n_task_ids, n_action_ids, n_nodes, n_edges, n_strings):
+    task_ids = [UUID(bytes=bytes(data[offset + 16*k: offset + 16*(k+1)])) for k in range(n_task_ids)]
+    offset += 16 * n_task_ids
+    action_ids = [UUID(bytes=bytes(data[offset + 16*k: offset + 16*(k+1)])) for k in range(n_action_ids)]
+    offset += 16 * n_action_ids
+
+    nodes = np.frombuffer(data, dtype=NODE_DTYPE, count=n_nodes, offset=offset)
+    offset += nodes.nbytes
+    edges = np.frombuffer(data, dtype=EDGE_DTYPE, count=n_edges, offset=offset)
+    offset += edges.nbytes
+
+    strings = list()
+    for _ in range(n_strings):
+        (length,) = STRING_LENGTH.unpack_from(data, offset)
+        offset += STRING_LENGTH.size
+        strings.append(bytes(data[offset: offset + length]).decode('utf-8'))
+        offset += length
+
+    node_types = NODE_TYPES + strings
+    nodes = [(node_id, Node(task_ids[task], node_types[node_type], bool(flags & IS_EXECUTED),
+                            action_ids[action] if action >= 0 else None))
+             for node_id, task, node_type, flags, action in nodes.tolist()]
+    edges = [(i, j, _get_edge_attributes(weight, flags, distribution, strings))
+             for i, j, weight, flags, distribution in edges.tolist()]
+    return task_ids, nodes, edges, offset
+
+
+def encode(stn):
+    """ Returns the stn in the binary format (bytes)
+    """
+    sequence = stn.get_tasks()
+    tables = _Tables(sequence)
+    tables.add_nodes([(node_id, data['data']) for node_id, data in stn.nodes.data()])
+    tables.add_edges([(i, j, stn.get_edge_weight(i, j), data) for i, j, data in stn.edges.data()])
+
+    n_task_ids, n_action_ids, n_nodes, n_edges, n_strings = tables.get_counts()
+    chunks = [HEADER.pack(MAGIC, VERSION, stn.version, n_task_ids, len(sequence), n_action_ids,
+                          n_nodes, n_edges, n_strings)]
+    chunks += tables.get_chunks()
+    return b''.join(chunks)
+
+
+def decode(stn, data):
+    """ Loads the binary stn in data into stn, an empty stn (with only the zero timepoint)
+
+    Returns the version of the stn
+    """
+    data = memoryview(data)
+    stn_version, (n_task_ids, n_sequence, n_action_ids, n_nodes, n_edges, n_strings), offset = \
+        _read_header(data)
+    task_ids, nodes, edges, offset = _read_tables(data, offset, n_task_ids, n_action_ids, n_nodes, n_edges,
+                                                  n_strings)
+    for task_id in task_ids[:n_sequence]:
+        stn._sequence.append(task_id)
+    stn.add_nodes_from((node_id, {'data': node}) for node_id, node in nodes)
+    stn.add_edges_from(edges)
+    return stn_version
+
+
+def _read_header(data):
+    """ Returns the version of the stn, the counts (task ids, tasks in the sequence, action ids,
+    nodes, edges, strings) and the offset of the task id table
+    """
+    magic, version = struct.unpack_from('<4sH', data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary stn")
+    if version == VERSION:
+        header = HEADER.unpack_from(data, 0)
+        return header[2], header[3:], HEADER.size
+    elif version == 1:
+        header = HEADER_V1.unpack_from(data, 0)
+        return 0, header[2:], HEADER_V1.size
+    raise ValueError("Unsupported binary stn version: {}".format(version))
+
+
+def read_version(data):
+    """ Returns the version of the binary stn in data, reading only the header
+    """
+    stn_version, _, _ = _read_header(data)
+    return stn_version
+
+
+def read_weight_matrix(data):
+    """ Returns the node ids and the weight matrix of the binary stn in data, reading only
+    the node and edge tables. The result is the same as the one of STN.get_weight_matrix
+    for the stored stn
+
+    Returns: (list of node ids, np.ndarray)
+    """
+    _, (n_task_ids, _, n_action_ids, n_nodes, n_edges, _), offset = _read_header(data)
+    offset += 16 * (n_task_ids + n_action_ids)
+    nodes = np.frombuffer(data, dtype=NODE_DTYPE, count=n_nodes, offset=offset)
+    edges = np.frombuffer(data, dtype=EDGE_DTYPE, count=n_edges, offset=offset + nodes.nbytes)
+
+    node_ids = nodes['id']
+    sorter = np.argsort(node_ids, kind='stable')
+    rows = sorter[np.searchsorted(node_ids, edges['source'], sorter=sorter)]
+    columns = sorter[np.searchsorted(node_ids, edges['target'], sorter=sorter)]
+
+    weights = np.full((n_nodes, n_nodes), np.inf)
+    np.fill_diagonal(weights, 0.)
+    weights[rows, columns] = edges['weight']
+    return node_ids.tolist(), weights
+
+
+def encode_patch(patch):
+    """ Returns the patch (dict, see STN.get_patch) in the binary format (bytes)
+    """
+    sequence = patch.get('task_sequence')
+    tables = _Tables([UUID(task_id) for task_id in sequence] if sequence is not None else list())
+    tables.add_nodes([(node['id'], Node.from_dict(node['data'])) for node in patch['nodes']])
+    tables.add_edges([(link['source'], link['target'], link['weight'], link) for link in patch['links']])
+    removed_nodes = np.array(patch['removed_nodes'], dtype='<i8')
+    removed_links = np.array(patch['removed_links'], dtype='<i8').reshape(-1, 2)
+
+    n_task_ids, n_action_ids, n_nodes, n_edges, n_strings = tables.get_counts()
+    chunks = [PATCH_HEADER.pack(PATCH_MAGIC, VERSION, patch['base_version'], patch['version'],
+                                bytes.fromhex(patch['hash']), sequence is not None,
+                                n_task_ids, len(sequence) if sequence is not None else 0, n_action_ids,
+                                n_nodes, n_edges, n_strings, len(removed_nodes), len(removed_links))]
+    chunks += tables.get_chunks()
+    chunks.append(removed_nodes.tobytes())
+    chunks.append(removed_links.tobytes())
+    return b''.join(chunks)
+
+
+def decode_patch(data):
+    """ Returns the binary patch in data as a dict (see STN.get_patch)
+    """
+    data = memoryview(data)
+    magic, version, base_version, stn_version, stn_hash, has_sequence, n_task_ids, n_sequence, n_action_ids, \
+        n_nodes, n_edges, n_strings, n_removed_nodes, n_removed_links = PATCH_HEADER.unpack_from(data, 0)
+    if magic != PATCH_MAGIC:
+        raise ValueError("Not a binary stn patch")
+    if version != VERSION:
+        raise ValueError("Unsupported binary stn patch version: {}".format(version))
+
+    task_ids, nodes, edges, offset = _read_tables(data, PATCH_HEADER.size, n_task_ids, n_action_ids, n_nodes,
+                                                  n_edges, n_strings)
+    removed_nodes = np.frombuffer(data, dtype='<i8', count=n_removed_nodes, offset=offset)
+    offset += removed_nodes.nbytes
+    removed_links = np.frombuffer(data, dtype='<i8', count=2 * n_removed_links, offset=offset).reshape(-1, 2)
+
+    patch = {'base_version': base_version,
+             'version': stn_version,
+             'hash': stn_hash.hex(),
+             'nodes': [{'data': node.to_dict(), 'id': node_id} for node_id, node in nodes],
+             'links': [dict(attributes, source=i, target=j) for i, j, attributes in edges],
+             'removed_nodes': removed_nodes.tolist(),
+             'removed_links': removed_links.tolist()}
+    if has_sequence:
+        patch['task_sequence'] = [str(task_id) for task_id in task_ids[:n_sequence]]
+    return patch
+
+
+def get_hash(stn):
+    """ Returns a hash (hex string) of the task sequence, nodes and edges of the stn. It does
+    not depend on the order in which nodes and edges were added
+    """
+    stn_hash = hashlib.sha256()
+    for task_id in stn.get_tasks():
+        stn_hash.update(task_id.bytes)
+    for node_id in sorted(stn.nodes()):
+        node = stn.nodes[node_id]['data']
+        stn_hash.update(struct.pack('<q?', node_id, node.is_executed))
+        stn_hash.update(node.task_id.bytes)
+        stn_hash.update(str(node.node_type).encode('utf-8'))
+        if node.action_id:
+            stn_hash.update(node.action_id.bytes)
+    for i, j in sorted(stn.edges()):
+        data = stn[i][j]
+        stn_hash.update(struct.pack('<qqd', i, j, stn.get_edge_weight(i, j)))
+        stn_hash.update(repr((data.get('is_executed'), data.get('is_contingent'),
+                              data.get('distribution'))).encode('utf-8'))
+    return stn_hash.hexdigest()
+
+
+def _get_edge_attributes(weight, flags, distribution, strings):
+    attributes = {'weight': weight}
+    if flags & HAS_IS_EXECUTED:
+        attributes['is_executed'] = bool(flags & EDGE_IS_EXECUTED)
+    if flags & HAS_IS_CONTINGENT:
+        attributes['is_contingent'] = bool(flags & IS_CONTINGENT)
+    if distribution >= 0:
+        attributes['distribution'] = strings[distribution]
+    return attributes
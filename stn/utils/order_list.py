@@ -0,0 +1,200 @@
+""" Order-maintenance list
+
+A doubly linked list of hashable items in which every item has an integer label, increasing
+along the list. Comparing the labels of two items tells which one comes first in O(1).
+
+An item inserted between two items gets the label in the middle. If there is no room, the
+labels of the smallest enclosing range of labels that is sparse enough are spread evenly.
+Insertions take amortized O(log n) relabels.
+
+Based on: M.A. Bender, R. Cole, E.D. Demaine, M. Farach-Colton, J. Zito. Two Simplified Algorithms
+for Maintaining Order in a List. ESA 2002.
+"""
+
+
+class OrderList(object):
+
+    # Labels are in [0, 2^label_bits)
+    label_bits = 62
+    # A range of 2^i labels can hold at most (2/threshold)^i items before it is relabeled
+    threshold = 1.5
+
+    def __init__(self, items=None):
+        self._labels = dict()
+        self._next = dict()
+        self._prev = dict()
+        self._first = None
+        self._last = None
+        # Cache for positional lookups, cleared when the list changes
+        self._items = None
+        self._positions = None
+        if items is not None:
+            for item in items:
+                self.append(item)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, item):
+        return item in self._labels
+
+    def __iter__(self):
+        item = self._first
+        while item is not None:
+            yield item
+            item = self._next[item]
+
+    def __getitem__(self, position):
+        """ Returns the item in the given (0 based) position
+        """
+        if self._items is not None:
+            return self._items[position]
+        n = len(self._labels)
+        if position < 0:
+            position += n
+        if not 0 <= position < n:
+            raise IndexError("OrderList index out of range")
+        # Walk from the closest end of the list
+        if position < n // 2:
+            item = self._first
+            for _ in range(position):
+                item = self._next[item]
+        else:
+            item = self._last
+            for _ in range(n - 1 - position):
+                item = self._prev[item]
+        return item
+
+    def __repr__(self):
+        return "OrderList({})".format(list(self))
+
+    @property
+    def first(self):
+        return self._first
+
+    @property
+    def last(self):
+        return self._last
+
+    def next(self, item):
+        """ Returns the item after the given item, or None if item is the last one
+        """
+        return self._next[item]
+
+    def prev(self, item):
+        """ Returns the item before the given item, or None if item is the first one
+        """
+        return self._prev[item]
+
+    def index(self, item):
+        """ Returns the (0 based) position of the item
+        """
+        if item not in self._labels:
+            raise ValueError("{} is not in the OrderList".format(item))
+        if self._positions is None:
+            self._items = list(self)
+            self._positions = {item: k for k, item in enumerate(self._items)}
+        return self._positions[item]
+
+    def precedes(self, item_1, item_2):
+        """ Returns True if item_1 is before item_2 in the list
+        """
+        return self._labels[item_1] < self._labels[item_2]
+
+    def copy(self):
+        order_list = self.__class__()
+        order_list._labels = dict(self._labels)
+        order_list._next = dict(self._next)
+        order_list._prev = dict(self._prev)
+        order_list._first = self._first
+        order_list._last = self._last
+        return order_list
+
+    def append(self, item):
+        self.insert_after(self._last, item)
+
+    def insert_after(self, ref, item):
+        """ Inserts the item after ref. If ref is None, the item is inserted at the beginning
+        """
+        if item is None or item in self._labels:
+            raise ValueError("{} cannot be added to the OrderList".format(item))
+        prev_item = ref
+        next_item = self._next[ref] if ref is not None else self._first
+
+        if self._get_gap(prev_item, next_item) < 2:
+            self._relabel(prev_item if prev_item is not None else next_item)
+
+        low, high = self._get_bounds(prev_item, next_item)
+        self._labels[item] = (low + high) // 2
+        self._prev[item] = prev_item
+        self._next[item] = next_item
+        if prev_item is None:
+            self._first = item
+        else:
+            self._next[prev_item] = item
+        if next_item is None:
+            self._last = item
+        else:
+            self._prev[next_item] = item
+        self._clear_cache()
+
+    def insert_before(self, ref, item):
+        """ Inserts the item before ref. If ref is None, the item is inserted at the end
+        """
+        prev_item = self._prev[ref] if ref is not None else self._last
+        self.insert_after(prev_item, item)
+
+    def remove(self, item):
+        prev_item = self._prev.pop(item)
+        next_item = self._next.pop(item)
+        del self._labels[item]
+        if prev_item is None:
+            self._first = next_item
+        else:
+            self._next[prev_item] = next_item
+        if next_item is None:
+            self._last = prev_item
+        else:
+            self._prev[next_item] = prev_item
+        self._clear_cache()
+
+    def _clear_cache(self):
+        self._items = None
+        self._positions = None
+
+    def _get_bounds(self, prev_item, next_item):
+        low = self._labels[prev_item] if prev_item is not None else -1
+        high = self._labels[next_item] if next_item is not None else 1 << self.label_bits
+        return low, high
+
+    def _get_gap(self, prev_item, next_item):
+        low, high = self._get_bounds(prev_item, next_item)
+        return high - low
+
+    def _relabel(self, item):
+        """ Spreads evenly the labels of the smallest range around item that is sparse enough,
+        leaving room around item
+        """
+        label = self._labels[item]
+        first = last = item
+        count = 1
+        for bits in range(1, self.label_bits + 1):
+            size = 1 << bits
+            low = label & ~(size - 1)
+            high = low + size
+            while self._prev[first] is not None and self._labels[self._prev[first]] >= low:
+                first = self._prev[first]
+                count += 1
+            while self._next[last] is not None and self._labels[self._next[last]] < high:
+                last = self._next[last]
+                count += 1
+            if count <= size / self.threshold ** bits and size // count >= 4:
+                break
+        else:
+            raise OverflowError("OrderList is full")
+
+        spacing = size // count
+        current = first
+        for k in range(count):
+            self._labels[current] = low + spacing // 2 + k * spacing
+            current = self._next[current]
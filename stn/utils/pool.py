@@ -0,0 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
+
+""" Process pools shared by the methods that run in parallel (e.g. srea, dsc-lp)
+
+A pool is created the first time it is needed and reused afterwards, so the worker
+processes (and what they keep in memory) are shared by consecutive calls
+"""
+
+# Process pools {workers: pool}
+_pools = dict()
+
+
+def get_pool(workers):
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
@@ -0,0 +1,112 @@
+from collections.abc import MutableMapping
+
+# Value of the slots that have not been assigned
+_MISSING = object()
+
+
+class SlotsDict(MutableMapping):
+    """ Dictionary that stores the keys listed in __slots__ as attributes
+
+    Used as the node and edge attribute dictionaries of the networkx graphs, which hold a few
+    known keys each. A slot that has not been assigned is a missing key. Keys that are not in
+    __slots__ are stored in a regular dict, created when the first one is added.
+    """
+    __slots__ = ('_extra',)
+
+    def __init__(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and type(args[0]) is type(self):
+            self._copy_from(args[0])
+        elif args or kwargs:
+            self.update(*args, **kwargs)
+
+    def _copy_from(self, other):
+        """ Copies the keys of other, a dictionary of the same class (e.g. when an stn is cloned)
+        """
+        for key in self._slots:
+            value = getattr(other, key, _MISSING)
+            if value is not _MISSING:
+                setattr(self, key, value)
+        extra = getattr(other, '_extra', None)
+        if extra:
+            self._extra = dict(extra)
+
+    def __getitem__(self, key):
+        if key in self._slots:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in self._slots:
+            setattr(self, key, value)
+            return
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in self._slots:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        try:
+            del self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        if key in self._slots:
+            return hasattr(self, key)
+        return key in getattr(self, '_extra', ())
+
+    def __iter__(self):
+        for key in self._slots:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, '_extra', ())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # Faster than the generic MutableMapping implementations
+
+    def items(self):
+        items = [(key, getattr(self, key)) for key in self._slots if hasattr(self, key)]
+        extra = getattr(self, '_extra', None)
+        if extra:
+            items += extra.items()
+        return items
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, (dict, SlotsDict)):
+            other = other.items()
+        elif hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        for key, value in other:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        return self.__class__(self)
+
+
+class NodeAttributes(SlotsDict):
+    __slots__ = ('data',)
+    _slots = __slots__
+
+
+class EdgeAttributes(SlotsDict):
+    __slots__ = ('weight', 'is_executed', 'is_contingent', 'distribution')
+    _slots = __slots__
@@ -0,0 +1,51 @@
+import json
+import os
+import unittest
+
+from stn.stp import STP
+from stn.utils.uuid import generate_uuid
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """ Tests that STNs, PSTNs and STNUs are loaded back from the binary format
+    """
+
+    def assert_round_trip(self, solver_name, file_name):
+        with open(code_dir + "/data/" + file_name) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        stp = STP(solver_name)
+        stn = stp.get_stn(stn_json=stn_json)
+        stn.execute_timepoint(1)
+        stn.execute_edge(1, 2)
+        stn.set_action_id(2, generate_uuid())
+
+        stn_binary = stn.to_binary()
+        self.assertLess(len(stn_binary), len(stn.to_json()))
+
+        new_stn = stp.get_stn(stn_binary=stn_binary)
+        self.assertIsInstance(new_stn, stn.__class__)
+        self.assertEqual(new_stn, stn)
+        self.assertEqual(new_stn.get_tasks(), stn.get_tasks())
+        for i, j, data in stn.edges.data():
+            self.assertEqual(dict(new_stn[i][j]), dict(data))
+        return new_stn
+
+    def test_stn(self):
+        self.assert_round_trip('fpc', "stn_two_tasks.json")
+
+    def test_pstn(self):
+        pstn = self.assert_round_trip('srea', "pstn_two_tasks.json")
+        self.assertEqual(len(pstn.get_contingent_constraints()), 4)
+
+    def test_stnu(self):
+        self.assert_round_trip('dsc', "stnu_two_tasks.json")
+
+    def test_invalid_data(self):
+        stp = STP('fpc')
+        self.assertRaises(ValueError, stp.get_stn, stn_binary=b'STNJ' + bytes(30))
+
+
+if __name__ == '__main__':
+    unittest.main()
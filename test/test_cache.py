@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from stn.cache import SolutionCache, get_fingerprint
+from stn.exceptions.stp import NoSTPSolution
+from stn.methods.dc import DCDispatcher
+from stn.store import STNStore
+from stn.stp import STP
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestCache(unittest.TestCase):
+    """ Tests that the solutions of stps are cached
+    """
+
+    def get_stn(self, stp, file_name):
+        with open(code_dir + "/data/" + file_name) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        return stp.get_stn(stn_json=stn_json)
+
+    def test_fingerprint(self):
+        stp = STP('srea')
+        pstn = self.get_stn(stp, "pstn_two_tasks.json")
+        fingerprint = get_fingerprint(pstn)
+        self.assertEqual(get_fingerprint(pstn.clone()), fingerprint)
+        self.assertEqual(get_fingerprint(self.get_stn(stp, "pstn_two_tasks.json")), fingerprint)
+        # The same stn as an STN has another fingerprint
+        self.assertNotEqual(get_fingerprint(self.get_stn(STP('fpc'), "pstn_two_tasks.json")), fingerprint)
+
+        changed = pstn.clone()
+        changed.update_edge_weight(0, 1, 37.5)
+        self.assertNotEqual(get_fingerprint(changed), fingerprint)
+
+        changed = pstn.clone()
+        (i, j), constraint = next(iter(changed.get_contingent_constraints().items()))
+        changed[i][j]['distribution'] = "N_7_1"
+        self.assertNotEqual(get_fingerprint(changed), fingerprint)
+
+        changed = pstn.clone()
+        changed[i][j]['is_contingent'] = False
+        self.assertNotEqual(get_fingerprint(changed), fingerprint)
+
+    def test_solve(self):
+        stp = STP('srea', cache=SolutionCache())
+        pstn = self.get_stn(stp, "pstn_two_tasks.json")
+        dispatchable_graph = stp.solve(pstn)
+        cached = stp.solve(self.get_stn(stp, "pstn_two_tasks.json"))
+        self.assertEqual(cached, dispatchable_graph)
+        self.assertEqual(cached.risk_metric, dispatchable_graph.risk_metric)
+        self.assertIsNot(cached, dispatchable_graph)
+        self.assertEqual(stp.cache.get_stats(),
+                         {'hits': 1, 'misses': 1, 'store_hits': 0, 'evictions': 0, 'size': 1})
+
+        # Changing the returned dispatchable graph does not change the cached solution
+        cached.update_edge_weight(0, 1, 37.5)
+        self.assertEqual(stp.solve(pstn), dispatchable_graph)
+
+    def test_solvers(self):
+        cache = SolutionCache()
+        stnu = self.get_stn(STP('dsc'), "stnu_two_tasks.json")
+        schedule = STP('dsc', cache=cache).solve(stnu)
+        dispatchable_graph = STP('dc', cache=cache).solve(stnu)
+        # Each solver gets its own solution
+        self.assertEqual(cache.misses, 2)
+        self.assertNotIn('waits', schedule.graph)
+        self.assertIn('waits', dispatchable_graph.graph)
+        self.assertEqual(STP('dc', cache=cache).solve(stnu).graph['waits'], dispatchable_graph.graph['waits'])
+        self.assertEqual(cache.hits, 1)
+
+        # and each set of options of a solver
+        pstn = self.get_stn(STP('srea'), "pstn_two_tasks.json")
+        STP('srea', cache=cache).solve(pstn)
+        STP('srea', cache=cache, workers=2).solve(pstn)
+        self.assertEqual(cache.misses, 4)
+        self.assertNotEqual(get_fingerprint(pstn, 'srea'), get_fingerprint(pstn, 'srea', {'workers': 2}))
+
+    def test_drea(self):
+        # The drea engine belongs to the last solved stn, so drea solutions are not cached
+        stp = STP('drea', cache=SolutionCache())
+        pstn = self.get_stn(stp, "pstn_two_tasks.json")
+        stp.solve(pstn)
+        changed = pstn.clone()
+        changed.update_edge_weight(0, 1, 38)
+        stp.solve(changed)
+        self.assertEqual(stp.solver.engine.pstn, changed)
+        stp.solve(pstn)
+        self.assertEqual(stp.solver.engine.pstn, pstn)
+        self.assertNotEqual(stp.solver.engine.pstn, changed)
+        self.assertEqual(len(stp.cache), 0)
+        self.assertEqual(stp.cache.get_stats()['misses'], 0)
+
+    def test_no_solution(self):
+        stp = STP('fpc', cache=SolutionCache())
+        stn = self.get_stn(stp, "stn_two_tasks.json")
+        stn.add_constraint(0, 3, 97, 100)
+        self.assertRaises(NoSTPSolution, stp.solve, stn)
+        self.assertRaises(NoSTPSolution, stp.solve, stn)
+        self.assertEqual(stp.cache.hits, 1)
+
+    def test_maxsize(self):
+        stp = STP('fpc', cache=SolutionCache(maxsize=1))
+        stn = self.get_stn(stp, "stn_two_tasks.json")
+        changed = stn.clone()
+        changed.update_edge_weight(0, 1, 40)
+        stp.solve(stn)
+        stp.solve(changed)
+        stp.solve(stn)
+        self.assertEqual(stp.cache.get_stats(),
+                         {'hits': 0, 'misses': 3, 'store_hits': 0, 'evictions': 2, 'size': 1})
+
+    def test_ttl(self):
+        stp = STP('fpc', cache=SolutionCache(ttl=0.01))
+        stn = self.get_stn(stp, "stn_two_tasks.json")
+        stp.solve(stn)
+        time.sleep(0.02)
+        stp.solve(stn)
+        self.assertEqual(stp.cache.misses, 2)
+
+    def test_store(self):
+        directory = tempfile.mkdtemp()
+        try:
+            stp = STP('srea', cache=SolutionCache(store=STNStore(directory)))
+            pstn = self.get_stn(stp, "pstn_two_tasks.json")
+            dispatchable_graph = stp.solve(pstn)
+
+            # Another cache with the same store
+            stp = STP('srea', cache=SolutionCache(store=STNStore(directory)))
+            cached = stp.solve(pstn)
+            self.assertEqual(stp.cache.store_hits, 1)
+            self.assertEqual(type(cached), type(dispatchable_graph))
+            self.assertEqual(cached, dispatchable_graph)
+            self.assertEqual(cached.risk_metric, dispatchable_graph.risk_metric)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_store_graph_attributes(self):
+        directory = tempfile.mkdtemp()
+        try:
+            stp = STP('dc', cache=SolutionCache(store=STNStore(directory)))
+            stnu = self.get_stn(stp, "stnu_two_tasks.json")
+            dispatchable_graph = stp.solve(stnu)
+            self.assertTrue(dispatchable_graph.graph['waits'])
+
+            # The waits are read from the store with the solution
+            stp = STP('dc', cache=SolutionCache(store=STNStore(directory)))
+            cached = stp.solve(stnu)
+            self.assertEqual(stp.cache.store_hits, 1)
+            self.assertEqual(cached, dispatchable_graph)
+            self.assertEqual(cached.graph['waits'], dispatchable_graph.graph['waits'])
+            self.assertEqual(DCDispatcher(cached).waits, DCDispatcher(dispatchable_graph).waits)
+
+            # Solutions with graph attributes that cannot be written to json are not stored
+            cache = SolutionCache(store=STNStore(directory))
+            dispatchable_graph.graph['dispatcher'] = DCDispatcher(dispatchable_graph)
+            with self.assertLogs('stn.cache', 'WARNING'):
+                cache.put('fingerprint', dispatchable_graph)
+            self.assertNotIn('fingerprint', SolutionCache(store=STNStore(directory)))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import copy
+import json
+import os
+import unittest
+
+from stn.dense.dense_stn import DenseSTN
+from stn.stp import STP
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STN = code_dir + "/data/stn_two_tasks.json"
+STNU = code_dir + "/data/stnu_two_tasks.json"
+
+
+class TestClone(unittest.TestCase):
+    """ Tests that a clone is equal to the original stn and independent of it
+    """
+
+    def load(self, solver_name, file_name):
+        with open(file_name) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        return STP(solver_name).get_stn(stn_json=stn_json)
+
+    def assert_clone(self, stn):
+        clone = stn.clone()
+        self.assertIsInstance(clone, stn.__class__)
+        self.assertEqual(clone, stn)
+        self.assertEqual(clone, copy.deepcopy(stn))
+        self.assertEqual(clone.get_tasks(), stn.get_tasks())
+        self.assertEqual(clone.to_dict(), stn.to_dict())
+
+        # Modifying the clone does not modify the original stn
+        clone.assign_timepoint(45, 2)
+        clone.execute_timepoint(2)
+        self.assertNotEqual(clone, stn)
+        self.assertFalse(stn.get_node(2).is_executed)
+        self.assertTrue(clone.get_node(2).is_executed)
+        self.assertEqual(stn.get_node_latest_time(2), copy.deepcopy(stn).get_node_latest_time(2))
+
+        clone.remove_task(1)
+        self.assertEqual(len(stn.get_tasks()), 2)
+        self.assertEqual(len(clone.get_tasks()), 1)
+        return clone
+
+    def test_clone_stn(self):
+        self.assert_clone(self.load('fpc', STN))
+
+    def test_clone_dense_stn(self):
+        self.assert_clone(self.load('fpc-dense', STN))
+
+    def test_clone_stnu(self):
+        stnu = self.load('dsc', STNU)
+        clone = stnu.clone()
+        self.assertEqual(clone.get_contingent_constraints(), stnu.get_contingent_constraints())
+        self.assert_clone(stnu)
+
+    def test_clone_tracked_stn(self):
+        stn = self.load('fpc', STN)
+        stn.track_minimal_network()
+        stn.get_minimal_distances()
+        clone = stn.clone()
+        clone.assign_timepoint(45, 2)
+        self.assertNotEqual(clone.get_minimal_distances()[1].tolist(), stn.get_minimal_distances()[1].tolist())
+
+    def test_modify_clone_nodes(self):
+        stn = self.load('fpc', STN)
+        original_stn = copy.deepcopy(stn)
+
+        # Nodes returned by the clone can be modified without modifying the original stn
+        clone = stn.clone()
+        clone.get_node(2).execute()
+        clone.get_task_nodes(stn.get_task_id(1))[0].execute()
+        node_id, node = clone.get_node_by_type(stn.get_task_id(2), 'delivery')
+        node.execute()
+        self.assertTrue(clone.get_node(2).is_executed)
+        self.assertTrue(clone.get_node(node_id).is_executed)
+        self.assertEqual(stn, original_stn)
+
+        # And the other way around
+        clone = stn.clone()
+        stn.get_node(3).execute()
+        self.assertFalse(clone.get_node(3).is_executed)
+        stn.get_node(3).is_executed = False
+        self.assertEqual(stn, original_stn)
+
+        # The solution shares the nodes of the solved stn
+        solution = STP('fpc').solve(stn)
+        solution.get_node(3).execute()
+        self.assertEqual(stn, original_stn)
+
+        # Patches include the nodes modified by the stn
+        version = clone.version
+        clone.execute_timepoint(4)
+        patched_stn = stn.clone()
+        patched_stn.apply_patch(clone.get_patch(version))
+        self.assertTrue(patched_stn.get_node(4).is_executed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import os
+import unittest
+
+from stn.stp import STP
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STN = code_dir + "/data/stn_two_tasks.json"
+
+
+class TestConsistency(unittest.TestCase):
+    """ Tests the negative cycle detection used by STP.is_consistent
+    """
+
+    def setUp(self):
+        with open(STN) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+
+        self.stp = STP('fpc')
+        self.stn = self.stp.get_stn(stn_json=stn_json)
+
+    def test_consistent_stn(self):
+        self.assertTrue(self.stp.is_consistent(self.stn))
+
+        consistent, cycle = self.stp.is_consistent(self.stn, return_cycle=True)
+        self.assertTrue(consistent)
+        self.assertIsNone(cycle)
+
+        # Assigning a time within the bounds of a timepoint keeps the stn consistent
+        self.stn.assign_timepoint(37, 1)
+        self.assertTrue(self.stp.is_consistent(self.stn))
+        self.assertTrue(self.stn.is_consistent())
+
+    def test_inconsistent_stn(self):
+        # The pickup of the first task is after the start of the second task
+        self.stn.assign_timepoint(47, 2)
+        self.stn.assign_timepoint(46, 4)
+        self.assertFalse(self.stp.is_consistent(self.stn))
+        self.assertFalse(self.stn.is_consistent())
+
+        consistent, cycle = self.stp.is_consistent(self.stn, return_cycle=True)
+        self.assertFalse(consistent)
+        weight = sum(self.stn.get_edge_weight(cycle[k], cycle[(k + 1) % len(cycle)])
+                     for k in range(len(cycle)))
+        self.assertLess(weight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
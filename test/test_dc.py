@@ -0,0 +1,87 @@
+import json
+import os
+import unittest
+
+from stn.exceptions.stp import NoSTPSolution
+from stn.methods.dc import DCDispatcher, is_dynamically_controllable
+from stn.methods.strong_controllability import is_strongly_controllable
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STNU = code_dir + "/data/stnu_two_tasks.json"
+
+
+class TestDC(unittest.TestCase):
+    """ Tests the solver Dynamic Controllability
+    """
+
+    def setUp(self):
+        self.stp = STP('dc')
+        tasks = [create_task(self.stp.get_stn(), task_dict)
+                 for task_dict in load_yaml(code_dir + "/data/tasks.yaml").values()]
+        self.stnu = self.stp.get_stn()
+        self.stnu.add_task(tasks[0], 1)
+        self.stnu.add_task(tasks[1], 2)
+        # The second task can start at any time after the first one
+        for node_id in (4, 5, 6):
+            self.stnu.update_edge_weight(node_id, 0, 0, force=True)
+
+    def test_solve(self):
+        with open(STNU) as json_file:
+            stnu = self.stp.get_stn(stn_json=json.dumps(json.load(json_file)))
+
+        dispatchable_graph = self.stp.solve(stnu)
+        self.assertEqual(dispatchable_graph.risk_metric, 0)
+        self.assertEqual(dispatchable_graph.get_contingent_constraints().keys(),
+                         stnu.get_contingent_constraints().keys())
+        for (i, j) in stnu.get_contingent_constraints():
+            self.assertEqual(dispatchable_graph.get_edge_weight(i, j), stnu.get_edge_weight(i, j))
+            self.assertEqual(dispatchable_graph.get_edge_weight(j, i), stnu.get_edge_weight(j, i))
+        self.assertEqual(dispatchable_graph.get_node_earliest_time(1), 37)
+        self.assertEqual(dispatchable_graph.get_node_latest_time(1), 39)
+
+    def test_dynamically_controllable(self):
+        # The second task starts at most 2 after the delivery of the first task
+        self.stnu.update_edge_weight(3, 4, 2)
+        self.assertFalse(is_strongly_controllable(self.stnu))
+        self.assertTrue(is_dynamically_controllable(self.stnu))
+
+        dispatcher = DCDispatcher(self.stp.solve(self.stnu))
+        self.assertEqual(dispatcher.get_enabled_timepoints(), [1])
+        self.assertRaises(ValueError, dispatcher.execute_timepoint, 4, 20)
+
+        dispatcher.execute_timepoint(1, 7)
+        dispatcher.execute_timepoint(2, 12)
+        # Waits until the latest delivery of the first task
+        self.assertAlmostEqual(dispatcher.get_window(4)[0], 12 + 10.894)
+        self.assertRaises(ValueError, dispatcher.execute_timepoint, 4, 21.5)
+
+        dispatcher.execute_timepoint(3, 22)
+        self.assertEqual(dispatcher.get_window(4), (22, 24))
+        dispatcher.execute_timepoint(4, 23)
+        self.assertEqual(dispatcher.execution_times[4], 23)
+
+    def test_wait(self):
+        # The second task starts at most 3 before the delivery of the first task
+        self.stnu.update_edge_weight(4, 3, 3, force=True)
+        dispatcher = DCDispatcher(self.stp.solve(self.stnu))
+        dispatcher.execute_timepoint(1, 7)
+        dispatcher.execute_timepoint(2, 12)
+        self.assertIn(4, dispatcher.get_enabled_timepoints())
+        self.assertAlmostEqual(dispatcher.get_window(4)[0], 12 + 10.894 - 3)
+
+        dispatcher.execute_timepoint(3, 21.2)
+        self.assertAlmostEqual(dispatcher.get_window(4)[0], 21.2 - 3)
+
+    def test_not_dynamically_controllable(self):
+        # The second task starts between 1 and 2 before the delivery of the first task
+        self.stnu.update_edge_weight(4, 3, 2, force=True)
+        self.stnu.update_edge_weight(3, 4, -1, force=True)
+        self.assertTrue(self.stnu.is_consistent())
+        self.assertFalse(is_dynamically_controllable(self.stnu))
+        self.assertRaises(NoSTPSolution, self.stp.solve, self.stnu)
+
+
+if __name__ == '__main__':
+    unittest.main()
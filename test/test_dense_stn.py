@@ -0,0 +1,70 @@
+import json
+import os
+import unittest
+
+from stn.dense.dense_stn import DenseSTN
+from stn.stn import STN
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STN_FILE = code_dir + "/data/stn_two_tasks.json"
+
+
+class TestDenseSTN(unittest.TestCase):
+    """ Tests that the matrix backed STN behaves as the networkx backed STN
+    """
+
+    def setUp(self):
+        tasks_dict = load_yaml(code_dir + "/data/tasks.yaml")
+        self.tasks = [create_task(STN(), task_dict) for task_dict in tasks_dict.values()]
+
+    def build(self, cls):
+        stn = cls()
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[2], 2)
+        stn.add_task(self.tasks[1], 2)
+        return stn
+
+    def test_add_and_remove_tasks(self):
+        stn = self.build(STN)
+        dense_stn = self.build(DenseSTN)
+        self.assertEqual(stn.number_of_nodes(), dense_stn.number_of_nodes())
+        self.assertEqual(stn.number_of_edges(), dense_stn.number_of_edges())
+        for (i, j) in stn.edges():
+            self.assertEqual(stn.get_edge_weight(i, j), dense_stn.get_edge_weight(i, j))
+
+        stn.remove_task(1)
+        dense_stn.remove_task(1)
+        self.assertEqual(set(stn.edges()), set(dense_stn.edges()))
+        for (i, j) in stn.edges():
+            self.assertEqual(stn.get_edge_weight(i, j), dense_stn.get_edge_weight(i, j))
+
+    def test_minimal_network(self):
+        stp = STP('fpc')
+        minimal_network = stp.solve(self.build(STN))
+
+        dense_stp = STP('fpc-dense')
+        dense_minimal_network = dense_stp.solve(self.build(DenseSTN))
+
+        self.assertIsInstance(dense_minimal_network, DenseSTN)
+        for (i, j) in minimal_network.edges():
+            self.assertEqual(minimal_network.get_edge_weight(i, j),
+                             dense_minimal_network.get_edge_weight(i, j))
+        self.assertTrue(dense_stp.is_consistent(dense_minimal_network))
+
+    def test_json(self):
+        with open(STN_FILE) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+
+        stp = STP('fpc-dense')
+        dense_stn = stp.get_stn(stn_json=stn_json)
+        stn = STN.from_json(stn_json)
+        self.assertEqual(stn, dense_stn)
+
+        dense_stn = DenseSTN.from_json(dense_stn.to_json())
+        self.assertEqual(stn, dense_stn)
+
+
+if __name__ == '__main__':
+    unittest.main()
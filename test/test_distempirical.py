@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from stn.pstn import distempirical
+from stn.pstn.distempirical import invcdf_norm, invcdf_norm_array, invcdf_norm_curve, binary_search_lookup
+
+
+class TestDistEmpirical(unittest.TestCase):
+    """ Tests the vectorized inverse cdf of normal curves
+    """
+
+    def setUp(self):
+        self.vals = [-1.0, 0.0, 0.003, 0.05, 0.5, 0.95, 0.997, 1.0, 2.0]
+
+    def lookup(self, val, mu, sigma, neg=False):
+        curve = invcdf_norm_curve(mu, sigma, neg=neg)
+        return curve[1][binary_search_lookup(val, curve[0])]
+
+    def test_invcdf_norm(self):
+        # The last curves are truncated at 0
+        for mu, sigma in [(10.0, 1.0), (120.0, 35.5), (1.0, 0.5), (2.0, 1.0), (0.5, 3.0), (-5.0, 1.0)]:
+            for neg in (False, True):
+                values = invcdf_norm_array(self.vals, mu, sigma, neg=neg)
+                for val, value in zip(self.vals, values):
+                    self.assertAlmostEqual(value, self.lookup(val, mu, sigma, neg), places=9)
+                    self.assertAlmostEqual(invcdf_norm(val, mu, sigma, neg=neg), value, places=9)
+
+    def test_broadcast(self):
+        mus = np.array([[10.0], [1.0], [50.0]])
+        sigmas = np.array([[1.0], [2.0], [5.0]])
+        values = invcdf_norm_array(self.vals, mus, sigmas)
+        self.assertEqual(values.shape, (3, len(self.vals)))
+        for k in range(3):
+            for val, value in zip(self.vals, values[k]):
+                self.assertAlmostEqual(value, self.lookup(val, mus[k, 0], sigmas[k, 0]), places=9)
+
+    def test_no_curve_per_distribution(self):
+        distempirical.standard_invcdf_curve.cache_clear()
+        invcdf_norm_array(self.vals, np.arange(1, 200).reshape(-1, 1) * 10.0, 1.0)
+        self.assertEqual(distempirical.standard_invcdf_curve.cache_info().currsize, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import json
+import logging
+import sys
+from stn.stp import STP
+import os
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STN = code_dir + "/data/pstn_two_tasks.json"
+
+logger = logging.getLogger()
+logger.level = logging.INFO
+stream_handler = logging.StreamHandler(sys.stdout)
+logger.addHandler(stream_handler)
+
+
+class TestDREA(unittest.TestCase):
+    """ Tests the solver Dynamic Robust Execution
+
+    """
+    logger = logging.getLogger('stn.test')
+
+    def setUp(self):
+        with open(STN) as json_file:
+            pstn_dict = json.load(json_file)
+
+        pstn_json = json.dumps(pstn_dict)
+
+        self.stp = STP('drea')
+        self.stn = self.stp.get_stn(stn_json=pstn_json)
+
+    def test_solve(self):
+        dispatchable_graph = self.stp.solve(self.stn)
+        self.logger.info("GUIDE")
+        self.logger.info(dispatchable_graph)
+
+        self.assertEqual(dispatchable_graph.get_completion_time(), 163)
+        self.assertEqual(dispatchable_graph.get_makespan(), 97)
+        self.assertEqual(dispatchable_graph.risk_metric, 0.0)
+        self.assertEqual(self.stp.solver.engine.n_solves, 1)
+
+    def test_execute_within_guide(self):
+        self.stp.solve(self.stn)
+        engine = self.stp.solver.engine
+
+        # Start of the first task: [37, 38] in the guide
+        resolved = engine.execute_timepoint(1, 37)
+        self.assertFalse(resolved)
+        self.assertEqual(engine.n_solves, 1)
+        self.assertTrue(engine.guide.nodes[1]['data'].is_executed)
+        # The stn given to the solver is not modified
+        self.assertFalse(self.stn.nodes[1]['data'].is_executed)
+
+    def test_execute_outside_guide(self):
+        self.stp.solve(self.stn)
+        engine = self.stp.solver.engine
+        engine.execute_timepoint(1, 37)
+
+        # Pickup of the first task: [41, 47] in the guide
+        engine.assign_timepoint(50, 2)
+        resolved = engine.execute_timepoint(2)
+        self.logger.info("GUIDE after executing node 2 at 50")
+        self.logger.info(engine.guide)
+
+        self.assertTrue(resolved)
+        self.assertEqual(engine.n_solves, 2)
+        # SREA is re-run on the unexecuted timepoints
+        self.assertFalse(engine.guide.has_node(1))
+        self.assertEqual(engine.guide.get_node_earliest_time(2), 50)
+        self.assertEqual(engine.guide.get_node_earliest_time(3), 51)
+
+    def test_risk_threshold(self):
+        self.stp = STP('drea', risk_threshold=-1)
+        self.stp.solve(self.stn)
+        engine = self.stp.solver.engine
+
+        resolved = engine.execute_timepoint(1, 37)
+        self.assertTrue(resolved)
+        self.assertEqual(engine.n_solves, 2)
+
+    def test_execute_without_time(self):
+        self.stp.solve(self.stn)
+        with self.assertRaises(ValueError):
+            self.stp.solver.engine.execute_timepoint(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,12 @@ import unittest
 import json
 import logging
 import sys
+import time
+from unittest import mock
+from stn.methods.dsc_lp import dsc_insertions, evaluate_insertions_worker
 from stn.stp import STP
+from stn.utils.pool import get_pool
+from stn.utils.utils import load_yaml, create_task
 import os
 
 code_dir = os.path.abspath(os.path.dirname(__file__))
@@ -113,5 +118,87 @@ class TestDSC(unittest.TestCase):
                 self.assertEqual(upper_bound, 6)
 
 
+class TestDSCInsertions(unittest.TestCase):
+    """ Tests the evaluation of a task inserted at several positions
+    """
+
+    def setUp(self):
+        tasks_dict = load_yaml(code_dir + "/data/tasks.yaml")
+        self.stp = STP('dsc')
+        tasks = [create_task(self.stp.get_stn(), task_dict) for task_dict in tasks_dict.values()]
+        self.stnu = self.stp.get_stn()
+        self.stnu.add_task(tasks[0], 1)
+        self.stnu.add_task(tasks[2], 2)
+        self.task = tasks[1]
+        self.positions = [1, 2, 3]
+
+    def get_expected_results(self):
+        results = list()
+        for position in self.positions:
+            stnu = self.stnu.clone()
+            stnu.add_task(self.task, position)
+            try:
+                schedule = self.stp.solve(stnu)
+            except Exception:
+                results.append((position, None, None))
+                continue
+            results.append((position, schedule, schedule.get_completion_time()))
+        return results
+
+    def assert_results(self, results):
+        expected_results = self.get_expected_results()
+        self.assertEqual([position for position, dsc, schedule, temporal_metric in results], self.positions)
+        for (position, dsc, schedule, temporal_metric), (_, expected_schedule, expected_temporal_metric) in \
+                zip(results, expected_results):
+            if expected_schedule is None:
+                self.assertIsNone(schedule)
+                continue
+            self.assertEqual(schedule, expected_schedule)
+            self.assertEqual(schedule.risk_metric, expected_schedule.risk_metric)
+            self.assertEqual(1 - dsc, expected_schedule.risk_metric)
+            self.assertEqual(temporal_metric, expected_temporal_metric)
+
+    def test_dsc_insertions(self):
+        n_tasks = len(self.stnu.get_tasks())
+        results = dsc_insertions(self.stnu, self.task, self.positions)
+        self.assertTrue(any(schedule is not None for position, dsc, schedule, temporal_metric in results))
+        self.assert_results(results)
+        # The stnu is not modified
+        self.assertEqual(len(self.stnu.get_tasks()), n_tasks)
+
+    def test_parallel_dsc_insertions(self):
+        results = STP('dsc', workers=2).solver.dsc_insertions(self.stnu, self.task, self.positions)
+        self.assert_results(results)
+
+    def test_parallel_submissions(self):
+        # The stnu is sent once to each worker, with its share of the positions
+        pool = mock.Mock(wraps=get_pool(2))
+        with mock.patch('stn.methods.dsc_lp.get_pool', return_value=pool):
+            results = dsc_insertions(self.stnu, self.task, self.positions, workers=2)
+        self.assertEqual(pool.submit.call_count, 2)
+        self.assert_results(results)
+
+    def test_deadline(self):
+        for workers in (1, 2):
+            with self.assertLogs('stn.dsc_lp', level='WARNING'):
+                results = dsc_insertions(self.stnu, self.task, self.positions, workers=workers, deadline=-1)
+            self.assertEqual(results, [(position, None, None, None) for position in self.positions])
+
+    def test_slow_lp(self):
+        # The results are returned at the deadline while the LPs are still running
+        for workers in (1, 2):
+            start_time = time.time()
+            with mock.patch('stn.methods.dsc_lp.evaluate_insertions_worker', slow_evaluate_insertions_worker):
+                with self.assertLogs('stn.dsc_lp', level='WARNING'):
+                    results = dsc_insertions(self.stnu, self.task, self.positions, workers=workers, deadline=0.2)
+            self.assertLess(time.time() - start_time, 0.8)
+            self.assertEqual(results, [(position, None, None, None) for position in self.positions])
+
+
+def slow_evaluate_insertions_worker(*args):
+    time.sleep(1)
+    return evaluate_insertions_worker(*args)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from stn.exceptions.stp import NoSTPSolution
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+TASKS = code_dir + "/data/tasks.yaml"
+
+
+class TestEvaluateInsertions(unittest.TestCase):
+    """ Tests the evaluation of a task inserted at each position of an stn
+    """
+
+    def get_stn(self, stp):
+        tasks = [create_task(stp.get_stn(), task_dict) for task_dict in load_yaml(TASKS).values()]
+        stn = stp.get_stn()
+        stn.add_task(tasks[0], 1)
+        stn.add_task(tasks[2], 2)
+        return stn, tasks[1]
+
+    @staticmethod
+    def get_expected_results(stn, task, stp, temporal_criterion):
+        results = list()
+        for position in range(1, len(stn.get_tasks()) + 2):
+            insertion_stn = stn.clone()
+            insertion_stn.add_task(task, position)
+            try:
+                dispatchable_graph = stp.solve(insertion_stn)
+            except NoSTPSolution:
+                results.append((position, False, None, None))
+                continue
+            results.append((position, True, dispatchable_graph.compute_temporal_metric(temporal_criterion),
+                            dispatchable_graph.risk_metric))
+        return results
+
+    def assert_results(self, solver_name):
+        stp = STP(solver_name)
+        stn, task = self.get_stn(stp)
+        stn_hash = stn.get_hash()
+        for temporal_criterion in ('completion_time', 'makespan', 'idle_time'):
+            results = stn.evaluate_insertions(task, stp, temporal_criterion)
+            expected_results = self.get_expected_results(stn, task, stp, temporal_criterion)
+            self.assertCountEqual(results, expected_results)
+            feasible = [result for result in results if result[1]]
+            self.assertTrue(feasible)
+            self.assertEqual(results[:len(feasible)], sorted(feasible, key=lambda result: result[2:]))
+        # The stn is not modified
+        self.assertEqual(stn.get_hash(), stn_hash)
+        self.assertEqual(len(stn.get_tasks()), 2)
+
+    def test_fpc(self):
+        self.assert_results('fpc')
+
+    def test_srea(self):
+        self.assert_results('srea')
+
+    def test_dsc(self):
+        self.assert_results('dsc')
+
+    def test_rejected_positions(self):
+        stn, task = self.get_stn(STP('fpc'))
+        results = stn.evaluate_insertions(task, 'fpc', 'completion_time')
+        # The task can only be done between the other two tasks
+        self.assertEqual(results[0][:2], (2, True))
+        self.assertEqual({(position, feasible, temporal_metric, risk_metric)
+                          for position, feasible, temporal_metric, risk_metric in results[1:]},
+                         {(1, False, None, None), (3, False, None, None)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 import json
 import logging
 import sys
+from stn.exceptions.stp import NoSTPSolution
 from stn.stp import STP
 import os
 
@@ -106,6 +107,12 @@ class TestFPC(unittest.TestCase):
                 self.assertEqual(lower_bound, 4)
                 self.assertEqual(upper_bound, 10)
 
+    def test_inconsistent_stn(self):
+        # The first task cannot start after the start of the second task
+        self.stn.add_constraint(1, 4, 100, 200)
+        self.assertFalse(self.stp.is_consistent(self.stn))
+        self.assertRaises(NoSTPSolution, self.stp.solve, self.stn)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
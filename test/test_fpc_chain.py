@@ -0,0 +1,79 @@
+import unittest
+import json
+import logging
+import sys
+from stn.exceptions.stp import NoSTPSolution
+from stn.methods.fpc import get_chain
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+import os
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STN = code_dir + "/data/stn_two_tasks.json"
+TASKS = code_dir + "/data/tasks.yaml"
+
+logger = logging.getLogger()
+logger.level = logging.DEBUG
+stream_handler = logging.StreamHandler(sys.stdout)
+logger.addHandler(stream_handler)
+
+
+class TestChainFPC(unittest.TestCase):
+    """ Tests the solver ChainPathConsistency
+
+    """
+    logger = logging.getLogger('stn.test')
+
+    def setUp(self):
+        # Load the stn as a dictionary
+        with open(STN) as json_file:
+            stn_dict = json.load(json_file)
+
+        # Convert the dict to a json string
+        stn_json = json.dumps(stn_dict)
+
+        self.stp = STP('fpc-chain')
+        self.stn = self.stp.get_stn(stn_json=stn_json)
+
+    def test_build_stn(self):
+        self.assertEqual(get_chain(self.stn), [1, 2, 3, 4, 5, 6])
+
+        minimal_network = self.stp.solve(self.stn)
+        self.logger.info("Minimal STN: \n %s", minimal_network)
+
+        expected_minimal_network = STP('fpc').solve(self.stn)
+        self.assertEqual(minimal_network, expected_minimal_network)
+        self.assertEqual(minimal_network.get_completion_time(), 157)
+        self.assertEqual(minimal_network.get_makespan(), 100)
+
+    def test_rounding(self):
+        # Weights with more than two decimals
+        stn = self.stp.get_stn()
+        for position, task_dict in enumerate(load_yaml(TASKS).values(), 1):
+            task_dict['earliest_pickup'] += 0.125 * position
+            task_dict['latest_pickup'] += 0.375 * position
+            task_dict['travel_time']['mean'] += 0.005
+            stn.add_task(create_task(stn, task_dict), position)
+
+        minimal_network = self.stp.solve(stn)
+        expected_minimal_network = STP('fpc').solve(stn)
+        for i, j in expected_minimal_network.edges():
+            self.assertEqual(minimal_network.get_edge_weight(i, j), expected_minimal_network.get_edge_weight(i, j))
+
+    def test_not_a_chain(self):
+        # Constraint between the start of the first task and the start of the second task
+        self.stn.add_constraint(1, 4, 50, 60)
+        self.assertIsNone(get_chain(self.stn))
+
+        minimal_network = self.stp.solve(self.stn)
+        expected_minimal_network = STP('fpc').solve(self.stn)
+        self.assertEqual(minimal_network, expected_minimal_network)
+
+    def test_inconsistent_stn(self):
+        # The delivery of the first task cannot be after the start of the second task
+        self.stn.add_constraint(0, 3, 97, 100)
+        self.assertRaises(NoSTPSolution, self.stp.solve, self.stn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import copy
+import os
+import unittest
+from unittest import mock
+
+from stn.methods.fpc import get_minimal_network, floyd_warshall
+from stn.stn import STN
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+from stn.utils.uuid import from_str
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestIncrementalFPC(unittest.TestCase):
+    """ Tests that the minimal network tracked by the STN is the one computed from scratch
+    """
+
+    def setUp(self):
+        tasks_dict = load_yaml(code_dir + "/data/tasks.yaml")
+        self.tasks = list()
+        for task_dict in tasks_dict.values():
+            task = create_task(STN(), task_dict)
+            task.task_id = from_str(task.task_id)
+            self.tasks.append(task)
+
+    def assert_same_minimal_network(self, stn):
+        self.assertIsNotNone(stn._minimal_distances)
+        untracked_stn = copy.deepcopy(stn)
+        untracked_stn.track_minimal_network(False)
+        self.assertEqual(get_minimal_network(untracked_stn), get_minimal_network(stn))
+
+    def test_add_tasks(self):
+        stn = STN()
+        stn.track_minimal_network()
+        stn.add_task(self.tasks[1], 1)
+        # Computes the minimal distances. From now on, they are updated incrementally
+        self.assertTrue(stn.is_consistent())
+
+        # Insert at the beginning
+        stn.add_task(self.tasks[0], 1)
+        self.assert_same_minimal_network(stn)
+
+        # Insert at the end
+        stn.add_task(self.tasks[2], 3)
+        self.assert_same_minimal_network(stn)
+
+        stn.remove_task(2)
+        self.assertIsNone(stn._minimal_distances)
+
+        # Insert in the middle
+        stn.get_minimal_distances()
+        stn.add_task(self.tasks[1], 2)
+        self.assert_same_minimal_network(stn)
+
+    def test_update_task(self):
+        stn = STN()
+        stn.track_minimal_network()
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[1], 2)
+        stn.get_minimal_distances()
+
+        # Tighten the pickup window of the second task
+        task = self.tasks[1]
+        task.update_timepoint("pickup", 45, 48)
+        stn.update_task(task)
+        self.assert_same_minimal_network(stn)
+
+        # Assign a time to the first timepoint
+        stn.assign_timepoint(6, 1)
+        self.assert_same_minimal_network(stn)
+
+        # Loosening a constraint discards the minimal distances, update_task recomputes them
+        task.update_timepoint("pickup", 40, 50)
+        self.assertTrue(stn.update_task(task))
+        self.assert_same_minimal_network(stn)
+
+    def test_inconsistent_task(self):
+        stn = STN()
+        stn.track_minimal_network()
+        stn.add_task(self.tasks[1], 1)
+        stn.get_minimal_distances()
+
+        # The task in position 2 has to be picked up before the task in position 1
+        self.assertFalse(stn.add_task(self.tasks[0], 2))
+        self.assertFalse(stn._minimal_distances.is_consistent)
+        self.assertFalse(stn.is_consistent())
+        self.assertIsNone(get_minimal_network(stn))
+
+    def test_consistency_flag(self):
+        stn = STN()
+        self.assertIsNone(stn.add_task(self.tasks[1], 1))
+
+        stn.track_minimal_network()
+        # The distances are computed when the first task is added
+        self.assertTrue(stn.add_task(self.tasks[2], 2))
+        self.assertIsNotNone(stn._minimal_distances)
+        node_id = stn.get_edge_node_idx(self.tasks[2].task_id, "pickup")
+        earliest_time = stn.get_node_earliest_time(node_id)
+        latest_time = stn.get_node_latest_time(node_id)
+        self.assertTrue(stn.add_constraint(0, node_id, earliest_time, latest_time - 1))
+        # The pickup cannot be after its earliest time minus 1
+        self.assertFalse(stn.add_constraint(0, node_id, earliest_time, earliest_time - 1))
+
+    def test_stp(self):
+        stp = STP('fpc')
+        stn = stp.get_stn()
+        stn.add_task(self.tasks[1], 1)
+        self.assertTrue(stn.add_task(self.tasks[2], 2))
+
+        # The solver uses the minimal distances updated by add_task
+        self.assertTrue(stn.add_task(self.tasks[0], 1))
+        with mock.patch('stn.stn.floyd_warshall', wraps=floyd_warshall) as fw:
+            stp.solve(stn)
+            self.assertEqual(fw.call_count, 0)
+        self.assert_same_minimal_network(stn)
+
+        # Stns that are not created by the stp track their minimal network once solved
+        untracked_stn = STN()
+        untracked_stn.add_task(self.tasks[1], 1)
+        self.assertIsNone(untracked_stn.add_task(self.tasks[2], 2))
+        stp.solve(untracked_stn)
+        self.assertTrue(untracked_stn.add_task(self.tasks[0], 1))
+        self.assert_same_minimal_network(untracked_stn)
+
+
+if __name__ == '__main__':
+    unittest.main()
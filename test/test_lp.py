@@ -0,0 +1,122 @@
+import itertools
+import json
+import os
+import unittest
+
+import pulp
+
+from stn.methods.dsc_lp import DSC_LP
+from stn.methods.lp import SparseLP, STNArrays, get_lp_solver
+from stn.methods.srea import srea
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestLP(unittest.TestCase):
+    """ Tests that the LP backends give the same results
+    """
+
+    def get_stn(self, solver_name, file_name):
+        with open(code_dir + "/data/" + file_name) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        return STP(solver_name).get_stn(stn_json=stn_json)
+
+    def test_srea(self):
+        pstn = self.get_stn('srea', "pstn_five_tasks.json")
+        alpha_cbc, stn_cbc = srea(pstn, lp_solver='cbc')
+        alpha_highs, stn_highs = srea(pstn, lp_solver='highs')
+        self.assertEqual(alpha_cbc, alpha_highs)
+        for i, j in stn_cbc.edges():
+            self.assertEqual(stn_cbc.get_edge_weight(i, j), stn_highs.get_edge_weight(i, j))
+
+    def test_srea_tasks(self):
+        # PSTNs with the tasks in tasks.yaml, with different time windows and variances
+        for gap, width, variance in itertools.product([15, 20], [2, 5, 10], [1, 3]):
+            pstn = STP('srea').get_stn()
+            for position, task_dict in enumerate(load_yaml(code_dir + "/data/tasks.yaml").values(), 1):
+                task_dict['earliest_pickup'] = 10 + gap * position
+                task_dict['latest_pickup'] = 10 + gap * position + width
+                task_dict['travel_time']['variance'] = variance
+                task_dict['work_time']['variance'] = variance
+                pstn.add_task(create_task(pstn, task_dict), position)
+
+            # Without canonical=True, the backends return different optimal solutions for some of them
+            alpha_cbc, stn_cbc = srea(pstn, lp_solver='cbc', canonical=True)
+            alpha_highs, stn_highs = srea(pstn, lp_solver='highs', canonical=True)
+            self.assertEqual(alpha_cbc, alpha_highs)
+            for i, j in stn_cbc.edges():
+                self.assertEqual(stn_cbc.get_edge_weight(i, j), stn_highs.get_edge_weight(i, j))
+
+    def test_dsc(self):
+        stnu = self.get_stn('dsc', "stnu_two_tasks.json")
+        status_cbc, bounds_cbc, epsilons_cbc = DSC_LP(stnu, lp_solver='cbc').original_lp()
+        status_highs, bounds_highs, epsilons_highs = DSC_LP(stnu, lp_solver='highs').original_lp()
+        self.assertEqual(status_cbc, status_highs)
+        for key in epsilons_cbc:
+            self.assertAlmostEqual(epsilons_cbc[key].varValue, epsilons_highs[key].varValue)
+
+    def test_status(self):
+        x = pulp.LpVariable('x', lowBound=0, upBound=10)
+        y = pulp.LpVariable('y', lowBound=0)
+        prob = pulp.LpProblem('test', pulp.LpMaximize)
+        prob += x + 2 * y
+        prob += x + y <= 4
+        prob += x - y >= 1
+
+        prob.solve(get_lp_solver('highs'))
+        self.assertEqual(pulp.LpStatus[prob.status], 'Optimal')
+        self.assertAlmostEqual(x.varValue, 2.5)
+        self.assertAlmostEqual(y.varValue, 1.5)
+
+        prob += x >= 5
+        prob.solve(get_lp_solver('highs'))
+        self.assertEqual(pulp.LpStatus[prob.status], 'Infeasible')
+
+        self.assertRaises(ValueError, get_lp_solver, 'glpk')
+
+    def test_sparse_lp(self):
+        for lp_solver in ('highs', 'cbc'):
+            prob = SparseLP('test', pulp.LpMaximize)
+            x, y = prob.add_variables(['x', 'y'], 0, [10, float('inf')])
+            prob.set_objective([x, y], [1, 2])
+            prob.add_constraints([[x, y]], [1, 1], pulp.LpConstraintLE, 4, names=['capacity'])
+            prob.add_constraints([[x, y]], [1, -1], pulp.LpConstraintGE, 1)
+            variable_x, variable_y = prob.get_variables([x, y])
+            self.assertEqual(variable_y.upBound, None)
+
+            prob.solve(get_lp_solver(lp_solver))
+            self.assertEqual(pulp.LpStatus[prob.status], 'Optimal')
+            self.assertAlmostEqual(variable_x.varValue, 2.5)
+            self.assertAlmostEqual(variable_y.varValue, 1.5)
+
+            prob.set_rhs('capacity', 6)
+            prob.solve(get_lp_solver(lp_solver))
+            self.assertAlmostEqual(variable_y.varValue, 2.5)
+
+            variable_x.lowBound = 5
+            prob.solve(get_lp_solver(lp_solver))
+            self.assertAlmostEqual(variable_x.varValue, 5)
+
+            prob.set_rhs('capacity', 4)
+            prob.solve(get_lp_solver(lp_solver))
+            self.assertEqual(pulp.LpStatus[prob.status], 'Infeasible')
+
+    def test_stn_arrays(self):
+        for solver_name in ('fpc', 'fpc-dense'):
+            stn = self.get_stn(solver_name, "stn_two_tasks.json")
+            arrays = STNArrays(stn)
+            constraints = stn.get_constraints()
+            self.assertEqual(list(zip(arrays.sources.tolist(), arrays.targets.tolist())), list(constraints))
+            for i, j, weight, reverse_weight in zip(arrays.sources.tolist(), arrays.targets.tolist(),
+                                                    arrays.weights.tolist(), arrays.reverse_weights.tolist()):
+                self.assertEqual(weight, stn.get_edge_weight(i, j))
+                self.assertEqual(reverse_weight, stn.get_edge_weight(j, i))
+            for i, earliest, latest in zip(arrays.node_ids.tolist(), arrays.earliest.tolist(), arrays.latest.tolist()):
+                self.assertEqual(earliest, -stn.get_edge_weight(i, 0))
+                self.assertEqual(latest, stn.get_edge_weight(0, i))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import copy
+import gc
+import json
+import os
+import pickle
+import unittest
+
+from stn.node import Node, NodeType, task_id_table
+from stn.stp import STP
+from stn.utils.uuid import generate_uuid
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+PSTN = code_dir + "/data/pstn_two_tasks.json"
+
+
+class TestNode(unittest.TestCase):
+
+    def test_node(self):
+        task_id = generate_uuid()
+        node = Node(str(task_id), 'pickup', action_id=generate_uuid())
+        self.assertFalse(hasattr(node, '__dict__'))
+        self.assertEqual(node.task_id, task_id)
+        self.assertIs(node.node_type, NodeType.PICKUP)
+        self.assertEqual(node.node_type, 'pickup')
+
+        # The nodes of a task share the same task id
+        self.assertIs(Node(str(task_id), 'delivery').task_id, node.task_id)
+
+        self.assertEqual(Node.from_dict(node.to_dict()), node)
+        self.assertEqual(copy.deepcopy(node), node)
+        self.assertEqual(pickle.loads(pickle.dumps(node)), node)
+        self.assertEqual(json.loads(json.dumps(node.to_dict()))['node_type'], 'pickup')
+
+        # Node types saved by older versions are kept as strings
+        self.assertEqual(Node(task_id, 'navigation').to_dict()['node_type'], 'navigation')
+
+    def test_task_id_table(self):
+        with open(PSTN) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        pstn = STP('srea').get_stn(stn_json=stn_json)
+        # Copies of the task ids, which do not keep the interned task ids alive
+        task_ids = [copy.copy(task_id) for task_id in pstn.get_tasks()]
+        clone = pstn.clone()
+        for task_id in task_ids:
+            self.assertIn(task_id, task_id_table)
+
+        # The task id is dropped once its task has been removed from all the stns
+        pstn.remove_task(1)
+        clone.remove_task(1)
+        gc.collect()
+        self.assertNotIn(task_ids[0], task_id_table)
+        self.assertIn(task_ids[1], task_id_table)
+
+        del pstn, clone
+        gc.collect()
+        self.assertNotIn(task_ids[1], task_id_table)
+
+    def test_pstn_attributes(self):
+        with open(PSTN) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        pstn = STP('srea').get_stn(stn_json=stn_json)
+
+        for (i, j), constraint in pstn.get_contingent_constraints().items():
+            self.assertTrue(pstn[i][j]['is_contingent'])
+            self.assertIn('distribution', pstn[i][j])
+
+        self.assertEqual(pickle.loads(pickle.dumps(pstn)), pstn)
+        self.assertEqual(pstn.__class__.from_json(pstn.to_json()), pstn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import random
+import unittest
+
+from stn.utils.order_list import OrderList
+
+
+class TestOrderList(unittest.TestCase):
+
+    def test_insert_and_remove(self):
+        order_list = OrderList()
+        expected = list()
+        random.seed(0)
+        for item in range(1000):
+            if expected and random.random() < 0.2:
+                removed = random.choice(expected)
+                expected.remove(removed)
+                order_list.remove(removed)
+                continue
+            position = random.choice([0, len(expected), random.randint(0, len(expected))])
+            order_list.insert_after(expected[position-1] if position > 0 else None, item)
+            expected.insert(position, item)
+
+        self.assertEqual(list(order_list), expected)
+        self.assertEqual(len(order_list), len(expected))
+        self.assertEqual(order_list.first, expected[0])
+        self.assertEqual(order_list.last, expected[-1])
+        for position in [0, 1, len(expected) // 2, len(expected) - 1]:
+            self.assertEqual(order_list[position], expected[position])
+            self.assertEqual(order_list.index(expected[position]), position)
+        self.assertTrue(order_list.precedes(expected[1], expected[-1]))
+        self.assertFalse(order_list.precedes(expected[-1], expected[1]))
+
+    def test_insert_at_beginning(self):
+        order_list = OrderList()
+        for item in range(1000):
+            order_list.insert_after(None, item)
+        self.assertEqual(list(order_list), list(reversed(range(1000))))
+
+        order_list.insert_before(0, 'last but one')
+        self.assertEqual(order_list.prev(0), 'last but one')
+        self.assertRaises(ValueError, order_list.append, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import unittest
+
+from stn.exceptions.stn import PatchError
+from stn.stp import STP
+from stn.utils.utils import load_yaml, create_task
+from stn.utils.uuid import from_str, generate_uuid
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestPatch(unittest.TestCase):
+    """ Tests that the changes of an stn since a version are applied to a copy of the stn
+    """
+
+    def setUp(self):
+        tasks_dict = load_yaml(code_dir + "/data/tasks.yaml")
+        self.task_dicts = list(tasks_dict.values())
+
+    def create_task(self, stn):
+        task = create_task(stn, self.task_dicts[0])
+        task.task_id = generate_uuid()
+        return task
+
+    def assert_patch(self, solver_name, binary):
+        stp = STP(solver_name)
+        stn = stp.get_stn()
+        stn.add_task(self.create_task(stn), 1)
+        stn.add_task(self.create_task(stn), 2)
+        receiver = stp.get_stn(stn_json=stn.to_json())
+        self.assertEqual(receiver.version, stn.version)
+
+        stn.add_task(self.create_task(stn), 1)
+        stn.remove_task(3)
+        stn.assign_timepoint(45, 1, force=True)
+        stn.execute_timepoint(1)
+        stn.execute_edge(1, 2)
+        stn.set_action_id(2, generate_uuid())
+
+        patch = stn.get_binary_patch(receiver.version) if binary else stn.get_patch(receiver.version)
+        receiver.apply_patch(patch)
+        self.assertEqual(receiver.version, stn.version)
+        self.assertEqual(receiver.get_hash(), stn.get_hash())
+        self.assertEqual(receiver, stn)
+        self.assertEqual(receiver.get_tasks(), stn.get_tasks())
+        for i, j, data in stn.edges.data():
+            self.assertEqual(dict(receiver[i][j]), dict(data))
+
+        # Nothing changed since the last patch
+        patch = stn.get_patch(stn.version)
+        self.assertEqual(patch['nodes'], [])
+        self.assertEqual(patch['links'], [])
+        self.assertNotIn('task_sequence', patch)
+
+    def test_stn(self):
+        self.assert_patch('fpc', binary=False)
+        self.assert_patch('fpc', binary=True)
+
+    def test_pstn(self):
+        self.assert_patch('srea', binary=False)
+        self.assert_patch('srea', binary=True)
+
+    def test_stnu(self):
+        self.assert_patch('dsc', binary=True)
+
+    def test_patch_size(self):
+        stp = STP('fpc')
+        stn = stp.get_stn()
+        for position in range(1, 21):
+            stn.add_task(self.create_task(stn), position)
+        version = stn.version
+        stn.assign_timepoint(45, 1, force=True)
+
+        patch = stn.get_patch(version)
+        self.assertCountEqual(patch['links'], [stn._get_link(0, 1), stn._get_link(1, 0)])
+        self.assertLess(len(json.dumps(patch)), len(stn.to_json()) / 10)
+
+    def test_wrong_base_version(self):
+        stp = STP('fpc')
+        stn = stp.get_stn()
+        receiver = stp.get_stn(stn_json=stn.to_json())
+        stn.add_task(self.create_task(stn), 1)
+        patch = stn.get_patch(receiver.version)
+        receiver.apply_patch(json.dumps(patch))
+        self.assertRaises(PatchError, receiver.apply_patch, patch)
+        self.assertRaises(ValueError, stn.get_patch, stn.version + 1)
+
+    def test_divergence(self):
+        stp = STP('fpc')
+        stn = stp.get_stn()
+        stn.add_task(self.create_task(stn), 1)
+        receiver = stp.get_stn(stn_json=stn.to_json())
+        # The receiver changes its copy without bumping its version
+        receiver._set_edge_weight(0, 1, 100.)
+        receiver._reset_logs(stn.version)
+
+        stn.assign_timepoint(45, 2, force=True)
+        self.assertRaises(PatchError, receiver.apply_patch, stn.get_binary_patch(receiver.version))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,14 @@ import unittest
 import json
 import logging
 import sys
+from stn.methods.fpc import get_minimal_network
+from stn.methods.lp import SparseLP, get_lp_solver
+from stn.methods.srea import setUpLP, srea_LP, srea
 from stn.stp import STP
+from stn.utils.utils import create_task
+from stn.utils.uuid import generate_uuid
 import os
+from unittest import mock
 
 # A global variable that stores the max float that will be used to deal with infinite edges.
 MAX_FLOAT = sys.float_info.max
@@ -114,6 +120,69 @@ class TestSREA(unittest.TestCase):
                 self.assertEqual(lower_bound, 0)
                 self.assertEqual(upper_bound, MAX_FLOAT)
 
+    def test_lp_reuse(self):
+        stn = get_minimal_network(self.stn)
+        for lp_solver in ['highs', 'cbc']:
+            solver = get_lp_solver(lp_solver)
+            probContainer = setUpLP(stn, False)
+            bounds, deltas, prob = probContainer
+            number_of_constraints = len(prob)
+
+            # The same LP is solved for all alphas, only its right-hand sides and bounds change.
+            # The pulp problem given to CBC is built once and updated in place
+            with mock.patch.object(SparseLP, 'to_pulp', autospec=True, side_effect=SparseLP.to_pulp) as to_pulp:
+                for alpha in [0.5, 0.1, 0.9, 0.05, 0.0]:
+                    LPbounds = srea_LP(stn, alpha, False, probContainer=probContainer, solver=solver)
+                    self.assertEqual(len(prob), number_of_constraints)
+
+                    expected_probContainer = setUpLP(stn, False)
+                    expected_LPbounds = srea_LP(stn, alpha, False, probContainer=expected_probContainer,
+                                                solver=solver)
+                    if expected_LPbounds is None:
+                        self.assertIsNone(LPbounds)
+                        continue
+                    self.assertIs(LPbounds, bounds)
+                    expected_prob = expected_probContainer[2]
+                    self.assertAlmostEqual(prob.objective @ prob.values, expected_prob.objective @ expected_prob.values)
+                # Once for prob and once for each expected LP
+                self.assertEqual(to_pulp.call_count, 0 if lp_solver == 'highs' else 6)
+
+    def test_parallel_alpha_search(self):
+        dispatchable_graph = self.stp.solve(self.stn)
+
+        with open(code_dir + "/data/pstn_five_tasks.json") as json_file:
+            pstn_json = json.dumps(json.load(json_file))
+        stn = self.stp.get_stn(stn_json=pstn_json)
+        dispatchable_graph_5 = self.stp.solve(stn)
+
+        # The same alphas and bounds are found by trying several alphas at the same time
+        stp = STP('srea', workers=3)
+        for graph, pstn in [(dispatchable_graph, self.stn), (dispatchable_graph_5, stn)]:
+            parallel_graph = stp.solve(pstn)
+            self.assertEqual(parallel_graph.risk_metric, graph.risk_metric)
+            for (i, j) in graph.edges():
+                self.assertEqual(parallel_graph.get_edge_weight(i, j), graph.get_edge_weight(i, j))
+
+    def test_parallel_alpha_search_not_monotone(self):
+        pstn = self.stp.get_stn()
+        task_dict = {'task_id': str(generate_uuid()), 'earliest_pickup': 10.0, 'latest_pickup': 19.848,
+                     'travel_time': {'name': 'travel_time', 'mean': 3.899, 'variance': 0.85},
+                     'work_time': {'name': 'work_time', 'mean': 6.0, 'variance': 0.99}}
+        pstn.add_task(create_task(pstn, task_dict), 1)
+
+        # The LP is feasible at 0.005 and 0.012 but not at 0.008
+        stn = get_minimal_network(pstn)
+        self.assertIsNotNone(srea_LP(stn, 0.005, False))
+        self.assertIsNone(srea_LP(stn, 0.008, False))
+        self.assertIsNotNone(srea_LP(stn, 0.012, False))
+
+        alpha, guide = srea(pstn)
+        for workers in (2, 3, 4):
+            parallel_alpha, parallel_guide = srea(pstn, workers=workers)
+            self.assertEqual(parallel_alpha, alpha)
+            for (i, j) in guide.edges():
+                self.assertEqual(parallel_guide.get_edge_weight(i, j), guide.get_edge_weight(i, j))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+import os
+import unittest
+
+from stn.stn import STN
+from stn.utils.utils import load_yaml, create_task
+from stn.utils.uuid import from_str
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestSTNIndex(unittest.TestCase):
+    """ Tests that the lookups by task and node type stay correct while tasks are
+    added, removed and inserted in front of other tasks
+    """
+
+    def setUp(self):
+        tasks_dict = load_yaml(code_dir + "/data/tasks.yaml")
+        self.tasks = list()
+        for task_dict in tasks_dict.values():
+            task = create_task(STN(), task_dict)
+            task.task_id = from_str(task.task_id)
+            self.tasks.append(task)
+
+    def assert_index(self, stn):
+        for task_id in stn.get_tasks():
+            for node_type in ['start', 'pickup', 'delivery']:
+                node_id, node = stn.get_node_by_type(task_id, node_type)
+                self.assertEqual(node.task_id, task_id)
+                self.assertEqual(node.node_type, node_type)
+                self.assertEqual(stn.get_edge_node_idx(task_id, node_type), node_id)
+            self.assertEqual(len(stn.get_nodes_by_task(task_id)), 3)
+
+    def test_add_tasks(self):
+        stn = STN()
+        stn.add_task(self.tasks[1], 1)
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[2], 3)
+        self.assert_index(stn)
+
+        self.assertEqual(stn.get_tasks(), [task.task_id for task in self.tasks])
+        for position, task in enumerate(self.tasks, start=1):
+            self.assertEqual(stn.get_task_position(task.task_id), position)
+        # Node ids are stable, inserting a task in front does not relabel the other nodes
+        self.assertEqual(stn.get_task_node_ids(self.tasks[1].task_id), [1, 2, 3])
+        self.assertEqual(stn.get_task_node_ids(self.tasks[0].task_id), [4, 5, 6])
+        self.assertEqual(stn.get_ordered_node_ids(), [4, 5, 6, 1, 2, 3, 7, 8, 9])
+        self.assertTrue(stn.precedes(6, 1))
+        self.assertTrue(stn.has_edge(6, 1))
+        self.assertEqual(stn.get_task_id(1), self.tasks[0].task_id)
+
+        stn.remove_task(1)
+        self.assert_index(stn)
+        self.assertEqual(stn.get_tasks(), [task.task_id for task in self.tasks[1:]])
+        self.assertIsNone(stn.get_task_position(self.tasks[0].task_id))
+        self.assertIsNone(stn.get_time(self.tasks[0].task_id))
+        self.assertEqual(stn.get_nodes_by_task(self.tasks[0].task_id), [])
+        self.assertEqual(stn.get_task_position(self.tasks[2].task_id), 2)
+        # The wait constraint links the remaining tasks
+        self.assertTrue(stn.has_edge(3, 7))
+
+    def test_add_tasks_batch(self):
+        stn = STN()
+        stn.add_task(self.tasks[1], 1)
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[2], 3)
+
+        batch_stn = STN()
+        batch_stn.add_task(self.tasks[1], 1)
+        batch_stn.add_tasks([(self.tasks[0], 1), (self.tasks[2], 3)])
+
+        self.assertEqual(batch_stn.get_tasks(), stn.get_tasks())
+        self.assertEqual(batch_stn.number_of_edges(), stn.number_of_edges())
+        for task_id in stn.get_tasks():
+            for node_type in ['start', 'pickup', 'delivery']:
+                self.assertEqual(batch_stn.get_time(task_id, node_type), stn.get_time(task_id, node_type))
+        self.assert_index(batch_stn)
+
+    def test_add_tasks_invalid(self):
+        stn = STN()
+        stn.track_minimal_network()
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[2], 2)
+        stn_dict = stn.to_dict()
+        for tasks in [[(self.tasks[1], 2), (self.tasks[0], 3)],
+                      [(self.tasks[1], 2), (self.tasks[1], 3)],
+                      [(self.tasks[1], 0)]]:
+            with self.assertRaises(ValueError):
+                stn.add_tasks(tasks)
+            # The stn is not modified
+            self.assertEqual(stn.to_dict(), stn_dict)
+            self.assertIsNotNone(stn._minimal_distances)
+            self.assert_index(stn)
+
+    def test_json(self):
+        stn = STN()
+        stn.add_task(self.tasks[1], 1)
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[2], 2)
+
+        # The task sequence is stored with the stn
+        stn_json = stn.to_json()
+        new_stn = STN.from_json(stn_json)
+        self.assertEqual(new_stn, stn)
+        self.assertEqual(new_stn.get_tasks(), stn.get_tasks())
+        self.assertEqual(new_stn.get_ordered_node_ids(), stn.get_ordered_node_ids())
+
+    def test_action_id(self):
+        stn = STN()
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[1], 2)
+        action_id = from_str("0d06fb90-a76d-48b4-b64f-857b7388ab70")
+        stn.set_action_id(5, action_id)
+        self.assertEqual([node_id for node_id, _ in stn.get_nodes_by_action(action_id)], [5])
+
+        # The action index follows the node when it is relabeled
+        stn.relabel_nodes({5: 10})
+        self.assertEqual([node_id for node_id, _ in stn.get_nodes_by_action(action_id)], [10])
+
+    def test_subgraph(self):
+        stn = STN()
+        stn.add_task(self.tasks[0], 1)
+        stn.add_task(self.tasks[1], 2)
+        task_graph = stn.get_task_graph(self.tasks[1].task_id)
+        self.assertEqual(task_graph.get_tasks(), [self.tasks[1].task_id])
+        self.assertEqual(task_graph.get_edge_node_idx(self.tasks[1].task_id, 'delivery'), 6)
+        self.assertEqual(task_graph.get_task_position(self.tasks[1].task_id), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
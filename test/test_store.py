@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from stn.methods.fpc import floyd_warshall
+from stn.pstn.pstn import PSTN
+from stn.store import STNStore
+from stn.stp import STP
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestStore(unittest.TestCase):
+    """ Tests that stns are stored on disk and loaded back
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = STNStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_stn(self, solver_name, file_name):
+        with open(code_dir + "/data/" + file_name) as json_file:
+            stn_json = json.dumps(json.load(json_file))
+        return STP(solver_name).get_stn(stn_json=stn_json)
+
+    def test_save_load(self):
+        stn = self.get_stn('fpc', "stn_two_tasks.json")
+        pstn = self.get_stn('srea', "pstn_two_tasks.json")
+        self.store.save('robot_001', stn)
+        self.store.save('robot_002', pstn)
+        self.assertEqual(self.store.get_names(), ['robot_001', 'robot_002'])
+        self.assertIn('robot_001', self.store)
+
+        new_stn = self.store.load('robot_001')
+        self.assertEqual(new_stn, stn)
+        self.assertEqual(new_stn.get_tasks(), stn.get_tasks())
+        new_pstn = self.store.load('robot_002', PSTN)
+        self.assertIsInstance(new_pstn, PSTN)
+        self.assertEqual(new_pstn, pstn)
+
+        # Saving again replaces the stored stn
+        stn.assign_timepoint(45, 1, force=True)
+        self.store.save('robot_001', stn)
+        self.assertEqual(self.store.load('robot_001'), stn)
+        self.assertEqual(self.store.get_version('robot_001'), stn.version)
+        self.assertEqual(os.listdir(self.directory).count('robot_001.stn.tmp'), 0)
+
+        self.store.remove('robot_002')
+        self.assertEqual(list(self.store.load_all()), ['robot_001'])
+        self.assertRaises(ValueError, self.store.save, '../robot_003', stn)
+
+    def test_weight_matrix(self):
+        stn = self.get_stn('fpc', "stn_two_tasks.json")
+        stn.remove_task(1)
+        self.store.save('robot_001', stn)
+
+        node_ids, weights = self.store.get_weight_matrix('robot_001')
+        stn_node_ids, stn_weights = stn.get_weight_matrix()
+        self.assertEqual(node_ids, stn_node_ids)
+        np.testing.assert_array_equal(weights, stn_weights)
+
+        # The stored weights can be given to the solvers without loading the stn
+        floyd_warshall(weights)
+        minimal_network = STP('fpc').solve(stn)
+        self.assertEqual(weights[node_ids.index(0), node_ids.index(4)], minimal_network.get_edge_weight(0, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+
+from stn.methods.dsc_lp import DSC_LP, get_dsc_schedule
+from stn.methods.strong_controllability import get_strongly_controllable_bounds, is_strongly_controllable, \
+    has_requirement_schedule
+from stn.stp import STP
+from stn.utils.utils import create_task
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+STNU = code_dir + "/data/stnu_two_tasks.json"
+
+
+def get_lp_dsc_schedule(stnu):
+    """ Computes the DSC and schedule of the stnu with the DSC LP only
+    """
+    dsc_lp = DSC_LP(stnu)
+    status, bounds, epsilons = dsc_lp.original_lp()
+    if epsilons is None:
+        return None
+    original_intervals, shrinked_intervals = dsc_lp.new_interval(epsilons)
+    dsc = dsc_lp.compute_dsc(original_intervals, shrinked_intervals)
+    dsc_lp.get_stnu(bounds)
+    return dsc, dsc_lp.get_schedule(bounds)
+
+
+class TestStrongControllability(unittest.TestCase):
+
+    def setUp(self):
+        with open(STNU) as json_file:
+            stnu_dict = json.load(json_file)
+        self.stnu = STP('dsc').get_stn(stn_json=json.dumps(stnu_dict))
+
+    def test_strongly_controllable(self):
+        self.assertTrue(is_strongly_controllable(self.stnu))
+        bounds = get_strongly_controllable_bounds(self.stnu)
+        expected_bounds = {1: (37, 37), 2: (41, 45), 3: (43, 51), 4: (92, 92), 5: (96, 100), 6: (98, 106)}
+        for node_id, (lower_bound, upper_bound) in expected_bounds.items():
+            self.assertEqual(bounds[(node_id, '-')], lower_bound)
+            self.assertEqual(bounds[(node_id, '+')], upper_bound)
+
+        dsc, schedule = get_dsc_schedule(self.stnu)
+        expected_dsc, expected_schedule = get_lp_dsc_schedule(self.stnu)
+        self.assertEqual(dsc, 1.0)
+        self.assertEqual(dsc, expected_dsc)
+        self.assertEqual(schedule, expected_schedule)
+        self.assertEqual(schedule.risk_metric, 0.0)
+
+    def test_not_strongly_controllable(self):
+        # The delivery of the second task cannot happen after 100 for all durations
+        self.stnu.update_edge_weight(0, 6, 100)
+        self.assertFalse(is_strongly_controllable(self.stnu))
+        self.assertTrue(has_requirement_schedule(self.stnu))
+
+        dsc, schedule = get_dsc_schedule(self.stnu)
+        expected_dsc, expected_schedule = get_lp_dsc_schedule(self.stnu)
+        self.assertEqual(dsc, expected_dsc)
+        self.assertEqual(schedule, expected_schedule)
+
+    def test_no_requirement_schedule(self):
+        # The first task cannot start before 20 and after 10
+        self.stnu.update_edge_weight(0, 1, 10)
+        self.stnu.update_edge_weight(1, 0, -20)
+        self.assertFalse(has_requirement_schedule(self.stnu))
+        self.assertFalse(is_strongly_controllable(self.stnu))
+        self.assertIsNone(get_lp_dsc_schedule(self.stnu))
+        self.assertIsNone(get_dsc_schedule(self.stnu))
+
+    def test_negative_window(self):
+        # The DSC LP allows timepoints before the zero timepoint
+        stnu = STP('dsc').get_stn()
+        task = create_task(stnu, {'task_id': '0d06fb90-a76d-48b4-b64f-857b7388ab70',
+                                  'earliest_pickup': -12.15, 'latest_pickup': -11.79,
+                                  'travel_time': {'name': 'travel_time', 'mean': 5, 'variance': 0.2},
+                                  'work_time': {'name': 'work_time', 'mean': 3, 'variance': 0.1}})
+        stnu.add_task(task, 1)
+        self.assertTrue(has_requirement_schedule(stnu))
+
+        expected_dsc, expected_schedule = get_lp_dsc_schedule(stnu)
+        dsc, schedule = get_dsc_schedule(stnu)
+        self.assertEqual(dsc, expected_dsc)
+        self.assertEqual(schedule, expected_schedule)
+        self.assertLess(schedule.get_node_latest_time(1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
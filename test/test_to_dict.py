@@ -0,0 +1,47 @@
+import json
+import os
+import unittest
+
+from networkx.readwrite import json_graph
+
+from stn.stp import STP
+
+code_dir = os.path.abspath(os.path.dirname(__file__))
+
+
+class TestToDict(unittest.TestCase):
+    """ Tests the conversion between stns and dictionaries in networkx node-link format
+    """
+
+    def assert_round_trip(self, solver_name, file_name):
+        with open(code_dir + "/data/" + file_name) as json_file:
+            stn_dict = json.load(json_file)
+        stp = STP(solver_name)
+        stn = stp.get_stn(stn_json=json.dumps(stn_dict))
+
+        self.assertEqual(stn.__class__.from_dict(stn.to_dict()), stn)
+        self.assertEqual(stn.__class__.from_dict(stn_dict), stn)
+
+        # The dictionary can be read by networkx
+        graph = json_graph.node_link_graph(json.loads(stn.to_json()))
+        self.assertEqual(graph.number_of_edges(), stn.number_of_edges())
+
+        # Edges under 'edges' instead of 'links'
+        stn_dict['edges'] = stn_dict.pop('links')
+        self.assertEqual(stn.__class__.from_dict(stn_dict), stn)
+
+    def test_stn(self):
+        self.assert_round_trip('fpc', "stn_two_tasks.json")
+
+    def test_dense_stn(self):
+        self.assert_round_trip('fpc-dense', "stn_two_tasks.json")
+
+    def test_pstn(self):
+        self.assert_round_trip('srea', "pstn_two_tasks.json")
+
+    def test_stnu(self):
+        self.assert_round_trip('dsc', "stnu_two_tasks.json")
+
+
+if __name__ == '__main__':
+    unittest.main()